@@ -0,0 +1,42 @@
+import jwt
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import get_db
+from app.db.models import User
+from app.api.exceptions import AdminRightsRequired, NoAccessTokenFound
+
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    """Получить текущего пользователя из JWT токена"""
+    access_token = request.cookies.get("my-access-token")
+    if not access_token:
+        raise NoAccessTokenFound
+
+    try:
+        payload = jwt.decode(
+            access_token,
+            settings.jwt_secret,
+            algorithms=[settings.jwt_alg],
+            options={"require": ["exp", "iat"]},
+        )
+    except jwt.PyJWTError as e:
+        raise HTTPException(401, f"Invalid access token: {e}") from e
+
+    if payload.get("type") != "access":
+        raise HTTPException(401, "Not an access token")
+
+    email = payload["sub"]
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    return user
+
+
+def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    """Текущий пользователь, если он администратор (`User.is_admin`)"""
+    if not user.is_admin:
+        raise AdminRightsRequired
+    return user
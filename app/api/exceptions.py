@@ -1,5 +1,9 @@
+import math
+from datetime import date
+
 from fastapi import HTTPException, status
 
+
 class NoRequestCodeSend(HTTPException):
     def __init__(self, message: str):
         super().__init__(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=message)
@@ -12,4 +16,61 @@ class AccountNotFound(HTTPException):
         super().__init__(status_code=status.HTTP_404_NOT_FOUND, detail=message)
 
 
-NoAccessTokenFound = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No access token found in cookie")
\ No newline at end of file
+class InvalidAmount(HTTPException):
+    def __init__(self, message: str):
+        super().__init__(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message)
+
+
+class MissingExchangeRate(HTTPException):
+    def __init__(self, currency: str | None = None, day: date | None = None):
+        if currency:
+            detail = f"No exchange rate for {currency} on {day}"
+        else:
+            detail = "No exchange rate for some transactions"
+        super().__init__(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+NoAccessTokenFound = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No access token found in cookie")
+
+AdminRightsRequired = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN, detail="Admin rights required"
+)
+
+IdempotencyKeyReused = HTTPException(
+    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    detail="Idempotency-Key was already used for a different request",
+)
+
+InvalidIdempotencyKey = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Idempotency-Key header"
+)
+
+IdempotencyKeyConflict = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail="Idempotency-Key is being processed by another request, retry",
+)
+
+ReceiptTooLarge = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Receipt file is too large"
+)
+
+UnsupportedReceiptType = HTTPException(
+    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Receipt must be an image or a PDF"
+)
+
+InvalidSyncToken = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+)
+
+ProfilerBusy = HTTPException(
+    status_code=status.HTTP_409_CONFLICT, detail="Profiler is already running"
+)
+
+
+class TooManyRequests(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
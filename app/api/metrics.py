@@ -0,0 +1,59 @@
+import logging
+
+from anyio import to_thread
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import CONTENT_TYPE_LATEST, CallbackGauge, registry
+from app.db.database import database_engine
+from app.services.chat_manager import chat_manager
+from app.utils.mail_sender import mail_queue
+
+router = APIRouter()
+logger = logging.getLogger("app.metrics")
+
+
+def _pool_stats():
+    pool = database_engine.pool
+    stats = []
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, state, None)
+        if callable(getter):
+            stats.append(((state,), getter()))
+    return stats
+
+
+def _threadpool_stats():
+    limiter = to_thread.current_default_thread_limiter()
+    return [
+        (("total",), limiter.total_tokens),
+        (("busy",), limiter.borrowed_tokens),
+    ]
+
+
+def _chat_connections():
+    return [
+        (("user",), len(chat_manager.user_connections)),
+        (("admin",), len(chat_manager.admin_connections)),
+    ]
+
+
+registry.register(CallbackGauge(
+    "db_pool_connections", "SQLAlchemy connection pool state", _pool_stats, ("state",)
+))
+registry.register(CallbackGauge(
+    "threadpool_workers", "Worker threads for sync endpoints", _threadpool_stats, ("state",)
+))
+registry.register(CallbackGauge(
+    "chat_connections", "Open chat WebSocket connections", _chat_connections, ("role",)
+))
+registry.register(CallbackGauge(
+    "mail_queue_depth", "Emails waiting to be sent", lambda: [((), mail_queue.qsize())]
+))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # async: лимитер пула потоков доступен только из event loop
+    logger.debug("Metrics endpoint activated")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,48 @@
+import logging
+
+from anyio import to_thread
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import get_admin_user
+from app.api.exceptions import ProfilerBusy
+from app.core.config import settings
+from app.db.models import User
+from app.services.profiler import background_sampler, profiler, render_collapsed
+
+router = APIRouter()
+logger = logging.getLogger("app.admin")
+
+
+@router.get("/admin/profile", response_class=PlainTextResponse)
+async def run_profile(
+    admin: User = Depends(get_admin_user),
+    seconds: float = Query(5.0, gt=0, description="Длительность профилирования, с"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Интервал между замерами, мс"),
+    include_idle: bool = Query(False, description="Показывать ожидающие потоки"),
+):
+    """
+    Сэмплирующий профиль текущего воркера в формате collapsed stacks
+    (подходит для flamegraph.pl / speedscope).
+    """
+    seconds = min(seconds, settings.profiler_max_seconds)
+    logger.info("Admin %s started profiling for %.1f s", admin.id, seconds)
+
+    counts = await to_thread.run_sync(profiler.profile, seconds, interval_ms / 1000, include_idle)
+    if counts is None:
+        raise ProfilerBusy
+    return render_collapsed(counts)
+
+
+@router.get("/admin/profile/recent", response_class=PlainTextResponse)
+def recent_profile(
+    admin: User = Depends(get_admin_user),
+    seconds: float | None = Query(None, gt=0, description="Окно, с (по умолчанию весь буфер)"),
+):
+    """
+    Горячие стеки из кольцевого буфера постоянного сэмплера.
+    """
+    if not background_sampler.running:
+        raise HTTPException(404, "Background sampler is disabled")
+    logger.debug("Admin %s requested recent hot stacks", admin.id)
+    return render_collapsed(background_sampler.hot_stacks(seconds))
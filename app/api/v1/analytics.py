@@ -1,109 +1,124 @@
 import logging
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select, true
 from sqlalchemy.orm import Session
-import jwt
 
+from app.api.deps import get_current_user
+from app.api.exceptions import MissingExchangeRate
 from app.core.config import settings
 from app.core.jwt import auth
-from app.db.database import get_db
-from app.db.models import Transaction, User, Category
+from app.db.database import get_snapshot_db
+from app.db.models import Category, Transaction, User
 from app.schemas.analytics import (
+    CategoryForecast,
+    CategorySummary,
+    ForecastResponse,
+    MonthlyStats,
+    MonthlyStatsResponse,
+    TimeSeriesByCategoryResponse,
     TimeSeriesDataPoint,
     TimeSeriesResponse,
-    CategorySummary,
-    TimeSeriesByCategoryResponse
 )
-from app.api.exceptions import NoAccessTokenFound
+from app.services.budgets import month_start
+from app.services.exchange_rates import convert_minor, converted_amount
+from app.services.forecast import forecast_for
+from app.services.monthly import month_range, monthly_totals
+from app.utils.money import from_minor
 
 router = APIRouter()
 logger = logging.getLogger("app.analytics")
 
+# ответ /analytics/monthly — по строке на месяц, диапазон ограничен
+MAX_MONTHS = 120
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    """Получить текущего пользователя из JWT токена"""
-    access_token = request.cookies.get("my-access-token")
-    if not access_token:
-        raise NoAccessTokenFound()
-    
-    try:
-        payload = jwt.decode(
-            access_token, 
-            settings.jwt_secret,
-            algorithms=[settings.jwt_alg],
-            options={"require": ["exp", "iat"]},
-        )
-    except jwt.PyJWTError as e:
-        raise HTTPException(401, f"Invalid access token: {e}") from e
-    
-    if payload.get("type") != "access":
-        raise HTTPException(401, "Not an access token")
-    
-    email = payload["sub"]
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(404, "User not found")
-    
-    return user
+
+def _rate_date(end_date: datetime | None) -> date:
+    """Дата курса базовой валюты к валюте отчёта: конец периода или сегодня."""
+    return end_date.date() if end_date else date.today()
 
 
 @router.get("/analytics/timeseries", dependencies=[Depends(auth.access_token_required)])
 def get_timeserie(
     request: Request,
-    db: Session = Depends(get_db),
-    start_date: Optional[datetime] = Query(None, description="Начальная дата в формате ISO"),
-    end_date: Optional[datetime] = Query(None, description="Конечная дата в формате ISO")
+    db: Session = Depends(get_snapshot_db),
+    start_date: datetime | None = Query(None, description="Начальная дата в формате ISO"),
+    end_date: datetime | None = Query(None, description="Конечная дата в формате ISO"),
+    currency: str | None = Query(
+        None, pattern=r"^[A-Z]{3}$", description="Валюта итогов (по умолчанию BASE_CURRENCY)"
+    ),
 ):
     """
     Получить временной ряд расходов и доходов пользователя.
     """
     user = get_current_user(request, db)
-    logger.debug(f"Analytics/timeseries endpoint activated for user {user.email}")
-    
-    query = db.query(Transaction).filter(Transaction.user_id == user.id)
-    
+    logger.debug("Analytics/timeseries endpoint activated for user %s", user.email)
+    return timeseries(db, user, start_date, end_date, currency)
+
+
+def timeseries(
+    db: Session,
+    user: User,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    currency: str | None,
+) -> TimeSeriesResponse:
+    """Временной ряд пользователя (общий для эндпоинта и POST /batch)."""
+    filters = [Transaction.user_id == user.id]
     # Применяем фильтры по датам если указаны
     if start_date:
-        query = query.filter(Transaction.date >= start_date)
+        filters.append(Transaction.date >= start_date)
     if end_date:
-        query = query.filter(Transaction.date <= end_date)
+        filters.append(Transaction.date <= end_date)
     
-    transactions = query.order_by(Transaction.date).all()
+    currency = currency or settings.base_currency
+    amount = converted_amount(db, currency, _rate_date(end_date))
+    # ряд и итоги — одним запросом: CTE читается один раз, итоги не расходятся с точками
+    tx = select(Transaction.date.label("date"), amount.label("amount")).where(*filters).cte("tx")
+    totals = select(
+        func.coalesce(func.sum(tx.c.amount), 0).label("total"),
+        func.count(func.distinct(func.date(tx.c.date))).label("unique_dates"),
+        (func.count() - func.count(tx.c.amount)).label("missing"),
+    ).cte("totals")
+    rows = db.execute(
+        select(
+            tx.c.date,
+            func.round(tx.c.amount),
+            totals.c.total,
+            totals.c.unique_dates,
+            totals.c.missing,
+        )
+        .select_from(totals.outerjoin(tx, true()))
+        .order_by(tx.c.date)
+    ).all()
     
-    if not transactions:
+    # без операций — одна строка итогов с пустой датой
+    if rows[0].date is None:
         return TimeSeriesResponse(
+            currency=currency,
             total_amount=0,
             average_per_day=0,
             data_points=[]
         )
     
-    # Считаем общую сумму (expenses как отрицательные, income как положительные)
-    total_result = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user.id
-    )
-    if start_date:
-        total_result = total_result.filter(Transaction.date >= start_date)
-    if end_date:
-        total_result = total_result.filter(Transaction.date <= end_date)
-    
-    total_amount = total_result.scalar() or 0
+    _, _, total, unique_dates, missing = rows[0]
+    if missing:
+        raise MissingExchangeRate()
+    total_minor = round(total)
     
-    # Преобразуем в список точек данных
+    # Decimal только на выходе: суммы в минимальных единицах переводятся при сериализации
     data_points = [
-        TimeSeriesDataPoint(date=t.date, amount=t.amount)
-        for t in transactions
+        TimeSeriesDataPoint(date=day, amount=from_minor(amount_minor, currency))
+        for day, amount_minor, *_ in rows
     ]
     
-    # Считаем среднее по дням (количество уникальных дат)
-    unique_dates = len(set(t.date.date() if t.date else None for t in transactions))
-    average_per_day = total_amount / unique_dates if unique_dates > 0 else 0
+    average_minor = round(total_minor / unique_dates) if unique_dates > 0 else 0
     
     return TimeSeriesResponse(
-        total_amount=total_amount,
-        average_per_day=average_per_day,
+        currency=currency,
+        total_amount=from_minor(total_minor, currency),
+        average_per_day=from_minor(average_minor, currency),
         data_points=data_points
     )
 
@@ -111,68 +126,191 @@ def get_timeserie(
 @router.get("/analytics/by-category", dependencies=[Depends(auth.access_token_required)])
 def get_timeserie_by_category(
     request: Request,
-    db: Session = Depends(get_db),
-    start_date: Optional[datetime] = Query(None, description="Начальная дата в формате ISO"),
-    end_date: Optional[datetime] = Query(None, description="Конечная дата в формате ISO")
+    db: Session = Depends(get_snapshot_db),
+    start_date: datetime | None = Query(None, description="Начальная дата в формате ISO"),
+    end_date: datetime | None = Query(None, description="Конечная дата в формате ISO"),
+    currency: str | None = Query(
+        None, pattern=r"^[A-Z]{3}$", description="Валюта итогов (по умолчанию BASE_CURRENCY)"
+    ),
 ):
     """
     Получить расходы/доходы разбитые по категориям.
     """
     user = get_current_user(request, db)
-    logger.debug(f"Analytics/by-category endpoint activated for user {user.email}")
-    
-    query = db.query(Transaction).filter(Transaction.user_id == user.id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    transactions = query.all()
-    
-    # Считаем общую сумму
-    total_amount = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user.id
-    )
+    logger.debug("Analytics/by-category endpoint activated for user %s", user.email)
+    return by_category(db, user, start_date, end_date, currency)
+
+
+def by_category(
+    db: Session,
+    user: User,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    currency: str | None,
+) -> TimeSeriesByCategoryResponse:
+    """Разбивка по категориям за период (общая для эндпоинта и POST /batch)."""
+    filters = [Transaction.user_id == user.id]
     if start_date:
-        total_amount = total_amount.filter(Transaction.date >= start_date)
+        filters.append(Transaction.date >= start_date)
     if end_date:
-        total_amount = total_amount.filter(Transaction.date <= end_date)
+        filters.append(Transaction.date <= end_date)
     
-    total = total_amount.scalar() or 0
+    # Группируем по категориям одним запросом: SUM/COUNT с пересчётом валюты в SQL
+    currency = currency or settings.base_currency
+    amount = converted_amount(db, currency, _rate_date(end_date))
+    rows = db.query(
+        Category.id,
+        Category.name,
+        Category.type,
+        func.sum(amount),
+        func.count(Transaction.id),
+        func.count(Transaction.id) - func.count(amount),
+    ).select_from(Transaction).join(
+        Category, Transaction.category_id == Category.id
+    ).filter(*filters).group_by(Category.id, Category.name, Category.type).all()
+    if any(row[5] for row in rows):
+        raise MissingExchangeRate()
     
-    # Группируем по категориям
-    category_stats = {}
-    for transaction in transactions:
-        cat_id = transaction.category_id
-        if cat_id not in category_stats:
-            category_stats[cat_id] = {
-                "category_id": cat_id,
-                "category_name": transaction.category.name,
-                "category_type": transaction.category.type,
-                "amount": 0,
-                "count": 0
-            }
-        category_stats[cat_id]["amount"] += transaction.amount
-        category_stats[cat_id]["count"] += 1
+    totals = {row[0]: round(row[3]) for row in rows}
+    total_minor = sum(totals.values())
     
     # Формируем список категорий с процентами
     categories = []
-    for cat_data in category_stats.values():
-        percentage = (cat_data["amount"] / total * 100) if total != 0 else 0
+    rows = sorted(rows, key=lambda row: totals[row[0]], reverse=True)
+    for cat_id, cat_name, cat_type, _, count, _ in rows:
+        amount_minor = totals[cat_id]
+        percentage = round(amount_minor * 100 / total_minor, 2) if total_minor != 0 else 0
         categories.append(CategorySummary(
-            category_id=cat_data["category_id"],
-            category_name=cat_data["category_name"],
-            category_type=cat_data["category_type"],
-            total_amount=cat_data["amount"],
-            transaction_count=cat_data["count"],
+            category_id=cat_id,
+            category_name=cat_name,
+            category_type=cat_type,
+            total_amount=from_minor(amount_minor, currency),
+            transaction_count=count,
             percentage=percentage
         ))
     
-    # Сортируем по сумме (убывание)
-    categories.sort(key=lambda x: x.total_amount, reverse=True)
-    
     return TimeSeriesByCategoryResponse(
-        total_amount=total,
+        currency=currency,
+        total_amount=from_minor(total_minor, currency),
         categories=categories
     )
+
+
+@router.get("/analytics/monthly", dependencies=[Depends(auth.access_token_required)])
+def get_monthly(
+    request: Request,
+    db: Session = Depends(get_snapshot_db),
+    start_date: date | None = Query(
+        None, description="Любой день первого месяца (по умолчанию — 11 месяцев назад)"
+    ),
+    end_date: date | None = Query(
+        None, description="Любой день последнего месяца (по умолчанию — текущий)"
+    ),
+    currency: str | None = Query(
+        None, pattern=r"^[A-Z]{3}$", description="Валюта итогов (по умолчанию BASE_CURRENCY)"
+    ),
+):
+    """
+    Расходы, доходы, сальдо и число операций по месяцам периода, включая месяцы без операций.
+    """
+    user = get_current_user(request, db)
+    logger.debug("Analytics/monthly endpoint activated for user %s", user.email)
+    return monthly(db, user, start_date, end_date, currency)
+
+
+def monthly(
+    db: Session, user: User, start_date: date | None, end_date: date | None, currency: str | None
+) -> MonthlyStatsResponse:
+    """Помесячные итоги (общие для эндпоинта и POST /batch)."""
+    last = month_start(end_date or date.today())
+    if start_date:
+        first = month_start(start_date)
+    else:
+        # последние 12 месяцев, включая последний
+        index = last.year * 12 + last.month - 12
+        first = date(index // 12, index % 12 + 1, 1)
+    if first > last:
+        raise HTTPException(422, "start_date is after end_date")
+    if len(month_range(first, last)) > MAX_MONTHS:
+        raise HTTPException(422, f"Range is limited to {MAX_MONTHS} months")
+
+    # итоги хранятся в базовой валюте; в валюту отчёта — по курсу на конец периода,
+    # как в остальной аналитике
+    currency = currency or settings.base_currency
+    rate_date = end_date or date.today()
+
+    def convert(amount_minor: int) -> int:
+        converted = convert_minor(db, amount_minor, settings.base_currency, currency, rate_date)
+        if converted is None:
+            raise MissingExchangeRate(currency, rate_date)
+        return converted
+
+    months = []
+    for month, totals in monthly_totals(db, user.id, first, last).items():
+        expenses_minor, income_minor = convert(totals.expenses_minor), convert(totals.income_minor)
+        months.append(MonthlyStats(
+            year=month.year,
+            month=month.month,
+            total_expenses=from_minor(expenses_minor, currency),
+            total_income=from_minor(income_minor, currency),
+            net=from_minor(income_minor - expenses_minor, currency),
+            transaction_count=totals.transaction_count,
+        ))
+    return MonthlyStatsResponse(currency=currency, months=months)
+
+
+@router.get("/analytics/forecast", dependencies=[Depends(auth.access_token_required)])
+def get_forecast(
+    request: Request,
+    db: Session = Depends(get_snapshot_db),
+    currency: str | None = Query(
+        None, pattern=r"^[A-Z]{3}$", description="Валюта прогноза (по умолчанию BASE_CURRENCY)"
+    ),
+):
+    """
+    Прогноз расходов по категориям: потрачено с начала месяца, ожидаемо к концу месяца
+    и за следующий месяц.
+    """
+    user = get_current_user(request, db)
+    logger.debug("Analytics/forecast endpoint activated for user %s", user.email)
+    return forecast(db, user, currency)
+
+
+def forecast(db: Session, user: User, currency: str | None) -> ForecastResponse:
+    """Прогноз расходов пользователя (общий для эндпоинта и POST /batch)."""
+    result = forecast_for(db, user.id)
+    currency = currency or settings.base_currency
+
+    def convert(amount_minor: int) -> int:
+        converted = convert_minor(
+            db, int(amount_minor), settings.base_currency, currency, result.as_of
+        )
+        if converted is None:
+            raise MissingExchangeRate(currency, result.as_of)
+        return converted
+
+    ids = result.category_ids.tolist()
+    names = {}
+    if ids:
+        names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(ids)).all())
+    categories = [
+        CategoryForecast(
+            category_id=category_id,
+            category_name=names.get(category_id, ""),
+            spent=from_minor(convert(spent), currency),
+            month_end=from_minor(convert(month_end), currency),
+            next_month=from_minor(convert(next_month), currency),
+        )
+        for category_id, spent, month_end, next_month in zip(
+            ids, result.spent, result.month_end, result.next_month, strict=True
+        )
+    ]
+    categories.sort(key=lambda category: category.month_end, reverse=True)
+    return ForecastResponse(
+        currency=currency,
+        as_of=result.as_of,
+        spent=from_minor(convert(result.spent.sum()), currency),
+        month_end=from_minor(convert(result.month_end.sum()), currency),
+        next_month=from_minor(convert(result.next_month.sum()), currency),
+        categories=categories,
+    )
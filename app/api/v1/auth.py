@@ -1,9 +1,10 @@
 import logging
 import secrets
-from datetime import datetime, timedelta, timezone
+from datetime import UTC, datetime, timedelta
 
 import jwt
-from fastapi import APIRouter, HTTPException, Response, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+from sqlalchemy import case, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -19,19 +20,40 @@ from app.schemas.auth import (
     SetPasswordIn,
     TokensOut,
 )
-from app.utils.mail_sender import send_code
+from app.utils.mail_sender import enqueue_code
 from app.utils.security import hash_code, hash_password, sha256, verify_password
 from app.db.models import *
 from app.db.database import get_db
-from app.api.exceptions import NoRequestCodeSend, InvalidCredentials
+from app.db.upsert import insert_for
+from app.api.exceptions import NoRequestCodeSend, InvalidCredentials, TooManyRequests
+from app.services.rate_limit import AUTH_LIMITS, rate_limiter
 
 router = APIRouter()
 logger = logging.getLogger("app.auth")
 
 
 ### HELPER FUNCTIONS
+def _client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _enforce_rate_limit(scope: str, request: Request, email: str) -> None:
+    """Reject with 429 before any DB or bcrypt/SMTP work if the IP or email bucket is empty."""
+    ip_limit, email_limit = AUTH_LIMITS[scope]
+    retry_after = max(
+        rate_limiter.hit(scope, "ip", _client_ip(request), ip_limit),
+        rate_limiter.hit(scope, "email", email, email_limit),
+    )
+    if retry_after:
+        raise TooManyRequests(retry_after)
+
+
 def _store_refresh(user_id: int, refresh_token: str, jti: str, exp_utc: datetime, db: Session) -> None:
-    logger.debug(f"Refresh token for {user_id} was stored in DB")
+    logger.debug("Refresh token for %s was stored in DB", user_id)
     refresh_token_object = RefreshToken(user_id=user_id, token_hash=sha256(refresh_token), jti=jti, expires_at=exp_utc)
     db.add(refresh_token_object)
     db.commit()
@@ -55,11 +77,14 @@ def _decode_refresh_or_401(refresh_token: str) -> dict:
 
 
 def _revoke_refresh_by_jti(jti: str, db: Session) -> None:
-    logger.debug(f"Revoke the refresh token with jti: {jti}")
-    token_object = db.query(RefreshToken).filter(RefreshToken.jti == jti).first()
-    token_object.revoked = True
+    logger.debug("Revoke the refresh token with jti: %s", jti)
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == jti, RefreshToken.revoked.is_(False))
+        .values(revoked=True),
+        execution_options={"synchronize_session": False},
+    )
     db.commit()
-    db.refresh(token_object)
 
 
 def _issue_pair_and_store(email: str, user_id: int, db: Session) -> TokensOut:
@@ -71,95 +96,114 @@ def _issue_pair_and_store(email: str, user_id: int, db: Session) -> TokensOut:
     access_token = auth.create_access_token(uid=email)
     refresh_token = auth.create_refresh_token(uid=email, data={"jti": jti})
 
-    exp_utc = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+    exp_utc = datetime.now(UTC) + timedelta(days=settings.refresh_token_expire_days)
     _store_refresh(user_id=user_id, refresh_token=refresh_token, jti=jti, exp_utc=exp_utc, db=db)
 
     logger.info("Pair (access/refresh) tokens was generated successful")
     return TokensOut(access_token=access_token, refresh_token=refresh_token)
 
 
-def _is_refresh_active(email: str, refresh_token: str, jti: str, db: Session) -> tuple[bool, int | None]:
-    logger.debug(f"Checking the activeness of refresh token for {email}")
-    refresh_token_object = db.query(RefreshToken).join(User, User.id == RefreshToken.user_id).filter(
-        User.email == email, RefreshToken.token_hash == sha256(refresh_token), RefreshToken.jti == jti).first()
-    
-    if not refresh_token_object:
-        return (False, None)
-    
-    active = False
-    if not refresh_token_object.revoked and refresh_token_object.expires_at > datetime.now(timezone.utc):
-        active = True
+def _consume_refresh(refresh_token: str, jti: str, db: Session) -> int | None:
+    """
+    Revoke the active refresh token with one compare-and-swap UPDATE by jti
+    (revoked=false -> true) and return its owner, or None if it is revoked, expired or unknown.
+    The caller commits together with the new token pair.
+    """
+    logger.debug("Consuming refresh token with jti: %s", jti)
+    return db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.token_hash == sha256(refresh_token),
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > datetime.now(UTC),
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id),
+        execution_options={"synchronize_session": False},
+    ).scalar_one_or_none()
+
 
-    return (active, refresh_token_object.user_id if active else None)
+def _code_rejection_reason(email: str, now: datetime, db: Session) -> str:
+    """
+    Pick the error message for a code the conditional UPDATE did not match
+    (failure path only).
+    """
+    email_code = db.query(EmailCode).filter(EmailCode.email == email).first()
+    if not email_code:
+        reason = "Request the code"
+    elif email_code.used:
+        reason = "Code have been used"
+    elif email_code.expires_at.replace(tzinfo=email_code.expires_at.tzinfo or UTC) < now:
+        reason = "The code has expired"
+    else:
+        reason = "The number of attempts has been exceeded"
+    logger.warning("%s: %s", reason, email)
+    return reason
 
 
 ### ENDPOINTS
 @router.post("/request-code", response_model=RequestCodeOut, summary="Send code on email")
-def request_code(body: EmailIn, db: Session = Depends(get_db)):
+def request_code(body: EmailIn, request: Request, db: Session = Depends(get_db)):
     email = body.email.lower()
-    logger.debug(f"Request code for {email}")
+    _enforce_rate_limit("request-code", request, email)
+    logger.debug("Request code for %s", email)
     code = f"{secrets.randbelow(1_000_000):06d}"
     code_h = hash_code(code)
-    expires = datetime.now(timezone.utc) + timedelta(minutes=5)
-
-    logger.debug("Insert into 'email_codes' new row")
-    
-    existing_row = db.query(EmailCode).filter(EmailCode.email == email).first()
-
-    if existing_row:
-        existing_row.code_hash = code_h
-        existing_row.expires_at = expires
-        existing_row.attempts_left = 5
-        existing_row.used = False
-    else:
-        email_code = EmailCode(email=email, code_hash=code_h, expires_at=expires)
-        db.add(email_code)
-
+    expires = datetime.now(UTC) + timedelta(minutes=5)
+
+    logger.debug("Upsert into 'email_codes'")
+    upsert = insert_for(db, EmailCode).values(email=email, code_hash=code_h, expires_at=expires)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=[EmailCode.email],
+        set_={"code_hash": code_h, "expires_at": expires, "attempts_left": 5, "used": False},
+    ))
     db.commit()
-    if existing_row:
-        db.refresh(existing_row)
 
-    logger.info(f"[DEV] send code {code} to {email}")
+    logger.info("[DEV] send code %s to %s", code, email)
     try:
-        send_code(to_email=email, code=str(code))
+        enqueue_code(to_email=email, code=str(code))
     except Exception as e:
-        logger.error(f"Problems with sending the code: {e}")
+        logger.error("Problems with sending the code: %s", e)
     return RequestCodeOut()
 
 
 @router.post("/verify-code", response_model=CodeVerifyOut, summary="Verify code from email")
-def verify_code(body: CodeVerifyIn, db: Session = Depends(get_db)):
+def verify_code(body: CodeVerifyIn, request: Request, db: Session = Depends(get_db)):
     email = body.email.lower()
-    logger.debug(f"Code verification for {email}")
+    _enforce_rate_limit("verify-code", request, email)
+    logger.debug("Code verification for %s", email)
     code_h = hash_code(body.code)
-    now = datetime.now(timezone.utc)
+    now = datetime.now(UTC)
+
+    logger.debug("Conditional update of 'email_codes'")
+    matched = EmailCode.code_hash == code_h
+    row = db.execute(
+        update(EmailCode)
+        .where(
+            EmailCode.email == email,
+            EmailCode.used.is_(False),
+            EmailCode.expires_at >= now,
+            EmailCode.attempts_left > 0,
+        )
+        .values(
+            attempts_left=case((matched, EmailCode.attempts_left),
+                               else_=EmailCode.attempts_left - 1),
+            used=matched,
+            verified_at=case((matched, now), else_=EmailCode.verified_at),
+        )
+        .returning(matched),
+        execution_options={"synchronize_session": False},
+    ).first()
+
+    if row is None:
+        db.rollback()
+        raise NoRequestCodeSend(_code_rejection_reason(email, now, db))
 
-    logger.debug("Execute row from 'email_codes'")
-    email_code = db.query(EmailCode).filter(EmailCode.email == email).first()
-    
-    if not email_code:
-        logger.exception("Request the code")
-        raise NoRequestCodeSend("Request the code")
-    if email_code.used:
-        logger.exception("Code have been used")
-        raise NoRequestCodeSend("Code have been used")
-    if email_code.expires_at < now:
-        logger.exception("The code has expired")
-        raise NoRequestCodeSend("The code has expired")
-    if email_code.attempts_left <= 0:
-        logger.exception("The number of attempts has been exceeded")
-        raise NoRequestCodeSend("The number of attempts has been exceeded")
-    if email_code.code_hash != code_h:
-        logger.exception("Invalid code")
-        email_code.attempts_left -= 1
-        db.commit()
-        db.refresh(email_code)
-        raise HTTPException(400, "Invalid code")
-    
-    email_code.used = True
-    email_code.verified_at = now
     db.commit()
-    db.refresh(email_code)
+    if not row[0]:
+        logger.warning("Invalid code for %s", email)
+        raise HTTPException(400, "Invalid code")
 
     return CodeVerifyOut(verified=True)
 
@@ -167,7 +211,7 @@ def verify_code(body: CodeVerifyIn, db: Session = Depends(get_db)):
 @router.post("/set-password", response_model=TokensOut, summary="Set password and get JWT")
 def set_password(body: SetPasswordIn, db: Session = Depends(get_db)):
     email = body.email.lower()
-    logger.debug(f"Set password for {email}")
+    logger.debug("Set password for %s", email)
         
     email_code = db.query(EmailCode).filter(EmailCode.email == email).first()
 
@@ -176,9 +220,9 @@ def set_password(body: SetPasswordIn, db: Session = Depends(get_db)):
         raise HTTPException(400, "At first verify email by code")
 
     if email_code.verified_at.tzinfo is None:
-        verified_at = verified_at.replace(tzinfo=timezone.utc)
+        verified_at = verified_at.replace(tzinfo=UTC)
 
-    if (datetime.now(timezone.utc) - email_code.verified_at) > timedelta(minutes=5):
+    if (datetime.now(UTC) - email_code.verified_at) > timedelta(minutes=5):
         logger.exception("Time to set password expired")
         raise HTTPException(400, "Time to set password expired")
 
@@ -198,7 +242,8 @@ def set_password(body: SetPasswordIn, db: Session = Depends(get_db)):
 
     account_from_db = db.query(Account).filter(Account.id == new_user.id).first()
     if account_from_db is None:
-        account = Account(user_id=new_user.id, name=email, currency='BYN', created_at=datetime.now(timezone.utc))
+        account = Account(user_id=new_user.id, name=email, currency='BYN',
+                          created_at=datetime.now(UTC))
         db.add(account)
     db.commit()
 
@@ -207,9 +252,10 @@ def set_password(body: SetPasswordIn, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokensOut, summary="Sign in with email and password")
-def login(body: LoginIn, response : Response, db: Session = Depends(get_db)):
+def login(body: LoginIn, request: Request, response : Response, db: Session = Depends(get_db)):
     email = body.email.lower()
-    logger.info(f"User with email: {email} is signing in")
+    _enforce_rate_limit("login", request, email)
+    logger.info("User with email: %s is signing in", email)
 
     logger.debug("Checking the correctness of creds")
     user = db.query(User).filter(User.email == email).first()
@@ -229,18 +275,17 @@ def refresh_tokens(payload: RefreshIn, response: Response, db: Session = Depends
     data = _decode_refresh_or_401(payload.refresh_token)
     email: str = data["sub"]
     jti: str | None = data.get("jti")
-    logger.debug(f"Update access/refresh tokens for {email} and {jti}")
+    logger.debug("Update access/refresh tokens for %s and %s", email, jti)
     if not jti:
         logger.exception("Missing jti in refresh token")
         raise HTTPException(401, "Missing jti in refresh token")
 
-    active, user_id = _is_refresh_active(email, payload.refresh_token, jti, db)
-    if not active or user_id is None:
+    user_id = _consume_refresh(payload.refresh_token, jti, db)
+    if user_id is None:
+        db.rollback()
         logger.exception("Refresh token revoked or expired")
         raise HTTPException(401, "Refresh token revoked or expired")
 
-    _revoke_refresh_by_jti(jti, db)
-
     tokens_pair : TokensOut = _issue_pair_and_store(email=email, user_id=user_id, db=db)
     response.set_cookie(auth.config.JWT_ACCESS_COOKIE_NAME, tokens_pair.access_token)
     return tokens_pair
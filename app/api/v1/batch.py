@@ -0,0 +1,101 @@
+import json
+import logging
+import time
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.v1.analytics import by_category, forecast, monthly, timeseries
+from app.api.v1.categories import category_statistics
+from app.api.v1.expenses import list_expenses
+from app.core.jwt import auth
+from app.db.database import get_read_db
+from app.db.models import User
+from app.schemas.batch import (
+    BatchRequest,
+    BatchResponse,
+    BatchResult,
+    CategoriesParams,
+    CurrencyParams,
+    MonthRangeParams,
+    NoParams,
+    PeriodParams,
+)
+from app.services.batch import begin_snapshot, run_batch
+
+router = APIRouter()
+logger = logging.getLogger("app.batch")
+
+# путь подзапроса → (параметры, обработчик(db, user, params))
+ROUTES = {
+    "/expenses": (NoParams, lambda db, user, params: list_expenses(db, user.email)),
+    "/analytics/timeseries": (
+        PeriodParams,
+        lambda db, user, params: timeseries(
+            db, user, params.start_date, params.end_date, params.currency
+        ),
+    ),
+    "/analytics/by-category": (
+        PeriodParams,
+        lambda db, user, params: by_category(
+            db, user, params.start_date, params.end_date, params.currency
+        ),
+    ),
+    "/analytics/monthly": (
+        MonthRangeParams,
+        lambda db, user, params: monthly(
+            db, user, params.start_date, params.end_date, params.currency
+        ),
+    ),
+    "/analytics/forecast": (
+        CurrencyParams, lambda db, user, params: forecast(db, user, params.currency)
+    ),
+    "/categories": (
+        CategoriesParams,
+        lambda db, user, params: category_statistics(
+            db, user, params.category_type, params.currency
+        ),
+    ),
+}
+
+
+@router.post("/batch", dependencies=[Depends(auth.access_token_required)])
+def batch(body: BatchRequest, request: Request, db: Session = Depends(get_read_db)):
+    """
+    Выполнить несколько чтений дашборда (`/expenses`, `/analytics/timeseries`,
+    `/analytics/by-category`, `/analytics/monthly`, `/analytics/forecast`, `/categories`)
+    за один запрос: одна проверка токена, один снимок данных, подзапросы — параллельно.
+    Ответы — в порядке запросов, у каждого свой `status`; ошибка одного подзапроса
+    не отменяет остальные.
+    """
+    started = time.perf_counter()
+    # снимок берётся до первого запроса сессии, включая поиск пользователя
+    snapshot = begin_snapshot(db)
+    user: User = get_current_user(request, db)
+
+    results: dict[str, BatchResult] = {}
+    handlers = {}
+    for call in body.requests:
+        params_model, handler = ROUTES[call.path]
+        try:
+            params = params_model.model_validate(call.params)
+        except ValidationError as e:
+            detail = json.loads(e.json(include_url=False))
+            results[call.id] = BatchResult(id=call.id, status=422, body={"detail": detail})
+            continue
+        handlers[call.id] = partial(handler, user=user, params=params)
+
+    for key, response in run_batch(db, snapshot, handlers).items():
+        if isinstance(response, HTTPException):
+            results[key] = BatchResult(
+                id=key, status=response.status_code, body={"detail": response.detail}
+            )
+        else:
+            results[key] = BatchResult(id=key, status=200, body=response)
+
+    logger.debug("Batch of %s for user %s in %.1f ms (snapshot %s)", len(body.requests), user.id,
+                 (time.perf_counter() - started) * 1000, snapshot or "-")
+    return BatchResponse(responses=[results[call.id] for call in body.requests])
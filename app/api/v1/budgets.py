@@ -0,0 +1,99 @@
+import logging
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.exceptions import InvalidAmount
+from app.core.jwt import auth
+from app.db.database import get_db, get_read_db
+from app.db.models import Account, Budget, BudgetSpend, Category, User
+from app.schemas.budget import BudgetSet, BudgetsResponse, BudgetStatus
+from app.services.budgets import month_start, set_budget
+from app.services.categories import get_or_create_category
+from app.utils.money import from_minor, to_minor
+
+router = APIRouter()
+logger = logging.getLogger("app.budgets")
+
+
+def _statuses(
+    db: Session, user_id: int, month: date, budget_id: int | None = None
+) -> list[BudgetStatus]:
+    query = db.query(
+        Budget.id, Budget.category_id, Category.name, Budget.currency, Budget.amount_minor,
+        func.coalesce(BudgetSpend.spent_minor, 0),
+    ).join(Category, Budget.category_id == Category.id).outerjoin(
+        BudgetSpend, and_(BudgetSpend.budget_id == Budget.id, BudgetSpend.month == month)
+    ).filter(Budget.user_id == user_id)
+    if budget_id is not None:
+        query = query.filter(Budget.id == budget_id)
+
+    statuses = []
+    rows = query.order_by(Category.name)
+    for id_, category_id, category_name, currency, amount_minor, spent_minor in rows:
+        currency = currency.strip()
+        statuses.append(BudgetStatus(
+            id=id_,
+            category_id=category_id,
+            category_name=category_name,
+            month=month,
+            currency=currency,
+            amount=from_minor(amount_minor, currency),
+            spent=from_minor(spent_minor, currency),
+            remaining=from_minor(amount_minor - spent_minor, currency),
+            percent=round(spent_minor * 100 / amount_minor, 2),
+        ))
+    return statuses
+
+
+@router.get("/budgets", dependencies=[Depends(auth.access_token_required)])
+def get_budgets(
+    user: User = Depends(get_current_user),
+    month: date | None = Query(None, description="Любой день месяца (по умолчанию текущий)"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Бюджеты пользователя и расход по ним за месяц. Расход хранится готовым
+    (budget_spend), операции не пересчитываются.
+    """
+    month = month_start(month or date.today())
+    return BudgetsResponse(month=month, budgets=_statuses(db, user.id, month))
+
+
+@router.put("/budgets", dependencies=[Depends(auth.access_token_required)])
+def put_budget(
+    body: BudgetSet,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Задать месячный лимит для категории расходов (создаёт категорию, если её нет).
+    Сумма — в валюте основного счёта.
+    """
+    account = db.query(Account).filter(Account.user_id == user.id).order_by(Account.id).first()
+    if account is None:
+        raise HTTPException(404, "Account not found")
+    try:
+        amount_minor = to_minor(body.amount, account.currency)
+    except ValueError as e:
+        raise InvalidAmount(str(e)) from e
+
+    category_id = get_or_create_category(db, user.id, body.category_name, "Расход")
+    budget = set_budget(db, user.id, category_id, amount_minor, account.currency)
+    db.commit()
+    logger.info("Budget %s set for user %s", budget.id, user.id)
+    [status] = _statuses(db, user.id, month_start(date.today()), budget.id)
+    return status
+
+
+@router.delete("/budgets/{id}", dependencies=[Depends(auth.access_token_required)])
+def delete_budget(id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    budget = db.query(Budget).filter(Budget.id == id, Budget.user_id == user.id).first()
+    if budget is None:
+        raise HTTPException(404, "Budget not found")
+    db.delete(budget)
+    db.commit()
+    return {f"Delete budget {id}": "OK"}
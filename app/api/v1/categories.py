@@ -1,109 +1,89 @@
 import logging
-from typing import Optional
+from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy import func
 from sqlalchemy.orm import Session
-import jwt
 
+from app.api.deps import get_current_user
+from app.api.exceptions import MissingExchangeRate
 from app.core.config import settings
 from app.core.jwt import auth
-from app.db.database import get_db
-from app.db.models import Transaction, User, Category
+from app.db.database import get_snapshot_db
+from app.db.models import Category, Transaction, User
 from app.schemas.category import CategoriesStatsResponse, CategoryStatistic
-from app.api.exceptions import NoAccessTokenFound
+from app.services.exchange_rates import converted_amount
+from app.utils.money import from_minor
 
 router = APIRouter()
 logger = logging.getLogger("app.categories")
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    """Получить текущего пользователя из JWT токена"""
-    access_token = request.cookies.get("my-access-token")
-    if not access_token:
-        raise NoAccessTokenFound()
-    
-    try:
-        payload = jwt.decode(
-            access_token, 
-            settings.jwt_secret,
-            algorithms=[settings.jwt_alg],
-            options={"require": ["exp", "iat"]},
-        )
-    except jwt.PyJWTError as e:
-        raise HTTPException(401, f"Invalid access token: {e}") from e
-    
-    if payload.get("type") != "access":
-        raise HTTPException(401, "Not an access token")
-    
-    email = payload["sub"]
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(404, "User not found")
-    
-    return user
-
-
 @router.get("/categories", dependencies=[Depends(auth.access_token_required)])
-def get_statistic( request: Request, db: Session = Depends(get_db), category_type: Optional[str] = Query(None)):
+def get_statistic(
+    request: Request,
+    db: Session = Depends(get_snapshot_db),
+    category_type: str | None = Query(None),
+    currency: str | None = Query(
+        None, pattern=r"^[A-Z]{3}$", description="Валюта итогов (по умолчанию BASE_CURRENCY)"
+    ),
+):
     """
     Получить статистику по всем категориям пользователя (Доходы, Расходы).
     """
 
     user = get_current_user(request, db)
-    logger.debug(f"Categories endpoint activated for user {user.email}")
-    
-    query = db.query(Transaction).filter(Transaction.user_id == user.id)
-    transactions = query.all()
-    
-    total_expenses = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user.id, Category.type == "Расход"
-    ).join(Category, Transaction.category_id == Category.id).scalar() or 0
-    
-    total_income = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user.id, Category.type == "Доход"
-    ).join(Category, Transaction.category_id == Category.id).scalar() or 0
-    
+    logger.debug("Categories endpoint activated for user %s", user.email)
+    return category_statistics(db, user, category_type, currency)
 
-    category_stats = {}
-    for transaction in transactions:
-        cat_id = transaction.category_id
-        cat_type = transaction.category.type
-        
-        if category_type and cat_type != category_type:
-            continue
-        
-        if cat_id not in category_stats:
-            category_stats[cat_id] = {
-                "category_id": cat_id,
-                "category_name": transaction.category.name,
-                "category_type": cat_type,
-                "amount": 0,
-                "count": 0
-            }
-        category_stats[cat_id]["amount"] += transaction.amount
-        category_stats[cat_id]["count"] += 1
+
+def category_statistics(
+    db: Session, user: User, category_type: str | None, currency: str | None
+) -> CategoriesStatsResponse:
+    """Статистика по категориям пользователя (общая для эндпоинта и POST /batch)."""
+    # Один GROUP BY вместо выборки всех транзакций; валюта пересчитывается в SQL
+    currency = currency or settings.base_currency
+    amount = converted_amount(db, currency, date.today())
+    rows = db.query(
+        Category.id,
+        Category.name,
+        Category.type,
+        func.sum(amount),
+        func.count(Transaction.id),
+        func.count(Transaction.id) - func.count(amount),
+    ).select_from(Transaction).join(Category, Transaction.category_id == Category.id).filter(
+        Transaction.user_id == user.id
+    ).group_by(Category.id, Category.name, Category.type).all()
+    if any(row[5] for row in rows):
+        raise MissingExchangeRate()
+    
+    totals = {row[0]: round(row[3]) for row in rows}
+    total_expenses = sum(totals[row[0]] for row in rows if row[2] == "Расход")
+    total_income = sum(totals[row[0]] for row in rows if row[2] == "Доход")
     
     total_filtered = total_expenses if category_type == "Расход" else (
         total_income if category_type == "Доход" else (total_expenses + total_income)
     )
     
     categories = []
-    for cat_data in category_stats.values():
-        percentage = (cat_data["amount"] / total_filtered * 100) if total_filtered != 0 else 0
+    rows = sorted(rows, key=lambda row: totals[row[0]], reverse=True)
+    for cat_id, cat_name, cat_type, _, count, _ in rows:
+        if category_type and cat_type != category_type:
+            continue
+        amount_minor = totals[cat_id]
+        percentage = round(amount_minor * 100 / total_filtered, 2) if total_filtered != 0 else 0
         categories.append(CategoryStatistic(
-            category_id=cat_data["category_id"],
-            category_name=cat_data["category_name"],
-            category_type=cat_data["category_type"],
-            total_amount=cat_data["amount"],
-            transaction_count=cat_data["count"],
+            category_id=cat_id,
+            category_name=cat_name,
+            category_type=cat_type,
+            total_amount=from_minor(amount_minor, currency),
+            transaction_count=count,
             percentage=percentage
         ))
     
-    categories.sort(key=lambda x: x.total_amount, reverse=True)
-    
     return CategoriesStatsResponse(
-        total_expenses=total_expenses,
-        total_income=total_income,
+        currency=currency,
+        total_expenses=from_minor(total_expenses, currency),
+        total_income=from_minor(total_income, currency),
         categories=categories
     )
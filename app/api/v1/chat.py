@@ -1,17 +1,38 @@
 import logging
-import traceback
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+
 import jwt
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.db.database import get_db
-from app.db.models import User, Account
-from app.services.chat_manager import chat_manager
+from app.db.models import Account, User
+from app.services.chat_manager import DASHBOARD_VIEWS, chat_manager
 
 router = APIRouter()
 logger = logging.getLogger("app.chat")
 
+async def _update_subscription(websocket: WebSocket, user_id: int, is_admin: bool, data: dict):
+    """
+    {"subscribe": ["timeseries", "categories"]} / {"unsubscribe": [...]} — события dashboard_delta
+    при изменении операций пользователя (app/services/dashboard.py).
+    """
+    if is_admin:
+        await websocket.send_json({"error": "Dashboard subscriptions are available to users only"})
+        return
+    add, remove = data.get("subscribe") or [], data.get("unsubscribe") or []
+    if not isinstance(add, list) or not isinstance(remove, list):
+        await websocket.send_json({"error": "subscribe/unsubscribe must be lists"})
+        return
+    unknown = set(add) - DASHBOARD_VIEWS
+    if unknown:
+        names = ", ".join(sorted(map(str, unknown)))
+        await websocket.send_json({"error": f"Unknown views: {names}"})
+        return
+    views = chat_manager.subscribe(user_id, add, remove)
+    await websocket.send_json({"status": "subscribed", "views": sorted(views)})
+
+
 @router.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     token = websocket.query_params.get("token")
@@ -43,7 +64,12 @@ async def websocket_chat(websocket: WebSocket):
             return
 
         email = payload["sub"]
-        user_data = db.query(User).join(Account, Account.user_id == User.id).filter(User.email == email).first()
+        user_data = (
+            db.query(User)
+            .join(Account, Account.user_id == User.id)
+            .filter(User.email == email)
+            .first()
+        )
 
         if not user_data:
             await websocket.close(code=1008, reason="User not found")
@@ -51,7 +77,7 @@ async def websocket_chat(websocket: WebSocket):
         
         user_id = user_data.id
         is_admin = user_data.is_admin
-        logger.info(f"User {user_id} connected as {'admin' if is_admin else 'user'}")
+        logger.info("User %s connected as %s", user_id, "admin" if is_admin else "user")
 
         await chat_manager.connect(websocket=websocket, user_id=user_id, is_admin=is_admin)
 
@@ -65,6 +91,10 @@ async def websocket_chat(websocket: WebSocket):
         while True:
             try:
                 data = await websocket.receive_json()
+                if "subscribe" in data or "unsubscribe" in data:
+                    await _update_subscription(websocket, user_id, is_admin, data)
+                    continue
+
                 message = data.get("message")
                 
                 if not message:
@@ -89,18 +119,18 @@ async def websocket_chat(websocket: WebSocket):
                         "message": message
                     })
             except WebSocketDisconnect:
-                logger.info(f"User {user_id} disconnected")
+                logger.info("User %s disconnected", user_id)
                 chat_manager.disconnect(user_id, is_admin)
                 break
             except Exception as e:
-                logger.error(f"Unexpected error: {e}")
-                logger.debug(traceback.format_exc())
+                logger.error("Unexpected error: %s", e)
+                logger.debug("WebSocket error traceback", exc_info=True)
                 break
 
 
     except Exception as e:
-        logger.error(f"Critical WebSocket Error: {e}")
-        logger.debug(traceback.format_exc())
+        logger.error("Critical WebSocket Error: %s", e)
+        logger.debug("WebSocket error traceback", exc_info=True)
         if 'user_id' in locals() and 'is_admin' in locals():
             chat_manager.disconnect(user_id, is_admin)
     finally:
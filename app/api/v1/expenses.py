@@ -1,28 +1,43 @@
 import logging
-from datetime  import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from datetime import UTC, datetime
+
 import jwt
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.exceptions import AccountNotFound, InvalidAmount, NoAccessTokenFound
 from app.core.config import settings
 from app.core.jwt import auth
-from app.db.psycopg import get_connection
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db, get_snapshot_db
 from app.db.models import *
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.schemas.expense import(
+from app.schemas.expense import (
+    CategorizeRequest,
+    CategorySuggestion,
     ExpenseCreate,
-    ExpenseUpdate,
+    ExpenseImport,
+    ExpenseImportResult,
+    ExpenseList,
     ExpenseRead,
-    ExpenseList
+    ExpenseSearchHit,
+    ExpenseSearchPage,
 )
-from app.api.exceptions import NoAccessTokenFound, AccountNotFound
+from app.services.budgets import month_start, publish_alerts, record_spend
+from app.services.categories import DEFAULT_CATEGORY_NAME, get_or_create_category
+from app.services.categorizer import categorizer
+from app.services.dashboard import dashboard_change, publish_changes
+from app.services.idempotency import idempotent_request
+from app.services.search import search_expenses
+from app.services.sync import stamp, tombstone
+from app.utils.money import from_minor, to_minor
 
 router = APIRouter()
 logger = logging.getLogger("app.expenses")
 
 
 @router.get("/expenses", dependencies=[Depends(auth.access_token_required)])
-def get_expenses(request: Request, db: Session = Depends(get_db)):
+def get_expenses(request: Request, db: Session = Depends(get_snapshot_db)):
     access_token = request.cookies.get("my-access-token")
 
     if not access_token:
@@ -43,7 +58,12 @@ def get_expenses(request: Request, db: Session = Depends(get_db)):
     
     account_name = payload["sub"]
 
-    logger.info(f"Get list of expenses for account {account_name}")
+    logger.info("Get list of expenses for account %s", account_name)
+    return list_expenses(db, account_name)
+
+
+def list_expenses(db: Session, account_name: str) -> ExpenseList:
+    """Операции счёта и их сумма (общие для эндпоинта и POST /batch)."""
     account = db.query(Account).filter(Account.name == account_name).first()
 
     if not account:
@@ -53,8 +73,12 @@ def get_expenses(request: Request, db: Session = Depends(get_db)):
     if not expenses_list:
         raise AccountNotFound("No transactions for this account")
     
-    total_result = db.query(func.sum(Transaction.amount)).filter(Transaction.account_id == account.id).scalar()
-    result_expenses = ExpenseList(total=total_result, items=expenses_list)
+    total_minor = db.query(func.sum(Transaction.amount_minor)).filter(
+        Transaction.account_id == account.id
+    ).scalar()
+    result_expenses = ExpenseList(
+        total=from_minor(total_minor or 0, account.currency), items=expenses_list
+    )
     return result_expenses
 
 
@@ -78,31 +102,189 @@ def create_expense(body : ExpenseCreate, request : Request, db: Session = Depend
         raise HTTPException(401, "Not an access token")
     
     email = payload["sub"]
-    user_data = db.query(User).join(Account, Account.user_id == User.id).filter(User.email == email).first()
-    category_data = db.query(Category).filter(Category.name == body.category_name).first()
+    # пользователь и его основной счёт — одним запросом
+    row = db.query(User, Account).join(Account, Account.user_id == User.id).filter(
+        User.email == email
+    ).order_by(Account.id).first()
+    if row is None:
+        raise AccountNotFound()
+    user_data, account = row
+
+    idempotent = idempotent_request(
+        request, db, user_data.id, "POST /expenses", body.model_dump_json()
+    )
+    if idempotent and (replay := idempotent.replay()):
+        return replay
 
-    if category_data is None:
-        new_category = Category(user_id=user_data.id, name=body.category_name, type=body.type, created_at=datetime.now(timezone.utc))
-        db.add(new_category)
-        db.commit()
-        category_data = db.query(Category).filter(Category.name == body.category_name).first()
+    category_id = None
+    if body.category_name is None:
+        # категория не указана — подбираем по истории пользователя
+        suggestion, = categorizer.predict(db, user_data.id, [body.description], body.type)
+        category_id = suggestion.category_id
+    if category_id is None:
+        category_id = get_or_create_category(
+            db, user_data.id, body.category_name or DEFAULT_CATEGORY_NAME, body.type
+        )
 
-    new_transaction = Transaction(user_id=user_data.id, account_id=user_data.accounts[0].id, category_id=category_data.id,
-                                  amount=body.amount, date=body.date, description=body.description, created_at=datetime.now(timezone.utc))
+    try:
+        amount_minor = to_minor(body.amount, account.currency)
+    except ValueError as e:
+        raise InvalidAmount(str(e)) from e
+
+    new_transaction = Transaction(user_id=user_data.id, account_id=account.id,
+                                  category_id=category_id, amount_minor=amount_minor,
+                                  currency=account.currency, date=body.date,
+                                  description=body.description, created_at=datetime.now(UTC))
+    stamp(db, user_data.id, new_transaction)
     db.add(new_transaction)
+    alerts = record_spend(db, user_data.id, category_id, body.date, amount_minor, account.currency)
+    result = {"Create expense": "OK"}
+    if idempotent and (replay := idempotent.record(result)):
+        return replay
     db.commit()
-    logger.info(f"Expense for {email} was created")
-    return {"Create expense": "OK"}
+    publish_alerts(alerts)
+    publish_changes([
+        dashboard_change(user_data.id, body.date, category_id, amount_minor, account.currency)
+    ])
+    if body.category_name is not None:
+        # явно выбранная категория — новый пример для модели пользователя
+        categorizer.invalidate(user_data.id)
+    logger.info("Expense for %s was created", email)
+    return result
+
+
+@router.post("/expenses/import", dependencies=[Depends(auth.access_token_required)])
+def import_expenses(body: ExpenseImport, request: Request, user: User = Depends(get_current_user),
+                    db: Session = Depends(get_db)):
+    """
+    Загрузить пачку операций (выписка банка, перенос из другого приложения) одной транзакцией.
+    С заголовком Idempotency-Key повторная отправка той же пачки не создаёт дублей.
+    """
+    account = db.query(Account).filter(Account.user_id == user.id).order_by(Account.id).first()
+    if account is None:
+        raise AccountNotFound()
+
+    idempotent = idempotent_request(
+        request, db, user.id, "POST /expenses/import", body.model_dump_json()
+    )
+    if idempotent and (replay := idempotent.replay()):
+        return replay
+
+    try:
+        amounts = [to_minor(item.amount, account.currency) for item in body.items]
+    except ValueError as e:
+        raise InvalidAmount(str(e)) from e
+
+    # категории для строк без category_name — одним батчем на тип
+    category_ids: list[int | None] = [None] * len(body.items)
+    for kind in {item.type for item in body.items if item.category_name is None}:
+        positions = [
+            i for i, item in enumerate(body.items)
+            if item.category_name is None and item.type == kind
+        ]
+        texts = [body.items[i].description for i in positions]
+        suggestions = categorizer.predict(db, user.id, texts, kind)
+        for i, suggestion in zip(positions, suggestions, strict=True):
+            category_ids[i] = suggestion.category_id
+    for i, item in enumerate(body.items):
+        if category_ids[i] is None:
+            category_ids[i] = get_or_create_category(
+                db, user.id, item.category_name or DEFAULT_CATEGORY_NAME, item.type
+            )
+
+    now = datetime.now(UTC)
+    transactions = []
+    for item, category_id, amount_minor in zip(body.items, category_ids, amounts, strict=True):
+        transaction = Transaction(user_id=user.id, account_id=account.id, category_id=category_id,
+                                  amount_minor=amount_minor, currency=account.currency,
+                                  date=item.date, description=item.description, created_at=now)
+        stamp(db, user.id, transaction)
+        transactions.append(transaction)
+    db.add_all(transactions)
+    db.flush()
+
+    # бюджеты — одна запись на (категория, месяц), а не на каждую строку
+    spent: dict[tuple, int] = {}
+    for transaction in transactions:
+        key = (transaction.category_id, month_start(transaction.date))
+        spent[key] = spent.get(key, 0) + transaction.amount_minor
+    alerts = []
+    for (category_id, month), amount_minor in spent.items():
+        alerts.extend(record_spend(db, user.id, category_id, month, amount_minor, account.currency))
+
+    result = ExpenseImportResult(
+        imported=len(transactions), ids=[transaction.id for transaction in transactions]
+    )
+    if idempotent and (replay := idempotent.record(result)):
+        return replay
+    db.commit()
+    publish_alerts(alerts)
+    publish_changes([
+        dashboard_change(user.id, transaction.date, transaction.category_id,
+                         transaction.amount_minor, transaction.currency)
+        for transaction in transactions
+    ])
+    if any(item.category_name is not None for item in body.items):
+        categorizer.invalidate(user.id)
+    logger.info("Imported %s expenses for user %s", len(transactions), user.id)
+    return result
+
+
+@router.get("/expenses/search", dependencies=[Depends(auth.access_token_required)])
+def search(
+    user: User = Depends(get_current_user),
+    q: str = Query(
+        ..., min_length=1, max_length=200, description="Слова из описания или названия магазина"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Поиск расходов пользователя по описанию и магазину из чека, по убыванию релевантности.
+    """
+    # лишняя строка показывает, есть ли следующая страница, без COUNT(*)
+    hits = search_expenses(db, user.id, q, limit + 1, offset)
+    items = [
+        ExpenseSearchHit(expense=ExpenseRead.model_validate(transaction), rank=rank)
+        for transaction, rank in hits[:limit]
+    ]
+    return ExpenseSearchPage(items=items, limit=limit, offset=offset, has_more=len(hits) > limit)
+
+
+@router.post("/expenses/categorize", dependencies=[Depends(auth.access_token_required)])
+def categorize(body: CategorizeRequest, user: User = Depends(get_current_user),
+               db: Session = Depends(get_read_db)):
+    """
+    Подобрать категории для пачки строк (импорт выписки, позиции чека после OCR)
+    по истории пользователя. Ничего не сохраняет; category_id = null, если модель не уверена.
+    """
+    texts = [" ".join(filter(None, (item.description, item.merchant_name))) for item in body.items]
+    suggestions = categorizer.predict(db, user.id, texts, body.type)
+    ids = {
+        suggestion.category_id for suggestion in suggestions if suggestion.category_id is not None
+    }
+    names = {}
+    if ids:
+        names = dict(db.query(Category.id, Category.name).filter(Category.id.in_(ids)).all())
+    return [
+        CategorySuggestion(
+            category_id=suggestion.category_id,
+            category_name=names.get(suggestion.category_id),
+            confidence=round(suggestion.confidence, 4),
+        )
+        for suggestion in suggestions
+    ]
 
 
 @router.get("/expenses/{id}", dependencies=[Depends(auth.access_token_required)])
-def get_expense_by_id(id: int, request: Request, db: Session = Depends(get_db)):
+def get_expense_by_id(id: int, request: Request, db: Session = Depends(get_read_db)):
     access_token = request.cookies.get("my-access-token")
     if not access_token:
         raise NoAccessTokenFound()
-    logger.debug(f"Get data of expense with id={id}")
+    logger.debug("Get data of expense with id=%s", id)
     expense = db.query(Transaction).filter(Transaction.id == id).first()
-    return expense
+    return ExpenseRead.model_validate(expense) if expense is not None else None
 
 
 @router.patch("/expenses/{id}", dependencies=[Depends(auth.access_token_required)])
@@ -115,8 +297,14 @@ def delete_expenses(id: int, request: Request, db: Session = Depends(get_db)):
     access_token = request.cookies.get("my-access-token")
     if not access_token:
         raise NoAccessTokenFound()
-    logger.debug(f"Delete expense with id={id}")
+    logger.debug("Delete expense with id=%s", id)
     expense = db.query(Transaction).filter(Transaction.id == id).first()
     db.delete(expense)
+    tombstone(db, expense.user_id, "transaction", expense.id)
+    alerts = record_spend(db, expense.user_id, expense.category_id, expense.date,
+                          -expense.amount_minor, expense.currency)
     db.commit()
+    publish_alerts(alerts)
+    publish_changes([dashboard_change(expense.user_id, expense.date, expense.category_id,
+                                      expense.amount_minor, expense.currency, removed=True)])
     return {f"Delete expense for {id}": "OK"}
@@ -1,12 +1,70 @@
 import logging
+from datetime import UTC, datetime
+from pathlib import Path
+from uuid import uuid4
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, File, Form, Request, UploadFile
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.exceptions import ReceiptTooLarge, UnsupportedReceiptType
+from app.core.config import settings
+from app.core.jwt import auth
+from app.db.database import get_db
+from app.db.models import Receipt, User
+from app.schemas.receipt import ReceiptRead
+from app.services.idempotency import idempotent_request
 
 router = APIRouter()
 logger = logging.getLogger("app.receipts")
 
+ALLOWED_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".webp", ".heic", ".pdf"})
+
+
+@router.post("/receipts", dependencies=[Depends(auth.access_token_required)])
+def add_receipt(
+    request: Request,
+    file: UploadFile = File(...),
+    merchant_name: str | None = Form(None, max_length=255),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Загрузить фото или PDF чека. Файл сохраняется в `RECEIPTS_DIR` под случайным именем,
+    в receipts создаётся запись без операции — её привяжут после распознавания.
+    С заголовком Idempotency-Key повторная загрузка того же файла возвращает ту же запись.
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    if suffix not in ALLOWED_SUFFIXES:
+        raise UnsupportedReceiptType
+    content = file.file.read(settings.receipt_max_bytes + 1)
+    if len(content) > settings.receipt_max_bytes:
+        raise ReceiptTooLarge
+
+    idempotent = idempotent_request(
+        request, db, user.id, "POST /receipts", content + b"\0" + (merchant_name or "").encode()
+    )
+    if idempotent and (replay := idempotent.replay()):
+        return replay
+
+    directory = Path(settings.receipts_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid4().hex}{suffix}"
+    path.write_bytes(content)
+    try:
+        receipt = Receipt(user_id=user.id, file_path=str(path), merchant_name=merchant_name,
+                          created_at=datetime.now(UTC))
+        db.add(receipt)
+        db.flush()
+        result = ReceiptRead.model_validate(receipt)
+        if idempotent and (replay := idempotent.record(result)):
+            # тот же чек уже загружен параллельным запросом — наш файл лишний
+            path.unlink(missing_ok=True)
+            return replay
+        db.commit()
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
 
-@router.post("/receipts")
-def add_receipt():
-    logger.debug("Receipts endpoint activated")
-    return {"Receipt": "OK"}
+    logger.info("Receipt %s uploaded by user %s (%s bytes)", receipt.id, user.id, len(content))
+    return result
@@ -1,6 +1,19 @@
 from fastapi import APIRouter
 
-from . import advice, analytics, auth, categories, expenses, health, receipts, chat
+from . import (
+    admin,
+    advice,
+    analytics,
+    auth,
+    batch,
+    budgets,
+    categories,
+    chat,
+    expenses,
+    health,
+    receipts,
+    sync,
+)
 
 api_router = APIRouter()
 
@@ -11,5 +24,9 @@ api_router.include_router(expenses.router, tags=["expenses"])
 api_router.include_router(receipts.router, tags=["receipts"])
 api_router.include_router(analytics.router, tags=["analytics"])
 api_router.include_router(categories.router, tags=["categories"])
+api_router.include_router(batch.router, tags=["batch"])
+api_router.include_router(budgets.router, tags=["budgets"])
+api_router.include_router(sync.router, tags=["sync"])
 api_router.include_router(advice.router, tags=["advice"])
 api_router.include_router(chat.router, tags=["chat"])
+api_router.include_router(admin.router, tags=["admin"])
@@ -0,0 +1,191 @@
+import logging
+from datetime import UTC, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.exceptions import InvalidAmount, InvalidSyncToken
+from app.core.jwt import auth
+from app.db.database import get_db, get_read_db
+from app.db.models import Account, SyncOperation, Transaction, User
+from app.schemas.expense import ExpenseRead
+from app.schemas.sync import (
+    CategorySyncItem,
+    DeletedItem,
+    SyncChanges,
+    SyncOperationIn,
+    SyncOperationResult,
+    SyncPush,
+    SyncPushResult,
+)
+from app.services.budgets import publish_alerts, record_spend
+from app.services.categories import DEFAULT_CATEGORY_NAME, get_or_create_category
+from app.services.categorizer import categorizer
+from app.services.dashboard import dashboard_change, publish_changes
+from app.services.sync import (
+    START,
+    change_id,
+    changes_since,
+    decode_token,
+    encode_token,
+    stamp,
+    tombstone,
+)
+from app.utils.money import to_minor
+
+router = APIRouter()
+logger = logging.getLogger("app.sync")
+
+
+@router.get("/sync", dependencies=[Depends(auth.access_token_required)])
+def get_changes(
+    user: User = Depends(get_current_user),
+    since: str | None = Query(
+        None, description="Токен из прошлого ответа; без него — полная выгрузка"
+    ),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Операции и категории, созданные, изменённые или удалённые после `since`.
+    Пока `has_more`, клиент повторяет запрос с новым `token`.
+    """
+    try:
+        cursor = decode_token(since) if since else START
+    except ValueError:
+        raise InvalidSyncToken from None
+
+    changes = changes_since(db, user.id, cursor, limit)
+    logger.debug(
+        "Sync for user %s: %s transactions after %s", user.id, len(changes.transactions), cursor
+    )
+    return SyncChanges(
+        token=encode_token(changes.cursor),
+        has_more=changes.has_more,
+        transactions=[
+            ExpenseRead.model_validate(transaction) for transaction in changes.transactions
+        ],
+        categories=[CategorySyncItem.model_validate(category) for category in changes.categories],
+        deleted=[DeletedItem(entity=entity, id=id_) for entity, id_ in changes.deleted],
+    )
+
+
+@router.post("/sync", dependencies=[Depends(auth.access_token_required)])
+def push_changes(
+    body: SyncPush,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Применить пачку изменений, накопленных клиентом офлайн, в одной транзакции.
+    Операция с уже применённым `key` не повторяется (status = duplicate).
+    """
+    account = db.query(Account).filter(Account.user_id == user.id).order_by(Account.id).first()
+    if account is None:
+        raise HTTPException(404, "Account not found")
+    try:
+        amounts = {
+            op.key: to_minor(op.amount, account.currency)
+            for op in body.operations
+            if op.amount is not None
+        }
+    except ValueError as e:
+        raise InvalidAmount(str(e)) from e
+
+    # часы пользователя блокируются первыми: повтор той же пачки дождётся коммита и увидит ключи
+    change_id(db, user.id)
+    applied = dict(
+        db.query(SyncOperation.key, SyncOperation.transaction_id)
+        .filter(
+            SyncOperation.user_id == user.id,
+            SyncOperation.key.in_([op.key for op in body.operations]),
+        )
+        .all()
+    )
+
+    # категории для новых операций без category_name — одним батчем
+    uncategorized = [
+        op for op in body.operations
+        if op.op == "create" and op.category_name is None and op.key not in applied
+    ]
+    suggested = {}
+    for kind in {op.type for op in uncategorized}:
+        ops = [op for op in uncategorized if op.type == kind]
+        suggestions = categorizer.predict(db, user.id, [op.description for op in ops], kind)
+        for op, suggestion in zip(ops, suggestions, strict=True):
+            suggested[op.key] = suggestion.category_id
+
+    results, alerts, changes = [], [], []
+
+    def unspend(transaction: Transaction):
+        alerts.extend(record_spend(db, user.id, transaction.category_id, transaction.date,
+                                   -transaction.amount_minor, transaction.currency))
+        changes.append(dashboard_change(user.id, transaction.date, transaction.category_id,
+                                        transaction.amount_minor, transaction.currency,
+                                        removed=True))
+
+    def spend(transaction: Transaction):
+        alerts.extend(record_spend(db, user.id, transaction.category_id, transaction.date,
+                                   transaction.amount_minor, transaction.currency))
+        changes.append(dashboard_change(user.id, transaction.date, transaction.category_id,
+                                        transaction.amount_minor, transaction.currency))
+
+    def category_for(op: SyncOperationIn) -> int:
+        return suggested.get(op.key) or get_or_create_category(
+            db, user.id, op.category_name or DEFAULT_CATEGORY_NAME, op.type
+        )
+
+    for op in body.operations:
+        if op.key in applied:
+            results.append(SyncOperationResult(key=op.key, status="duplicate", id=applied[op.key]))
+            continue
+
+        if op.op == "create":
+            transaction = Transaction(user_id=user.id, account_id=account.id,
+                                      category_id=category_for(op), amount_minor=amounts[op.key],
+                                      currency=account.currency, date=op.date,
+                                      description=op.description, created_at=datetime.now(UTC))
+            stamp(db, user.id, transaction)
+            db.add(transaction)
+            db.flush()
+            spend(transaction)
+            result = SyncOperationResult(key=op.key, status="applied", id=transaction.id)
+        else:
+            transaction = (
+                db.query(Transaction)
+                .filter(Transaction.id == op.id, Transaction.user_id == user.id)
+                .first()
+            )
+            if transaction is None:
+                result = SyncOperationResult(key=op.key, status="not_found", id=op.id)
+            elif op.op == "delete":
+                unspend(transaction)
+                db.delete(transaction)
+                tombstone(db, user.id, "transaction", transaction.id)
+                result = SyncOperationResult(key=op.key, status="applied", id=transaction.id)
+            else:
+                unspend(transaction)
+                if op.category_name is not None:
+                    transaction.category_id = category_for(op)
+                if op.amount is not None:
+                    transaction.amount_minor = amounts[op.key]
+                if op.date is not None:
+                    transaction.date = op.date
+                if op.description is not None:
+                    transaction.description = op.description
+                stamp(db, user.id, transaction)
+                db.flush()
+                spend(transaction)
+                result = SyncOperationResult(key=op.key, status="applied", id=transaction.id)
+
+        applied[op.key] = result.id
+        db.add(SyncOperation(user_id=user.id, key=op.key, status=result.status,
+                             transaction_id=result.id, created_at=datetime.now(UTC)))
+        results.append(result)
+
+    db.commit()
+    publish_alerts(alerts)
+    publish_changes(changes)
+    logger.info("Applied %s sync operations for user %s", len(body.operations), user.id)
+    return SyncPushResult(results=results)
@@ -13,6 +13,8 @@ class Settings(BaseSettings):
     db_name: str
     db_port: str
     database_url: str
+    database_replica_url: str | None = None
+    replica_sticky_seconds: float = 5.0
 
     jwt_secret: str = "dev_tp_proj"
     jwt_alg: str = "HS256"
@@ -23,5 +25,84 @@ class Settings(BaseSettings):
     smtp_login: str
     smtp_password: str
 
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_s: float = 30.0
+    db_create_all: bool = True
+    db_warmup_connections: int = 5
+    lazy_imports: bool = False
+
+    web_host: str = "0.0.0.0"
+    web_workers: int | None = None  # по умолчанию — число CPU
+    web_max_requests: int = 10_000  # 0 — без перезапуска воркеров
+    web_max_requests_jitter: int = 1_000
+    web_graceful_timeout_s: int = 30
+    web_keepalive_s: int = 5
+    threadpool_size: int | None = None  # по умолчанию — db_pool_size + db_max_overflow
+    chat_fanout: str = "auto"  # auto | local | postgres
+    # параллельных подзапросов POST /batch (соединений отдельного пула)
+    batch_max_concurrency: int = 4
+
+    log_level: str | None = None
+    log_json: bool = False
+    log_dir: str = "logs"
+    log_per_process: bool = False
+
+    metrics_enabled: bool = True
+
+    sql_slow_query_ms: float = 200.0
+    sql_profiling_enabled: bool = False
+    sql_n_plus_one_threshold: int = 5
+
+    reaper_batch_size: int = 5000
+    reaper_max_batches: int = 200
+    refresh_token_reaper_interval_s: float = 3600.0
+    email_code_sweeper_interval_s: float = 600.0
+    email_code_retention_minutes: int = 10
+    idempotency_key_ttl_s: float = 86400.0
+    idempotency_cache_size: int = 10_000  # сохранённых ответов в памяти воркера
+    idempotency_sweeper_interval_s: float = 3600.0
+    # сколько клиент может повторять офлайн-пачку POST /sync
+    sync_operation_ttl_s: float = 30 * 86400.0
+    sync_operation_sweeper_interval_s: float = 3600.0
+
+    receipts_dir: str = "receipts"
+    receipt_max_bytes: int = 10 * 1024 * 1024
+
+    base_currency: str = "BYN"  # валюта итогов аналитики; к ней заданы курсы в exchange_rates
+    exchange_rate_cache_ttl_s: float = 300.0
+
+    partition_months_ahead: int = 3
+    partition_maintenance_interval_s: float = 86400.0
+    partition_archive_dir: str = "archive"
+
+    category_cache_size: int = 10_000  # пользователей, чьи категории (name → id) держим в памяти
+
+    dashboard_push_window_s: float = 1.0  # изменения дашборда за окно уходят одним событием
+
+    # % лимита, при пересечении которых приходит уведомление
+    budget_alert_thresholds: list[int] = [80, 100]
+
+    categorizer_cache_size: int = 1000  # моделей пользователей в памяти воркера
+    categorizer_ttl_s: float = 600.0
+    categorizer_max_history: int = 5000
+    categorizer_min_confidence: float = 0.5
+
+    forecast_history_days: int = 182  # дневные расходы, на которых строится прогноз
+    forecast_alpha: float = 0.1  # вес последнего дня в экспоненциальном сглаживании
+    forecast_cache_size: int = 10_000  # прогнозов пользователей в памяти воркера
+
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # memory | database
+    rate_limit_max_keys: int = 100_000
+    rate_limit_trust_forwarded: bool = False
+    rate_limit_bucket_ttl_s: float = 3600.0
+    rate_limit_sweeper_interval_s: float = 900.0
+
+    profiler_max_seconds: float = 30.0
+    profiler_sampler_enabled: bool = False
+    profiler_sampler_interval_s: float = 1.0
+    profiler_sampler_buffer_size: int = 600
+
 
 settings = Settings()
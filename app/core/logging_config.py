@@ -1,69 +1,175 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
 
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "console": {
-            "format": "[{levelname}] {asctime} {name}: {message}",
-            "style": "{",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-        "file": {
-            "format": "{asctime} | {levelname:<8} | {name} | {pathname}:{lineno} | {message}",
-            "style": "{",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-        "access": {
-            "format": "{asctime} | {levelname:<8} | access | {message}",
-            "style": "{",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
+from app.core.config import settings
+from app.core.request_context import get_request_id
+
+PRODUCTION_ENVS = {"prod", "production"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в запись request_id текущего HTTP-запроса."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def get_log_level() -> str:
+    if settings.log_level:
+        return settings.log_level.upper()
+    return "INFO" if settings.app_env.lower() in PRODUCTION_ENVS else "DEBUG"
+
+
+def build_logging_config() -> dict:
+    level = get_log_level()
+    json_formatter = {"()": JsonFormatter, "datefmt": "%Y-%m-%dT%H:%M:%S"}
+    # RotatingFileHandler не умеет ротировать общий файл из нескольких процессов
+    suffix = f".{os.getpid()}" if settings.log_per_process else ""
+
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "filters": {
+            "request_id": {"()": RequestIdFilter},
         },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "level": "DEBUG",
-            "formatter": "console",
+        "formatters": {
+            "console": json_formatter if settings.log_json else {
+                "format": "[{levelname}] {asctime} {name} [{request_id}]: {message}",
+                "style": "{",
+                "datefmt": "%Y-%m-%d %H:%M:%S",
+            },
+            "file": json_formatter if settings.log_json else {
+                "format": "{asctime} | {levelname:<8} | {name} | {request_id} | "
+                          "{pathname}:{lineno} | {message}",
+                "style": "{",
+                "datefmt": "%Y-%m-%d %H:%M:%S",
+            },
+            "access": {
+                "format": "{asctime} | {levelname:<8} | access | {message}",
+                "style": "{",
+                "datefmt": "%Y-%m-%d %H:%M:%S",
+            },
         },
-        "file_app": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": "DEBUG",
-            "formatter": "file",
-            "filename": "logs/app.log",
-            "maxBytes": 5 * 1024 * 1024,
-            "backupCount": 5,
-            "encoding": "utf-8",
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "level": level,
+                "formatter": "console",
+                "filters": ["request_id"],
+            },
+            "file_app": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "level": level,
+                "formatter": "file",
+                "filters": ["request_id"],
+                "filename": f"{settings.log_dir}/app{suffix}.log",
+                "maxBytes": 5 * 1024 * 1024,
+                "backupCount": 5,
+                "encoding": "utf-8",
+            },
+            "file_access": {
+                "class": "logging.handlers.RotatingFileHandler",
+                "level": "INFO",
+                "formatter": "access",
+                "filename": f"{settings.log_dir}/access{suffix}.log",
+                "maxBytes": 5 * 1024 * 1024,
+                "backupCount": 3,
+                "encoding": "utf-8",
+            },
         },
-        "file_access": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": "DEBUG",
-            "formatter": "access",
-            "filename": "logs/access.log",
-            "maxBytes": 5 * 1024 * 1024,
-            "backupCount": 3,
-            "encoding": "utf-8",
+        "loggers": {
+            "app": {
+                "handlers": ["console", "file_app"],
+                "level": level,
+                "propagate": False,
+            },
+            "uvicorn": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+            "uvicorn.error": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+            "uvicorn.access": {"level": "INFO", "handlers": ["file_access"], "propagate": False},
+            "asyncio": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+            "passlib": {"level": "WARNING", "handlers": ["console"], "propagate": False},
+            "sqlalchemy": {"level": "WARNING", "handlers": ["console"], "propagate": False},
         },
-    },
-    "loggers": {
-        "app": {
-            "handlers": ["console", "file_app"],
-            "level": "DEBUG",
-            "propagate": False,
+        "root": {
+            "level": "WARNING",
+            "handlers": ["console"],
         },
-        "uvicorn": {"level": "WARNING", "handlers": ["console"], "propagate": False},
-        "uvicorn.error": {"level": "WARNING", "handlers": ["console"], "propagate": False},
-        "uvicorn.access": {"level": "INFO", "handlers": ["file_access"], "propagate": False},
-        "asyncio": {"level": "WARNING", "handlers": ["console"], "propagate": False},
-        "passlib": {"level": "WARNING", "handlers": ["console"], "propagate": False},
-        "sqlalchemy": {"level": "WARNING", "handlers": ["console"], "propagate": False},
-    },
-    "root": {
-        "level": "WARNING",
-        "handlers": ["console"],
-    },
-}
+    }
+
+
+# Логгеры с основным потоком записей: их обработчики переносятся в фоновый поток
+QUEUED_LOGGERS = ("app", "uvicorn.access")
+
+_listeners: list[QueueListener] = []
+
+
+class RecordQueueHandler(QueueHandler):
+    """
+    QueueHandler, который оставляет в записи exc_info. Стандартный prepare() вклеивает
+    traceback в msg и обнуляет exc_info — тогда JsonFormatter не выдаёт поле exc_info.
+    Очередь не покидает процесс, поэтому traceback форматируют обработчики слушателя.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # аргументы подставляются в потоке запроса: к моменту записи они могут измениться
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _move_to_queue(logger: logging.Logger) -> None:
+    handlers = list(logger.handlers)
+    if not handlers:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = RecordQueueHandler(log_queue)
+    # request_id берётся из contextvars, поэтому фильтр должен отработать в потоке запроса
+    queue_handler.addFilter(RequestIdFilter())
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def stop_logging() -> None:
+    """Дописать записи из очередей и остановить фоновые потоки логирования."""
+    while _listeners:
+        _listeners.pop().stop()
 
 
 def setup_logging():
-    dictConfig(LOGGING_CONFIG)
+    stop_logging()
+    dictConfig(build_logging_config())
+    for name in QUEUED_LOGGERS:
+        _move_to_queue(logging.getLogger(name))
+
+
+atexit.register(stop_logging)
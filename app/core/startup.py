@@ -0,0 +1,129 @@
+import importlib
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import configure_mappers
+
+logger = logging.getLogger("app.startup")
+
+# модули, которые приложение импортирует лениво (при первом использовании);
+# при LAZY_IMPORTS=false они загружаются на старте, а не первым запросом
+HEAVY_MODULES = ("passlib.context", "psycopg")
+
+
+def _process_age() -> float | None:
+    """Секунды с момента запуска процесса (Linux, /proc); None, если недоступно."""
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class ColdStart:
+    """Время холодного старта: запуск процесса -> готовность -> первый обслуженный запрос."""
+
+    def __init__(self):
+        self.startup_seconds: float | None = None
+        self.ready_seconds: float | None = None
+        self.first_request_seconds: float | None = None
+
+    def mark_ready(self, startup_seconds: float) -> None:
+        self.startup_seconds = startup_seconds
+        self.ready_seconds = _process_age()
+
+    def mark_first_request(self) -> None:
+        if self.first_request_seconds is None:
+            self.first_request_seconds = _process_age()
+            logger.info("First request served %.3fs after process start",
+                        self.first_request_seconds or 0.0)
+
+    def samples(self) -> list[tuple[tuple[str], float]]:
+        phases = {
+            "startup": self.startup_seconds,
+            "ready": self.ready_seconds,
+            "first_request": self.first_request_seconds,
+        }
+        return [((phase,), value) for phase, value in phases.items() if value is not None]
+
+
+cold_start = ColdStart()
+
+
+class FirstRequestMiddleware:
+    """Отмечает завершение первого HTTP-запроса процесса."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and cold_start.first_request_seconds is None:
+            cold_start.mark_first_request()
+
+
+def bootstrap_schema(engine: Engine, metadata, attempts: int = 3) -> None:
+    """
+    CREATE TABLE IF NOT EXISTS для всех моделей. На Postgres под advisory-локом,
+    чтобы параллельно стартующие воркеры не создавали таблицы одновременно;
+    на SQLite такой лок недоступен — проигравший гонку воркер просто повторяет проверку.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            with engine.begin() as conn:
+                if conn.dialect.name == "postgresql":
+                    conn.execute(
+                        text("SELECT pg_advisory_xact_lock(hashtext('app.bootstrap_schema'))")
+                    )
+                    conn.execute(text("CREATE SCHEMA IF NOT EXISTS main"))
+                metadata.create_all(bind=conn)
+            return
+        except DBAPIError:
+            if attempt == attempts:
+                raise
+            logger.info("Schema bootstrap raced with another worker, retrying")
+            time.sleep(0.1 * attempt)
+
+
+def warm_up_pool(engine: Engine, connections: int) -> int:
+    """Открыть `connections` соединений пула заранее, чтобы первый запрос не платил за connect."""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+def preload_heavy_modules() -> None:
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.warning("Module %s is not available for preloading", name)
+    from app.utils.security import get_pwd_context
+
+    # загрузка bcrypt-бэкенда passlib без вычисления хеша
+    get_pwd_context().handler("bcrypt_sha256").get_backend()
+
+
+def run_startup(engine: Engine, metadata, *, create_all: bool, warm_connections: int,
+                lazy_imports: bool) -> float:
+    started = time.perf_counter()
+    configure_mappers()
+    if create_all:
+        bootstrap_schema(engine, metadata)
+    if warm_connections > 0:
+        warm_up_pool(engine, warm_connections)
+    if not lazy_imports:
+        preload_heavy_modules()
+    return time.perf_counter() - started
@@ -1,14 +1,79 @@
-from app.core.config import settings
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.db.instrumentation import instrument_engine
+from app.db.routing import RoutingSession, prefer_primary
 
 url = settings.database_url
-database_engine = create_engine(url)
+
+
+def _pool_options(url: str) -> dict:
+    # SQLite в тестах использует собственные пулы без этих параметров
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+    }
+
+
+database_engine = create_engine(url, **_pool_options(url))
+instrument_engine(database_engine)
+
+replica_url = settings.database_replica_url
+replica_engine = create_engine(replica_url, **_pool_options(replica_url)) if replica_url else None
+if replica_engine is not None:
+    instrument_engine(replica_engine)
 
 def get_db():
     db = Session(bind=database_engine)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _read_session() -> Session:
+    if replica_engine is None:
+        return Session(bind=database_engine)
+    return RoutingSession(database_engine, replica_engine, use_primary=prefer_primary.get())
+
+
+def get_read_db():
+    """
+    Сессия для read-only эндпоинтов: читает с реплики, если она настроена
+    и клиент не менял данные последние `replica_sticky_seconds` секунд.
+    """
+    db = _read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# read-only REPEATABLE READ: все запросы транзакции видят один снимок данных
+SNAPSHOT_READ = {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+
+
+def begin_snapshot_read(db: Session) -> None:
+    """
+    Начать в `db` транзакцию SNAPSHOT_READ (только Postgres; SQLite и так
+    сериализует транзакции). Вызывается до первого запроса сессии.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options=SNAPSHOT_READ)
+
+
+def get_snapshot_db():
+    """
+    Как get_read_db, но все запросы эндпоинта (пользователь, курсы, агрегаты)
+    выполняются в одной read-only транзакции и согласованы между собой.
+    """
+    db = _read_session()
+    try:
+        begin_snapshot_read(db)
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,34 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import SQL_DURATION, SQL_STATEMENTS
+from app.db.profiling import record_statement
+
+_KNOWN_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def _statement_verb(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in _KNOWN_VERBS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    verb = _statement_verb(statement)
+    SQL_STATEMENTS.inc((verb,))
+    SQL_DURATION.observe(elapsed, (verb,))
+    record_statement(statement, elapsed, cursor.rowcount)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подписаться на события курсора движка: SQL-метрики, slow-query лог, профиль запроса."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
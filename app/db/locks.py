@@ -0,0 +1,26 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+@contextmanager
+def try_advisory_lock(engine: Engine, name: str) -> Iterator[bool]:
+    """
+    Сессионный advisory-лок Postgres на время блока: True — лок получен,
+    False — его держит другой процесс. На других СУБД (один процесс) всегда True.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"),
+                                {"name": name}).scalar()
+        conn.commit()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": name})
+                conn.commit()
@@ -1,7 +1,23 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Boolean
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship
 
+from app.db import sqlite_search
+
 
 class Base(DeclarativeBase): pass
 
@@ -20,6 +36,7 @@ class User(Base):
     receipts = relationship('Receipt', back_populates='user')
     transactions = relationship('Transaction', back_populates='user')
     refresh_tokens = relationship('RefreshToken', back_populates='user')
+    budgets = relationship('Budget', back_populates='user')
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -36,13 +53,18 @@ class Account(Base):
 
 class Category(Base):
     __tablename__ = "categories"
-    __table_args__ = {'schema': 'main'}
+    __table_args__ = (
+        UniqueConstraint('user_id', 'name', 'type', name='u_categories_user_name_type'),
+        {'schema': 'main'},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), nullable=False)
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False, default=datetime.now())
+    change_id = Column(BigInteger, nullable=False, default=0)  # см. app.services.sync
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
 
     user = relationship('User', back_populates='categories')
     transactions = relationship('Transaction', back_populates='category')
@@ -55,10 +77,13 @@ class Transaction(Base):
     user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), nullable=False)
     account_id = Column(Integer, ForeignKey('main.accounts.id', ondelete='CASCADE'), nullable=False)
     category_id = Column(Integer, ForeignKey('main.categories.id', ondelete='CASCADE'), nullable=False)
-    amount = Column(Integer, nullable=False)
+    amount_minor = Column(BigInteger, nullable=False)  # копейки/центы, см. app.utils.money
+    currency = Column(String(3), nullable=False, default="BYN")
     date = Column(DateTime)
     description = Column(Text)
     created_at = Column(DateTime, nullable=False, default=datetime.now())
+    change_id = Column(BigInteger, nullable=False, default=0)  # см. app.services.sync
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
 
     receipts = relationship('Receipt', back_populates="transaction")
     user = relationship('User', back_populates='transactions')
@@ -74,20 +99,24 @@ class Receipt(Base):
     transaction_id = Column(Integer, ForeignKey("main.transactions.id", ondelete='SET NULL'))
     file_path = Column(String, nullable=False, default=None)
     merchant_name = Column(String)
-    total_amount = Column(Numeric(15, 2))
+    total_amount_minor = Column(BigInteger)
+    currency = Column(String(3), nullable=False, default="BYN")
     transaction_date = Column(DateTime)
     created_at = Column(DateTime, nullable=False, default=datetime.now())
 
     user = relationship('User', back_populates='receipts')
     transaction = relationship('Transaction', back_populates='receipts')
 
+# полнотекстовый поиск: в Postgres — 010_transactions_search.sql, в SQLite — FTS5
+sqlite_search.install(Transaction.__table__, Receipt.__table__)
+
 class EmailCode(Base):
     __tablename__ = "email_codes"
     __table_args__ = {'schema': 'main'}   
 
     email = Column(String, primary_key=True, index=True)
     code_hash = Column(String, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     attempts_left = Column(Integer, nullable=False, default=5)
     used = Column(Boolean, nullable=False, default=False)
     verified_at = Column(DateTime, default=None)
@@ -100,9 +129,124 @@ class RefreshToken(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), nullable=False)
     token_hash = Column(String, nullable=False)
-    jti = Column(String, nullable=False)
+    jti = Column(String, nullable=False, unique=True, index=True)
     created_at = Column(DateTime, nullable=False, default=datetime.now())
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     revoked = Column(Boolean, nullable=False, default=False)
 
-    user = relationship('User', back_populates='refresh_tokens')
\ No newline at end of file
+    user = relationship('User', back_populates='refresh_tokens')
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {'schema': 'main'}
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+    allowed = Column(Boolean, nullable=False, default=True)
+
+class Budget(Base):
+    __tablename__ = "budgets"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'category_id', name='u_budgets_user_category'),
+        {'schema': 'main'},
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), nullable=False)
+    category_id = Column(Integer, ForeignKey('main.categories.id', ondelete='CASCADE'), nullable=False)
+    amount_minor = Column(BigInteger, nullable=False)  # месячный лимит
+    currency = Column(String(3), nullable=False)
+    since = Column(Date, nullable=False)  # первый месяц, за который ведётся BudgetSpend
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    user = relationship('User', back_populates='budgets')
+    category = relationship('Category')
+
+class BudgetSpend(Base):
+    __tablename__ = "budget_spend"
+    __table_args__ = {'schema': 'main'}
+
+    budget_id = Column(Integer, ForeignKey('main.budgets.id', ondelete='CASCADE'), primary_key=True)
+    month = Column(Date, primary_key=True)
+    spent_minor = Column(BigInteger, nullable=False, default=0)
+    alerted_percent = Column(Integer, nullable=False, default=0)
+
+class MonthlyRollup(Base):
+    __tablename__ = "monthly_rollups"
+    __table_args__ = {'schema': 'main'}
+
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), primary_key=True)
+    month = Column(Date, primary_key=True)
+    # в базовой валюте, см. app.services.monthly
+    expenses_minor = Column(BigInteger, nullable=False)
+    income_minor = Column(BigInteger, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+class SpendForecast(Base):
+    __tablename__ = "spend_forecasts"
+    __table_args__ = {'schema': 'main'}
+
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), primary_key=True)
+    as_of = Column(Date, nullable=False)
+    change_id = Column(BigInteger, nullable=False)  # sync_clock пользователя на момент расчёта
+    payload = Column(Text, nullable=False)  # JSON, см. app.services.forecast.Forecast
+    computed_at = Column(DateTime, nullable=False)
+
+class SyncClock(Base):
+    __tablename__ = "sync_clock"
+    __table_args__ = {'schema': 'main'}
+
+    # последний номер изменения данных пользователя; строка блокируется
+    # до коммита пишущей транзакции
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), primary_key=True)
+    change_id = Column(BigInteger, nullable=False)
+
+class SyncTombstone(Base):
+    __tablename__ = "sync_tombstones"
+    __table_args__ = {'schema': 'main'}
+
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), primary_key=True)
+    change_id = Column(BigInteger, primary_key=True)
+    entity = Column(String(16), primary_key=True)  # transaction | category
+    entity_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.now)
+
+class SyncOperation(Base):
+    __tablename__ = "sync_operations"
+    __table_args__ = {'schema': 'main'}
+
+    # применённые операции POST /sync по ключу идемпотентности клиента
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    status = Column(String(16), nullable=False)
+    transaction_id = Column(Integer)
+    created_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'key', name='u_idempotency_keys_user_key'),
+        {'schema': 'main'},
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('main.users.id', ondelete='CASCADE'), nullable=False)
+    key = Column(String(128), nullable=False)  # заголовок Idempotency-Key
+    scope = Column(String(64), nullable=False)  # эндпоинт, например "POST /expenses"
+    fingerprint = Column(String(64), nullable=False)  # sha256 тела запроса
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # JSON ответа
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class ExchangeRate(Base):
+    __tablename__ = "exchange_rates"
+    __table_args__ = {'schema': 'main'}
+
+    # сколько единиц базовой валюты (settings.base_currency) стоит 1 единица currency,
+    # начиная с date
+    currency = Column(String(3), primary_key=True)
+    date = Column(Date, primary_key=True)
+    rate = Column(Numeric(18, 8), nullable=False)
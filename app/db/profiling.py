@@ -0,0 +1,140 @@
+import json
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+PROFILE_HEADER = "x-sql-profile"
+PROFILE_QUERY_PARAM = "sql_profile"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.I)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Нормализовать SQL: литералы и параметры → ?, списки IN (...) схлопываются."""
+    result = _COMMENTS.sub(" ", statement)
+    result = _STRINGS.sub("?", result)
+    result = _PARAMS.sub("?", result)
+    result = _NUMBERS.sub("?", result)
+    result = _IN_LISTS.sub("IN (...)", result)
+    return _SPACES.sub(" ", result).strip()
+
+
+class RequestSQLProfile:
+    """Статистика SQL-запросов, выполненных в рамках одного HTTP-запроса."""
+
+    def __init__(self, scope: dict, detailed: bool = False):
+        self.scope = scope
+        self.detailed = detailed
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints: Counter[str] = Counter()
+        self.fingerprint_time: Counter[str] = Counter()
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        if route is not None:
+            return f"{self.scope.get('method', '')} {route.path}"
+        return f"{self.scope.get('method', '')} {self.scope.get('path', '')}"
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if self.detailed:
+            key = fingerprint(statement)
+            self.fingerprints[key] += 1
+            self.fingerprint_time[key] += elapsed
+
+    def n_plus_one_suspects(self) -> list[dict]:
+        threshold = settings.sql_n_plus_one_threshold
+        return [
+            {"fingerprint": key, "count": count,
+             "total_ms": round(self.fingerprint_time[key] * 1000, 2)}
+            for key, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def summary(self) -> dict:
+        slowest = sorted(self.fingerprint_time.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "route": self.route,
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 2),
+            "n_plus_one": self.n_plus_one_suspects(),
+            "slowest": [
+                {"fingerprint": key, "count": self.fingerprints[key],
+                 "total_ms": round(spent * 1000, 2)}
+                for key, spent in slowest
+            ],
+        }
+
+
+current_profile: ContextVar[RequestSQLProfile | None] = ContextVar("current_sql_profile",
+                                                                  default=None)
+
+
+def record_statement(statement: str, elapsed: float, rowcount: int) -> None:
+    """Вызывается из after_cursor_execute: учёт в профиле запроса и slow-query лог."""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+
+    if elapsed * 1000 >= settings.sql_slow_query_ms:
+        route = profile.route if profile is not None else "-"
+        logger.warning(
+            "Slow query %.1f ms, rows=%s, route=%s: %s",
+            elapsed * 1000, rowcount, route, fingerprint(statement),
+        )
+
+
+def _profile_requested(scope: dict) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER.encode() and value.strip() in (b"1", b"true"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get(PROFILE_QUERY_PARAM, [""])[0] in ("1", "true")
+
+
+class SQLProfileMiddleware:
+    """
+    Привязывает SQL-запросы к маршруту, который их выполнил.
+    Если профилирование разрешено настройками и клиент прислал заголовок
+    `X-SQL-Profile: 1` (или `?sql_profile=1`), сводка возвращается в заголовке ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detailed = settings.sql_profiling_enabled and _profile_requested(scope)
+        profile = RequestSQLProfile(scope, detailed=detailed)
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if detailed and message["type"] == "http.response.start":
+                summary = profile.summary()
+                logger.debug("SQL profile: %s", summary)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-profile", json.dumps(summary).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
@@ -1,9 +1,9 @@
-import psycopg
-
 from app.core.config import settings
 
 
 def get_connection():
+    import psycopg
+
     return psycopg.connect(
         host=settings.db_host,
         port=int(settings.db_port),
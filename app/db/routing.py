@@ -0,0 +1,78 @@
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+
+from sqlalchemy import Delete, Insert, Update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+STICKY_COOKIE = "db-primary-until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# True — запрос должен читать с primary (клиент недавно что-то изменил)
+prefer_primary: ContextVar[bool] = ContextVar("prefer_primary", default=False)
+
+
+class RoutingSession(Session):
+    """
+    Сессия для read-only зависимостей: SELECT уходят на реплику, запись
+    (flush, INSERT/UPDATE/DELETE) — на primary. После первой записи сессия
+    до конца живёт на primary, чтобы видеть свои изменения.
+    """
+
+    def __init__(self, primary: Engine, replica: Engine, use_primary: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.primary = primary
+        self.replica = replica
+        self.use_primary = use_primary
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.use_primary = True
+        return self.primary if self.use_primary else self.replica
+
+
+class ReadYourWritesMiddleware:
+    """
+    После успешного изменяющего запроса ставит cookie со временем, до которого
+    чтения этого клиента идут на primary (пока реплика догоняет). Входящую cookie
+    переводит в `prefer_primary` для get_read_db.
+    """
+
+    def __init__(self, app, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = prefer_primary.set(_sticky_until(scope) > time.time())
+        mutating = scope["method"] not in SAFE_METHODS
+
+        async def send_wrapper(message):
+            if mutating and message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.sticky_seconds
+                cookie = (f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                          "Path=/; HttpOnly")
+                message["headers"] = [*message.get("headers", []),
+                                      (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            prefer_primary.reset(token)
+
+
+def _sticky_until(scope) -> float:
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
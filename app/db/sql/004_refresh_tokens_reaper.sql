@@ -0,0 +1,4 @@
+-- refresh-токены: CAS по jti (уникальный индекс idx_refresh_jti уже есть в 003)
+-- и индексы для пакетного удаления истёкших/отозванных строк
+CREATE INDEX IF NOT EXISTS idx_refresh_expires ON main.refresh_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_revoked ON main.refresh_tokens(id) WHERE revoked;
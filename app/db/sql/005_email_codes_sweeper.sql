@@ -0,0 +1,2 @@
+-- email_codes: индекс для фоновой чистки истёкших кодов
+CREATE INDEX IF NOT EXISTS idx_email_codes_expires ON main.email_codes(expires_at);
@@ -0,0 +1,8 @@
+-- общее хранилище token bucket'ов для RATE_LIMIT_BACKEND=database (несколько воркеров/инстансов)
+CREATE TABLE IF NOT EXISTS main.rate_limit_buckets (
+  key         TEXT PRIMARY KEY,
+  tokens      DOUBLE PRECISION NOT NULL,
+  updated_at  DOUBLE PRECISION NOT NULL,
+  allowed     BOOLEAN NOT NULL DEFAULT TRUE
+);
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated ON main.rate_limit_buckets(updated_at);
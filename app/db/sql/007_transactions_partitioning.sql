@@ -0,0 +1,83 @@
+-- main.transactions -> декларативное партиционирование по месяцам (RANGE по date).
+-- Для существующей БД: psql -f app/db/sql/007_transactions_partitioning.sql
+-- (данные переносятся в одной транзакции, таблица на это время заблокирована).
+BEGIN;
+
+-- Создаёт помесячные партиции [from_month; from_month + months), возвращает число созданных.
+CREATE OR REPLACE FUNCTION main.ensure_transaction_partitions(from_month DATE, months INT)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+  month_start DATE := date_trunc('month', from_month)::date;
+  partition_name TEXT;
+  created INT := 0;
+BEGIN
+  FOR i IN 0..months - 1 LOOP
+    partition_name := format('transactions_y%sm%s', to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+    IF to_regclass(format('main.%I', partition_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE main.%I PARTITION OF main.transactions FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, (month_start + INTERVAL '1 month')::date
+      );
+      created := created + 1;
+    END IF;
+    month_start := (month_start + INTERVAL '1 month')::date;
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+DO $$
+DECLARE
+  first_month DATE;
+  months INT;
+BEGIN
+  -- уже партиционирована (повторный запуск миграции)
+  IF (SELECT relkind FROM pg_class WHERE oid = 'main.transactions'::regclass) = 'p' THEN
+    RETURN;
+  END IF;
+
+  ALTER TABLE main.transactions RENAME TO transactions_legacy;
+  ALTER TABLE main.transactions_legacy RENAME CONSTRAINT transactions_pkey TO transactions_legacy_pkey;
+  ALTER SEQUENCE main.transactions_id_seq OWNED BY NONE;
+  -- FK на партиционированную таблицу возможен только по ключу с date; связь поддерживает ORM
+  ALTER TABLE main.receipts DROP CONSTRAINT IF EXISTS receipts_transaction_id_fkey;
+
+  CREATE TABLE main.transactions (
+    id           INT NOT NULL DEFAULT nextval('main.transactions_id_seq'),
+    user_id      INT NOT NULL REFERENCES main.users(id)      ON DELETE CASCADE,
+    account_id   INT NOT NULL REFERENCES main.accounts(id)   ON DELETE CASCADE,
+    category_id  INT NOT NULL REFERENCES main.categories(id) ON DELETE CASCADE,
+    amount       NUMERIC(15,2) NOT NULL,
+    date         DATE NOT NULL,
+    description  TEXT,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, date)
+  ) PARTITION BY RANGE (date);
+  ALTER SEQUENCE main.transactions_id_seq OWNED BY main.transactions.id;
+
+  -- строки вне созданных месяцев не теряются, но ensure_transaction_partitions
+  -- должен создавать партиции заранее, чтобы default оставалась пустой
+  CREATE TABLE main.transactions_default PARTITION OF main.transactions DEFAULT;
+
+  SELECT date_trunc('month', coalesce(min(date), current_date))::date INTO first_month FROM main.transactions_legacy;
+  months := (extract(year FROM age(date_trunc('month', current_date), first_month)) * 12
+             + extract(month FROM age(date_trunc('month', current_date), first_month)))::int + 4;
+  PERFORM main.ensure_transaction_partitions(first_month, months);
+
+  INSERT INTO main.transactions (id, user_id, account_id, category_id, amount, date, description, created_at)
+  SELECT id, user_id, account_id, category_id, amount, date, description, created_at
+  FROM main.transactions_legacy;
+  DROP TABLE main.transactions_legacy;
+END;
+$$;
+
+-- индексы создаются после переноса данных и наследуются всеми партициями
+CREATE INDEX IF NOT EXISTS idx_tx_user_date ON main.transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_tx_account_date ON main.transactions (account_id, date);
+-- поиск по id (GET/DELETE /expenses/{id}) без ключа партиционирования
+CREATE INDEX IF NOT EXISTS idx_tx_id ON main.transactions (id);
+
+ANALYZE main.transactions;
+
+COMMIT;
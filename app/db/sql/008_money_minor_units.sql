@@ -0,0 +1,40 @@
+-- Денежные суммы: NUMERIC(15,2) -> BIGINT в минимальных единицах валюты + код валюты.
+-- Для существующей БД: psql -f app/db/sql/008_money_minor_units.sql (повторный запуск ничего не меняет).
+BEGIN;
+
+-- знаков после запятой по ISO 4217; держать в синхроне с app/utils/money.py
+CREATE OR REPLACE FUNCTION main.currency_minor_units(code TEXT)
+RETURNS INT
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT CASE upper(code)
+    WHEN 'BHD' THEN 3 WHEN 'JOD' THEN 3 WHEN 'KWD' THEN 3 WHEN 'OMR' THEN 3 WHEN 'TND' THEN 3
+    WHEN 'ISK' THEN 0 WHEN 'JPY' THEN 0 WHEN 'KRW' THEN 0 WHEN 'VND' THEN 0
+    ELSE 2
+  END
+$$;
+
+ALTER TABLE main.transactions ADD COLUMN IF NOT EXISTS currency CHAR(3) NOT NULL DEFAULT 'BYN';
+ALTER TABLE main.receipts ADD COLUMN IF NOT EXISTS currency CHAR(3) NOT NULL DEFAULT 'BYN';
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'main' AND table_name = 'transactions' AND column_name = 'amount') THEN
+    -- валюта транзакции — валюта её счёта
+    UPDATE main.transactions t SET currency = a.currency
+    FROM main.accounts a WHERE a.id = t.account_id AND t.currency <> a.currency;
+    ALTER TABLE main.transactions
+      ALTER COLUMN amount TYPE BIGINT USING round(amount * 10::numeric ^ main.currency_minor_units(currency))::bigint;
+    ALTER TABLE main.transactions RENAME COLUMN amount TO amount_minor;
+  END IF;
+
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_schema = 'main' AND table_name = 'receipts' AND column_name = 'total_amount') THEN
+    ALTER TABLE main.receipts
+      ALTER COLUMN total_amount TYPE BIGINT USING round(total_amount * 10::numeric ^ main.currency_minor_units(currency))::bigint;
+    ALTER TABLE main.receipts RENAME COLUMN total_amount TO total_amount_minor;
+  END IF;
+END;
+$$;
+
+COMMIT;
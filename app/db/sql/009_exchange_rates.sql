@@ -0,0 +1,13 @@
+-- Курсы валют к базовой валюте (BASE_CURRENCY, по умолчанию BYN): действуют с date до следующей записи.
+-- Загрузка: python -m app.services.exchange_rates load rates.csv
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.exchange_rates (
+  currency  CHAR(3)        NOT NULL,
+  date      DATE           NOT NULL,
+  rate      NUMERIC(18,8)  NOT NULL CHECK (rate > 0),
+  PRIMARY KEY (currency, date)
+);
+-- поиск курса на дату операции (currency = ? AND date <= ? ORDER BY date DESC LIMIT 1) идёт по первичному ключу
+
+COMMIT;
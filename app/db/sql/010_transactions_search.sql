@@ -0,0 +1,23 @@
+-- Полнотекстовый поиск по описаниям операций и названиям магазинов из чеков (GET /expenses/search).
+-- tsvector сразу в двух конфигурациях (russian + english), pg_trgm — для опечаток и частей слов.
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- btree_gin: user_id в одном GIN-индексе с tsvector/триграммами — поиск идёт только по строкам пользователя
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+ALTER TABLE main.transactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    to_tsvector('russian', coalesce(description, '')) || to_tsvector('english', coalesce(description, ''))
+  ) STORED;
+ALTER TABLE main.receipts ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    to_tsvector('russian', coalesce(merchant_name, '')) || to_tsvector('english', coalesce(merchant_name, ''))
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tx_search ON main.transactions USING gin (user_id, search_vector);
+CREATE INDEX IF NOT EXISTS idx_tx_description_trgm ON main.transactions USING gin (user_id, description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_receipts_search ON main.receipts USING gin (user_id, search_vector);
+CREATE INDEX IF NOT EXISTS idx_receipts_merchant_trgm ON main.receipts USING gin (user_id, merchant_name gin_trgm_ops);
+
+COMMIT;
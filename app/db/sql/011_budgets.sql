@@ -0,0 +1,27 @@
+-- Месячные бюджеты по категориям расходов.
+-- budget_spend — расход по бюджету за месяц; обновляется инкрементально при каждой записи операции
+-- (app/services/budgets.py), поэтому статус бюджета читается без сканирования transactions.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.budgets (
+  id            SERIAL PRIMARY KEY,
+  user_id       INT NOT NULL REFERENCES main.users(id)      ON DELETE CASCADE,
+  category_id   INT NOT NULL REFERENCES main.categories(id) ON DELETE CASCADE,
+  amount_minor  BIGINT NOT NULL CHECK (amount_minor > 0),
+  currency      CHAR(3) NOT NULL,
+  since         DATE NOT NULL,  -- первый месяц, за который ведётся budget_spend
+  created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+  CONSTRAINT u_budgets_user_category
+    UNIQUE (user_id, category_id)
+);
+
+CREATE TABLE IF NOT EXISTS main.budget_spend (
+  budget_id        INT NOT NULL REFERENCES main.budgets(id) ON DELETE CASCADE,
+  month            DATE NOT NULL,
+  spent_minor      BIGINT NOT NULL DEFAULT 0,
+  alerted_percent  INT NOT NULL DEFAULT 0,  -- последний порог, о котором пользователь уже уведомлён
+  PRIMARY KEY (budget_id, month)
+);
+
+COMMIT;
@@ -0,0 +1,42 @@
+-- Дельта-синхронизация для мобильных клиентов (GET/POST /sync, app/services/sync.py).
+-- change_id — номер изменения из sync_clock пользователя: пишущая транзакция увеличивает
+-- его и держит строку до коммита, поэтому номера одного пользователя коммитятся по порядку.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.sync_clock (
+  user_id    INT PRIMARY KEY REFERENCES main.users(id) ON DELETE CASCADE,
+  change_id  BIGINT NOT NULL
+);
+
+ALTER TABLE main.transactions
+  ADD COLUMN IF NOT EXISTS change_id   BIGINT      NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS updated_at  TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE main.categories
+  ADD COLUMN IF NOT EXISTS change_id   BIGINT      NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS updated_at  TIMESTAMPTZ NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_tx_user_change  ON main.transactions (user_id, change_id);
+CREATE INDEX IF NOT EXISTS idx_cat_user_change ON main.categories (user_id, change_id);
+
+-- удалённые строки: клиент узнаёт о них по тем же change_id
+CREATE TABLE IF NOT EXISTS main.sync_tombstones (
+  user_id     INT NOT NULL REFERENCES main.users(id) ON DELETE CASCADE,
+  change_id   BIGINT NOT NULL,
+  entity      VARCHAR(16) NOT NULL,
+  entity_id   INT NOT NULL,
+  deleted_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, change_id, entity, entity_id)
+);
+
+-- ключи идемпотентности операций POST /sync
+CREATE TABLE IF NOT EXISTS main.sync_operations (
+  user_id         INT NOT NULL REFERENCES main.users(id) ON DELETE CASCADE,
+  key             VARCHAR(64) NOT NULL,
+  status          VARCHAR(16) NOT NULL,
+  transaction_id  INT,
+  created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_sync_operations_created ON main.sync_operations (created_at);
+
+COMMIT;
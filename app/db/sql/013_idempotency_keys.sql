@@ -0,0 +1,22 @@
+-- Ответы на запросы с заголовком Idempotency-Key (app/services/idempotency.py).
+-- Повтор запроса с тем же ключом получает сохранённый ответ; строки старше expires_at
+-- удаляет idempotency-key-sweeper пачками.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.idempotency_keys (
+  id           BIGSERIAL PRIMARY KEY,
+  user_id      INT NOT NULL REFERENCES main.users(id) ON DELETE CASCADE,
+  key          VARCHAR(128) NOT NULL,
+  scope        VARCHAR(64)  NOT NULL,
+  fingerprint  CHAR(64)     NOT NULL,
+  status_code  INT          NOT NULL,
+  response     TEXT         NOT NULL,
+  created_at   TIMESTAMPTZ  NOT NULL DEFAULT now(),
+  expires_at   TIMESTAMPTZ  NOT NULL,
+
+  CONSTRAINT u_idempotency_keys_user_key
+    UNIQUE (user_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON main.idempotency_keys (expires_at);
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Итоги закрытых месяцев для /analytics/monthly (app/services/monthly.py).
+-- Строка считается при первом чтении месяца и удаляется, когда в этом месяце
+-- создают, меняют или удаляют операцию; суммы — в базовой валюте (BASE_CURRENCY).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.monthly_rollups (
+  user_id            INT NOT NULL REFERENCES main.users(id) ON DELETE CASCADE,
+  month              DATE NOT NULL,
+  expenses_minor     BIGINT NOT NULL,
+  income_minor       BIGINT NOT NULL,
+  transaction_count  INT NOT NULL,
+  computed_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, month)
+);
+
+COMMIT;
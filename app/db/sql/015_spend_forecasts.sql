@@ -0,0 +1,14 @@
+-- Прогнозы расходов, заранее посчитанные ночным пакетом (python -m app.services.forecast precompute).
+-- Строка действительна, пока as_of = сегодня и change_id совпадает с sync_clock пользователя;
+-- иначе /analytics/forecast считает прогноз заново.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS main.spend_forecasts (
+  user_id      INT PRIMARY KEY REFERENCES main.users(id) ON DELETE CASCADE,
+  as_of        DATE NOT NULL,
+  change_id    BIGINT NOT NULL,
+  payload      TEXT NOT NULL,
+  computed_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMIT;
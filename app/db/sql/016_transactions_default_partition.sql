@@ -0,0 +1,68 @@
+-- ensure_transaction_partitions() с учётом строк в transactions_default.
+-- Операция с датой позже созданных месяцев попадает в default-партицию, и
+-- CREATE TABLE ... PARTITION OF для её месяца падает («default partition would be
+-- violated»). Теперь месяц с такими строками создаётся так: default отсоединяется,
+-- партиция создаётся, строки месяца переносятся в неё, default присоединяется обратно.
+-- Кроме запрошенного диапазона создаются партиции всех месяцев, строки которых лежат в default.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION main.ensure_transaction_partitions(from_month DATE, months INT)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+  month_start DATE;
+  month_end DATE;
+  partition_name TEXT;
+  columns TEXT;
+  created INT := 0;
+BEGIN
+  FOR month_start IN
+    SELECT (date_trunc('month', from_month) + make_interval(months => i))::date
+    FROM generate_series(0, months - 1) AS i
+    UNION
+    SELECT DISTINCT date_trunc('month', date)::date FROM main.transactions_default
+    ORDER BY 1
+  LOOP
+    month_end := (month_start + INTERVAL '1 month')::date;
+    partition_name := format('transactions_y%sm%s', to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+    CONTINUE WHEN to_regclass(format('main.%I', partition_name)) IS NOT NULL;
+
+    IF EXISTS (SELECT 1 FROM main.transactions_default WHERE date >= month_start AND date < month_end) THEN
+      -- генерируемые колонки (search_vector) пересчитываются при вставке
+      SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO columns
+      FROM pg_attribute
+      WHERE attrelid = 'main.transactions'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+
+      ALTER TABLE main.transactions DETACH PARTITION main.transactions_default;
+      EXECUTE format(
+        'CREATE TABLE main.%I PARTITION OF main.transactions FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, month_end
+      );
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM main.transactions_default WHERE date >= %L AND date < %L RETURNING %s) '
+        'INSERT INTO main.transactions (%s) SELECT %s FROM moved',
+        month_start, month_end, columns, columns, columns
+      );
+      ALTER TABLE main.transactions ATTACH PARTITION main.transactions_default DEFAULT;
+    ELSE
+      EXECUTE format(
+        'CREATE TABLE main.%I PARTITION OF main.transactions FOR VALUES FROM (%L) TO (%L)',
+        partition_name, month_start, month_end
+      );
+    END IF;
+    created := created + 1;
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+-- строки, уже лежащие в default (в т.ч. перенесённые миграцией 007 с датами далеко вперёд)
+DO $$
+BEGIN
+  IF to_regclass('main.transactions_default') IS NOT NULL THEN
+    PERFORM main.ensure_transaction_partitions(current_date, 4);
+  END IF;
+END;
+$$;
+
+COMMIT;
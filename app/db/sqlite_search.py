@@ -0,0 +1,46 @@
+"""
+SQLite-замена tsvector/GIN из 010_transactions_search.sql: FTS5-таблица transactions_fts
+(rowid = transactions.id), которую поддерживают триггеры. Создаётся вместе с таблицами
+(create_all) только на SQLite — в тестах и при локальном запуске.
+"""
+from sqlalchemy import DDL, Table, event
+
+CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+    "description, merchant_name, user_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN "
+    "INSERT INTO transactions_fts (rowid, description, merchant_name, user_id) "
+    "VALUES (new.id, coalesce(new.description, ''), '', new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_au "
+    "AFTER UPDATE OF description, user_id ON transactions BEGIN "
+    "UPDATE transactions_fts "
+    "SET description = coalesce(new.description, ''), user_id = new.user_id "
+    "WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN "
+    "DELETE FROM transactions_fts WHERE rowid = old.id; END",
+]
+_MERCHANTS = (
+    "UPDATE transactions_fts SET merchant_name = coalesce("
+    "(SELECT group_concat(merchant_name, ' ') FROM receipts "
+    "WHERE transaction_id = {row}.transaction_id), '') "
+    "WHERE rowid = {row}.transaction_id;"
+)
+CREATE_RECEIPTS = [
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_ai AFTER INSERT ON receipts BEGIN "
+    + _MERCHANTS.format(row="new") + " END",
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_au "
+    "AFTER UPDATE OF merchant_name, transaction_id ON receipts BEGIN "
+    + _MERCHANTS.format(row="old") + " " + _MERCHANTS.format(row="new") + " END",
+    "CREATE TRIGGER IF NOT EXISTS receipts_fts_ad AFTER DELETE ON receipts BEGIN "
+    + _MERCHANTS.format(row="old") + " END",
+]
+DROP = "DROP TABLE IF EXISTS transactions_fts"
+
+
+def install(transactions: Table, receipts: Table) -> None:
+    for statement in CREATE:
+        event.listen(transactions, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in CREATE_RECEIPTS:
+        event.listen(receipts, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    # триггеры удаляются вместе с таблицами, FTS-таблица — нет
+    event.listen(transactions, "after_drop", DDL(DROP).execute_if(dialect="sqlite"))
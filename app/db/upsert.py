@@ -0,0 +1,23 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def insert_for(db: Session | Connection, model):
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта текущего подключения
+    (Postgres в проде, SQLite в тестах и бенчмарках).
+    """
+    bind = db.get_bind() if isinstance(db, Session) else db
+    dialect = bind.dialect.name
+    try:
+        return _INSERTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(
+            f"INSERT ... ON CONFLICT is not supported for {dialect}"
+        ) from None
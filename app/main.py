@@ -1,23 +1,128 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api import metrics
 from app.api.v1.router import api_router
+from app.core.config import settings
 from app.core.logging_config import setup_logging
-from app.db.database import database_engine
+from app.core.metrics import CallbackGauge, MetricsMiddleware, registry
+from app.core.request_context import RequestIdMiddleware
+from app.core.startup import FirstRequestMiddleware, cold_start, run_startup, warm_up_pool
+from app.db.database import database_engine, replica_engine
 from app.db.models import Base
+from app.db.profiling import SQLProfileMiddleware
+from app.db.routing import ReadYourWritesMiddleware
+from app.services.batch import dispose_engines as dispose_batch_engines
+from app.services.chat_manager import PostgresChatBroker, chat_manager
+from app.services.partitions import maintain_partitions, partition_maintainer
+from app.services.profiler import background_sampler
+from app.services.reapers import (
+    email_code_sweeper,
+    idempotency_key_sweeper,
+    rate_limit_sweeper,
+    refresh_token_reaper,
+    sync_operation_sweeper,
+)
+from app.utils.mail_sender import mail_queue
 
 setup_logging()
 logger = logging.getLogger("app.main")
 
+registry.register(CallbackGauge(
+    "app_cold_start_seconds", "Seconds from process start to each startup phase",
+    cold_start.samples, ("phase",)
+))
+
+
+def _background_workers() -> list:
+    workers = [
+        mail_queue,
+        refresh_token_reaper,
+        email_code_sweeper,
+        rate_limit_sweeper,
+        idempotency_key_sweeper,
+        sync_operation_sweeper,
+        partition_maintainer,
+    ]
+    if settings.profiler_sampler_enabled:
+        workers.append(background_sampler)
+    return workers
+
+
+def _chat_broker() -> PostgresChatBroker | None:
+    """Без общего брокера сообщения чата доходят только до сокетов своего воркера."""
+    fanout = settings.chat_fanout
+    if fanout == "auto":
+        fanout = "postgres" if database_engine.dialect.name == "postgresql" else "local"
+    return PostgresChatBroker(database_engine, chat_manager) if fanout == "postgres" else None
+
+
+def _threadpool_size() -> int:
+    # потоков для sync-эндпоинтов не больше, чем соединений в пуле: лишние только ждут pool_timeout
+    return settings.threadpool_size or settings.db_pool_size + settings.db_max_overflow
+
+
+def _startup() -> None:
+    startup_seconds = run_startup(
+        database_engine,
+        Base.metadata,
+        create_all=settings.db_create_all,
+        warm_connections=settings.db_warmup_connections,
+        lazy_imports=settings.lazy_imports,
+    )
+    if replica_engine is not None:
+        warm_up_pool(replica_engine, settings.db_warmup_connections)
+    # партиции на ближайшие месяцы, если процесс не работал во время смены месяца
+    try:
+        maintain_partitions()
+    except Exception:
+        logger.exception("Transaction partition maintenance failed")
+    for worker in _background_workers():
+        worker.start()
+    cold_start.mark_ready(startup_seconds)
+    logger.info(
+        "Startup finished in %.3fs, ready %.3fs after process start",
+        startup_seconds, cold_start.ready_seconds or 0.0,
+    )
+
+
+def _shutdown() -> None:
+    for worker in reversed(_background_workers()):
+        worker.stop()
+    database_engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
+    dispose_batch_engines()
+    logger.info("Shutdown finished")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = _threadpool_size()
+    # DB и импорты синхронные — выполняем вне event loop
+    await to_thread.run_sync(_startup)
+    broker = _chat_broker()
+    if broker is not None:
+        broker.start(asyncio.get_running_loop())
+    yield
+    if broker is not None:
+        await to_thread.run_sync(broker.stop)
+    await to_thread.run_sync(_shutdown)
+
+
 app = FastAPI(
     title="Finance Assistant API",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -28,6 +133,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(SQLProfileMiddleware)
+
+if replica_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.replica_sticky_seconds)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(FirstRequestMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
 
 
@@ -38,6 +155,6 @@ def root():
 
 
 if __name__ == "__main__":
+    # dev-сервер с автоперезагрузкой; в проде — python -m app.server
     logger.info("App is started")
-    Base.metadata.create_all(bind=database_engine)
     uvicorn.run("app.main:app", reload=True)
@@ -1,8 +1,8 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
+from pydantic import BaseModel
+
 
 class TimeSeriesDataPoint(BaseModel):
     date: datetime
@@ -10,6 +10,7 @@ class TimeSeriesDataPoint(BaseModel):
 
 
 class TimeSeriesResponse(BaseModel):
+    currency: str
     total_amount: Decimal
     average_per_day: Decimal
     data_points: list[TimeSeriesDataPoint]
@@ -25,6 +26,7 @@ class CategorySummary(BaseModel):
 
 
 class TimeSeriesByCategoryResponse(BaseModel):
+    currency: str
     total_amount: Decimal
     categories: list[CategorySummary]
 
@@ -36,3 +38,25 @@ class MonthlyStats(BaseModel):
     total_income: Decimal
     net: Decimal
     transaction_count: int
+
+
+class MonthlyStatsResponse(BaseModel):
+    currency: str
+    months: list[MonthlyStats]
+
+
+class CategoryForecast(BaseModel):
+    category_id: int
+    category_name: str
+    spent: Decimal
+    month_end: Decimal
+    next_month: Decimal
+
+
+class ForecastResponse(BaseModel):
+    currency: str
+    as_of: date
+    spent: Decimal
+    month_end: Decimal
+    next_month: Decimal
+    categories: list[CategoryForecast]
@@ -0,0 +1,66 @@
+from datetime import date, datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+BatchPath = Literal[
+    "/expenses",
+    "/analytics/timeseries",
+    "/analytics/by-category",
+    "/analytics/monthly",
+    "/analytics/forecast",
+    "/categories",
+]
+
+
+class BatchCall(BaseModel):
+    id: str = Field(min_length=1, max_length=64)
+    path: BatchPath
+    params: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchCall] = Field(min_length=1, max_length=10)
+
+    @field_validator("requests")
+    @classmethod
+    def unique_ids(cls, requests: list[BatchCall]) -> list[BatchCall]:
+        if len({call.id for call in requests}) != len(requests):
+            raise ValueError("request ids must be unique")
+        return requests
+
+
+class BatchResult(BaseModel):
+    id: str
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchResult]
+
+
+# параметры подзапросов — те же, что у query-параметров одиночных эндпоинтов
+class NoParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class PeriodParams(NoParams):
+    start_date: datetime | None = None
+    end_date: datetime | None = None
+    currency: str | None = Field(None, pattern=r"^[A-Z]{3}$")
+
+
+class CategoriesParams(NoParams):
+    category_type: str | None = None
+    currency: str | None = Field(None, pattern=r"^[A-Z]{3}$")
+
+
+class MonthRangeParams(NoParams):
+    start_date: date | None = None
+    end_date: date | None = None
+    currency: str | None = Field(None, pattern=r"^[A-Z]{3}$")
+
+
+class CurrencyParams(NoParams):
+    currency: str | None = Field(None, pattern=r"^[A-Z]{3}$")
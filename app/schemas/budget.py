@@ -0,0 +1,26 @@
+from datetime import date
+from decimal import Decimal
+
+from pydantic import BaseModel, Field
+
+
+class BudgetSet(BaseModel):
+    category_name: str = Field(min_length=1, max_length=255)
+    amount: Decimal = Field(gt=0, max_digits=12, decimal_places=2)
+
+
+class BudgetStatus(BaseModel):
+    id: int
+    category_id: int
+    category_name: str
+    month: date
+    currency: str
+    amount: Decimal
+    spent: Decimal
+    remaining: Decimal
+    percent: Decimal
+
+
+class BudgetsResponse(BaseModel):
+    month: date
+    budgets: list[BudgetStatus]
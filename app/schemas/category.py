@@ -1,7 +1,7 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
 from decimal import Decimal
 
+from pydantic import BaseModel, ConfigDict
+
 
 class CategoryStatistic(BaseModel):
     category_id: int
@@ -15,6 +15,7 @@ class CategoryStatistic(BaseModel):
 
 
 class CategoriesStatsResponse(BaseModel):
+    currency: str
     total_expenses: Decimal
     total_income: Decimal
     categories: list[CategoryStatistic]
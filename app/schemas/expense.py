@@ -1,34 +1,74 @@
-from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional, Literal
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, computed_field
+
+from app.utils.money import from_minor
+
 
 class ExpenseCreate(BaseModel):
-    category_name : Optional[str] = None
+    category_name : str | None = None
     type: Literal['Расход', 'Доход'] = 'Расход'
     amount : Decimal = Field(gt=0, max_digits=7, decimal_places=2)
     date : date
-    description : Optional[str] = Field(default=None, max_length=512)
+    description : str | None = Field(default=None, max_length=512)
+
+class ExpenseImport(BaseModel):
+    items : list[ExpenseCreate] = Field(min_length=1, max_length=5000)
+
+class ExpenseImportResult(BaseModel):
+    imported : int
+    ids : list[int]
 
 class ExpenseUpdate(BaseModel):
     account_id : int
-    category_id : Optional[int] = None
+    category_id : int | None = None
     amount : Decimal = Field(gt=0, max_digits=7, decimal_places=2)
     date : date
-    description : Optional[str] = Field(default=None, max_length=512)
+    description : str | None = Field(default=None, max_length=512)
 
 class ExpenseRead(BaseModel):
     id : int
     user_id : int
     account_id : int
-    category_id : Optional[int]
-    amount : Decimal
+    category_id : int | None
+    amount_minor : int = Field(exclude=True)
+    currency : str
     date : date
-    description : Optional[str]
+    description : str | None
     created_at : datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def amount(self) -> Decimal:
+        return from_minor(self.amount_minor, self.currency)
+
 class ExpenseList(BaseModel):
     total : Decimal
-    items : list[ExpenseRead]
\ No newline at end of file
+    items : list[ExpenseRead]
+
+class ExpenseSearchHit(BaseModel):
+    expense : ExpenseRead
+    rank : float
+
+class ExpenseSearchPage(BaseModel):
+    items : list[ExpenseSearchHit]
+    limit : int
+    offset : int
+    has_more : bool
+
+class CategorizeItem(BaseModel):
+    description : str | None = Field(default=None, max_length=512)
+    merchant_name : str | None = Field(default=None, max_length=255)
+
+class CategorizeRequest(BaseModel):
+    type : Literal['Расход', 'Доход'] | None = None
+    items : list[CategorizeItem] = Field(min_length=1, max_length=5000)
+
+class CategorySuggestion(BaseModel):
+    category_id : int | None
+    category_name : str | None
+    confidence : float
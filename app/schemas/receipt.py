@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ReceiptRead(BaseModel):
+    id: int
+    transaction_id: int | None
+    merchant_name: str | None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
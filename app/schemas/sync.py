@@ -0,0 +1,63 @@
+import datetime
+from decimal import Decimal
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.schemas.expense import ExpenseRead
+
+
+class CategorySyncItem(BaseModel):
+    id: int
+    name: str
+    type: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DeletedItem(BaseModel):
+    entity: Literal["transaction", "category"]
+    id: int
+
+
+class SyncChanges(BaseModel):
+    token: str
+    has_more: bool
+    transactions: list[ExpenseRead]
+    categories: list[CategorySyncItem]
+    deleted: list[DeletedItem]
+
+
+class SyncOperationIn(BaseModel):
+    key: str = Field(
+        min_length=1, max_length=64, description="Ключ идемпотентности, уникальный для пользователя"
+    )
+    op: Literal["create", "update", "delete"]
+    id: int | None = None
+    category_name: str | None = Field(default=None, max_length=255)
+    type: Literal['Расход', 'Доход'] = 'Расход'
+    amount: Decimal | None = Field(default=None, gt=0, max_digits=7, decimal_places=2)
+    description: str | None = Field(default=None, max_length=512)
+    date: datetime.date | None = None
+
+    @model_validator(mode="after")
+    def _required_fields(self):
+        if self.op == "create" and (self.amount is None or self.date is None):
+            raise ValueError("create requires amount and date")
+        if self.op != "create" and self.id is None:
+            raise ValueError(f"{self.op} requires id")
+        return self
+
+
+class SyncPush(BaseModel):
+    operations: list[SyncOperationIn] = Field(min_length=1, max_length=500)
+
+
+class SyncOperationResult(BaseModel):
+    key: str
+    status: Literal["applied", "duplicate", "not_found"]
+    id: int | None = None
+
+
+class SyncPushResult(BaseModel):
+    results: list[SyncOperationResult]
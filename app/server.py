@@ -0,0 +1,69 @@
+"""
+Продовый запуск: несколько процессов uvicorn под супервизором.
+
+    python -m app.server
+
+Число воркеров — WEB_WORKERS (по умолчанию число CPU); воркер перезапускается
+после WEB_MAX_REQUESTS запросов (+ случайный сдвиг до WEB_MAX_REQUESTS_JITTER,
+если uvicorn его поддерживает) и на остановке ждёт активные запросы
+до WEB_GRACEFUL_TIMEOUT_S секунд.
+"""
+import importlib.util
+import inspect
+import logging
+import os
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+
+logger = logging.getLogger("app.server")
+
+
+def worker_count() -> int:
+    return settings.web_workers or os.cpu_count() or 1
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def build_config() -> dict:
+    options = {
+        "host": settings.web_host,
+        "port": int(settings.app_port),
+        "workers": worker_count(),
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "timeout_graceful_shutdown": settings.web_graceful_timeout_s,
+        "timeout_keep_alive": settings.web_keepalive_s,
+        "proxy_headers": True,
+        "log_config": None,  # логирование настраивает app.core.logging_config
+    }
+    if settings.web_max_requests > 0:
+        options["limit_max_requests"] = settings.web_max_requests
+        if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+            options["limit_max_requests_jitter"] = settings.web_max_requests_jitter
+    return options
+
+
+def main() -> None:
+    options = build_config()
+    if options["workers"] > 1:
+        # воркеры читают настройки заново из окружения
+        os.environ["LOG_PER_PROCESS"] = "true"
+        settings.log_per_process = True
+    setup_logging()
+    logger.info(
+        "Starting %d workers on %s:%s (loop=%s, http=%s)",
+        options["workers"], options["host"], options["port"], options["loop"], options["http"],
+    )
+    if options["workers"] > 1 and settings.rate_limit_backend == "memory":
+        logger.warning("RATE_LIMIT_BACKEND=memory keeps separate buckets in each of %d workers",
+                       options["workers"])
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import logging
+import threading
+from collections.abc import Callable
+
+logger = logging.getLogger("app.background")
+
+
+class PeriodicWorker:
+    """
+    Фоновый поток, который вызывает `job` раз в `interval` секунд.
+    Ошибки задачи логируются и не останавливают поток.
+    """
+
+    def __init__(self, name: str, job: Callable[[], object], interval: float):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.job()
+                logger.debug("Background job %s finished: %s", self.name, result)
+            except Exception:
+                logger.exception("Background job %s failed", self.name)
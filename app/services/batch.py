@@ -0,0 +1,120 @@
+"""
+Пакетные чтения для POST /batch: несколько запросов дашборда одного пользователя
+за один HTTP-запрос.
+
+В Postgres сессия запроса открывает read-only REPEATABLE READ транзакцию и
+экспортирует её снимок (pg_export_snapshot); подзапросы выполняются параллельно
+на соединениях отдельного пула, импортировав этот снимок, — все ответы пакета видят
+одни и те же данные. В SQLite подзапросы выполняются по очереди в той же сессии.
+"""
+import contextvars
+import logging
+import re
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import begin_snapshot_read
+from app.db.instrumentation import instrument_engine
+
+logger = logging.getLogger("app.batch")
+
+_SNAPSHOT_RE = re.compile(r"^[0-9A-F]+-[0-9A-F]+(-[0-9]+)?$")
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.batch_max_concurrency, thread_name_prefix="batch"
+)
+
+# движок запроса (primary или реплика) → движок подзапросов с собственным пулом
+_engines: dict[Engine, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def subquery_engine(engine: Engine) -> Engine:
+    """
+    Движок с тем же URL и пулом на `batch_max_concurrency` соединений — по одному
+    на поток _executor, так что подзапрос никогда не ждёт соединения. Из общего пула
+    брать нельзя: каждый пакет держит в нём соединение со снимком, и при занятом пуле
+    подзапросы ждали бы соединений, которые освобождаются только после них самих.
+    """
+    with _engines_lock:
+        if engine not in _engines:
+            _engines[engine] = create_engine(
+                engine.url, pool_size=settings.batch_max_concurrency, max_overflow=0
+            )
+            instrument_engine(_engines[engine])
+        return _engines[engine]
+
+
+def dispose_engines() -> None:
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def begin_snapshot(db: Session) -> str | None:
+    """
+    Начать в `db` read-only REPEATABLE READ транзакцию и вернуть id её снимка.
+    Вызывается до первого запроса сессии; None — СУБД не умеет делиться снимком.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    begin_snapshot_read(db)
+    try:
+        return db.execute(text("SELECT pg_export_snapshot()")).scalar_one()
+    except DBAPIError as e:
+        # например, реплика старой версии Postgres: читаем по очереди в одной транзакции
+        logger.warning("Snapshot export failed, batch runs sequentially: %s", e.orig)
+        db.rollback()
+        begin_snapshot_read(db)
+        return None
+
+
+def import_snapshot(db: Session, snapshot: str) -> None:
+    if not _SNAPSHOT_RE.match(snapshot):
+        raise ValueError(f"unexpected snapshot id {snapshot!r}")
+    begin_snapshot_read(db)
+    # SET TRANSACTION не принимает параметры; id проверен выше
+    db.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+
+
+def _call(handler: Callable[[Session], Any], db: Session) -> Any:
+    try:
+        return handler(db)
+    except HTTPException as e:
+        return e
+
+
+def run_batch(
+    db: Session, snapshot: str | None, handlers: dict[str, Callable[[Session], Any]]
+) -> dict[str, Any]:
+    """
+    Выполнить обработчики `handler(session) -> ответ`. HTTPException обработчика
+    возвращается как его результат, остальные ошибки пробрасываются.
+    Пока подзапросы не завершились, транзакция `db` (владелец снимка) остаётся открытой.
+    """
+    if snapshot is None or len(handlers) == 1:
+        return {key: _call(handler, db) for key, handler in handlers.items()}
+
+    engine = subquery_engine(db.get_bind())
+
+    def in_snapshot(handler):
+        with Session(bind=engine) as session:
+            import_snapshot(session, snapshot)
+            return _call(handler, session)
+
+    # контекст запроса (request id, SQL-профиль) переходит в потоки подзапросов
+    futures = {
+        key: _executor.submit(contextvars.copy_context().run, in_snapshot, handler)
+        for key, handler in handlers.items()
+    }
+    return {key: future.result() for key, future in futures.items()}
@@ -0,0 +1,170 @@
+"""
+Месячные бюджеты по категориям расходов.
+
+Расход по бюджету за месяц хранится в budget_spend и меняется на сумму операции
+при каждой записи (record_spend) — статус бюджета читается одной строкой, без
+сканирования transactions. Пересечение порогов (settings.budget_alert_thresholds)
+определяется там же; уведомления уходят в /ws/chat после коммита (publish_alerts).
+"""
+import logging
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+
+from anyio import from_thread
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.api.exceptions import MissingExchangeRate
+from app.core.config import settings
+from app.db.models import Budget, BudgetSpend, Transaction
+from app.db.upsert import insert_for
+from app.services.chat_manager import chat_manager
+from app.services.exchange_rates import convert_minor
+from app.utils.money import from_minor
+
+logger = logging.getLogger("app.budgets")
+
+
+@dataclass(frozen=True)
+class BudgetAlert:
+    user_id: int
+    budget_id: int
+    category_id: int
+    month: date
+    threshold: int
+    spent_minor: int
+    amount_minor: int
+    currency: str
+
+    def payload(self) -> dict:
+        return {
+            "type": "budget_alert",
+            "budget_id": self.budget_id,
+            "category_id": self.category_id,
+            "month": self.month.isoformat(),
+            "threshold": self.threshold,
+            "spent": str(from_minor(self.spent_minor, self.currency)),
+            "amount": str(from_minor(self.amount_minor, self.currency)),
+            "currency": self.currency,
+        }
+
+
+def month_start(day: date | datetime) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def reached_threshold(spent_minor: int, amount_minor: int) -> int:
+    """Наибольший порог (в % лимита), который достигнут при расходе spent_minor; 0 — ни одного."""
+    percent = spent_minor * 100 / amount_minor
+    reached = [threshold for threshold in settings.budget_alert_thresholds if threshold <= percent]
+    return max(reached, default=0)
+
+
+def record_spend(
+    db: Session,
+    user_id: int,
+    category_id: int,
+    day: date | datetime,
+    amount_minor: int,
+    currency: str,
+) -> list[BudgetAlert]:
+    """
+    Прибавить операцию к расходу по бюджету её категории за месяц `day`
+    (amount_minor < 0 — операция удалена). Выполняется в транзакции вызывающего;
+    возвращает пересечённые вверх пороги — их нужно отправить после коммита.
+    """
+    budget = db.execute(
+        select(Budget.id, Budget.amount_minor, Budget.currency, Budget.since)
+        .where(Budget.user_id == user_id, Budget.category_id == category_id)
+    ).first()
+    month = month_start(day)
+    if budget is None or month < budget.since:
+        return []
+
+    delta = convert_minor(db, amount_minor, currency, budget.currency, month)
+    if delta is None:
+        logger.warning("No exchange rate %s -> %s on %s, budget %s not updated",
+                       currency, budget.currency, month, budget.id)
+        return []
+
+    # строка месяца блокируется до коммита: параллельные записи по бюджету идут по очереди
+    stmt = insert_for(db, BudgetSpend).values(budget_id=budget.id, month=month, spent_minor=delta)
+    spent_minor, alerted = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[BudgetSpend.budget_id, BudgetSpend.month],
+            set_={"spent_minor": BudgetSpend.spent_minor + stmt.excluded.spent_minor},
+        ).returning(BudgetSpend.spent_minor, BudgetSpend.alerted_percent)
+    ).one()
+
+    reached = reached_threshold(spent_minor, budget.amount_minor)
+    if reached == alerted:
+        return []
+    # после удаления операции порог опускается, чтобы повторное пересечение
+    # снова пришло уведомлением
+    db.execute(
+        update(BudgetSpend)
+        .where(BudgetSpend.budget_id == budget.id, BudgetSpend.month == month)
+        .values(alerted_percent=reached)
+    )
+    if reached < alerted:
+        return []
+    return [BudgetAlert(user_id, budget.id, category_id, month, reached, spent_minor,
+                        budget.amount_minor, budget.currency)]
+
+
+def publish_alerts(alerts: list[BudgetAlert]) -> None:
+    """Отправить уведомления в /ws/chat. Вызывать из sync-эндпоинта после коммита."""
+    for alert in alerts:
+        logger.info("Budget %s reached %s%% for %s", alert.budget_id, alert.threshold, alert.month)
+        try:
+            from_thread.run(chat_manager.send_event, alert.user_id, alert.payload())
+        except RuntimeError:
+            # не в потоке воркера (CLI, тесты) — доставлять некуда
+            logger.debug("No event loop, budget alert %s not delivered", alert.budget_id)
+
+
+def set_budget(
+    db: Session, user_id: int, category_id: int, amount_minor: int, currency: str
+) -> Budget:
+    """
+    Создать или изменить бюджет категории. Новый бюджет один раз считает расход
+    текущего месяца по transactions (по курсам на начало месяца, как record_spend);
+    уже пройденные пороги не присылаются.
+    """
+    month = month_start(date.today())
+    budget = (
+        db.query(Budget)
+        .filter(Budget.user_id == user_id, Budget.category_id == category_id)
+        .first()
+    )
+    if budget is None:
+        budget = Budget(user_id=user_id, category_id=category_id, amount_minor=amount_minor,
+                        currency=currency, since=month, created_at=datetime.now(UTC))
+        db.add(budget)
+        db.flush()
+        # по курсу на начало месяца, как record_spend — иначе последующие записи разойдутся с итогом
+        totals = db.query(Transaction.currency, func.sum(Transaction.amount_minor)).filter(
+            Transaction.user_id == user_id,
+            Transaction.category_id == category_id,
+            Transaction.date >= month,
+            Transaction.date < next_month(month),
+        ).group_by(Transaction.currency).all()
+        spent_minor = 0
+        for transaction_currency, total_minor in totals:
+            converted = convert_minor(db, int(total_minor), transaction_currency, currency, month)
+            if converted is None:
+                raise MissingExchangeRate(transaction_currency, month)
+            spent_minor += converted
+        db.add(BudgetSpend(budget_id=budget.id, month=month, spent_minor=spent_minor,
+                           alerted_percent=reached_threshold(spent_minor, amount_minor)))
+    else:
+        budget.amount_minor = amount_minor
+        db.flush()
+        spend = db.get(BudgetSpend, (budget.id, month))
+        if spend is not None:
+            spend.alerted_percent = reached_threshold(spend.spent_minor, amount_minor)
+    return budget
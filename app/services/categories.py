@@ -0,0 +1,93 @@
+"""
+Поиск и создание категорий пользователя.
+
+Категория уникальна по (user_id, name, type) — ограничение u_categories_user_name_type.
+Создание — INSERT ... ON CONFLICT DO NOTHING RETURNING id, поэтому параллельные запросы
+не плодят дубликаты. Найденные id кэшируются в памяти воркера (LRU по user_id):
+на частом пути категория не стоит ни одного запроса.
+"""
+import threading
+from collections import OrderedDict
+from datetime import UTC, datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Category
+from app.db.upsert import insert_for
+from app.services.sync import change_id
+
+# категория операций, для которых пользователь её не указал и автокатегоризация не уверена
+DEFAULT_CATEGORY_NAME = "Другое"
+
+
+class CategoryCache:
+    """
+    (name, type) → id категорий по пользователям; вытесняются давно не использованные
+    пользователи.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users: OrderedDict[int, dict[tuple[str, str], int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, name: str, kind: str) -> int | None:
+        with self._lock:
+            categories = self._users.get(user_id)
+            if categories is None:
+                return None
+            self._users.move_to_end(user_id)
+            return categories.get((name, kind))
+
+    def put(self, user_id: int, name: str, kind: str, category_id: int) -> None:
+        with self._lock:
+            self._users.setdefault(user_id, {})[(name, kind)] = category_id
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+category_cache = CategoryCache(settings.category_cache_size)
+
+
+def get_or_create_category(db: Session, user_id: int, name: str, kind: str) -> int:
+    """
+    id категории пользователя, при отсутствии — создать её в текущей транзакции.
+    Номер изменения (sync_clock) берётся, только если категория вставлена: иначе
+    часы пользователя сдвигались бы и держали блокировку на каждом промахе кэша.
+    Только что вставленный id не кэшируется: транзакция ещё может откатиться.
+    """
+    category_id = category_cache.get(user_id, name, kind)
+    if category_id is not None:
+        return category_id
+
+    now = datetime.now(UTC)
+    stmt = insert_for(db, Category).values(
+        user_id=user_id, name=name, type=kind, created_at=now, updated_at=now
+    )
+    category_id = db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["user_id", "name", "type"])
+        .returning(Category.id)
+    ).scalar()
+    if category_id is not None:
+        # часы синхронизации двигает только действительно созданная категория
+        db.execute(
+            update(Category)
+            .where(Category.id == category_id)
+            .values(change_id=change_id(db, user_id))
+        )
+        return category_id
+
+    category_id = db.execute(
+        select(Category.id).where(
+            Category.user_id == user_id, Category.name == name, Category.type == kind
+        )
+    ).scalar_one()
+    category_cache.put(user_id, name, kind, category_id)
+    return category_id
@@ -0,0 +1,207 @@
+"""
+Автоматическая категоризация операций по описанию и магазину из чека.
+
+Для каждого пользователя — мультиномиальный наивный Байес по мешку слов, обученный на
+его собственной истории (последние `categorizer_max_history` операций). Модели лежат
+в LRU по user_id; скоринг векторный и принимает сразу пачку текстов (импорт, OCR).
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import Category, Receipt, Transaction
+
+logger = logging.getLogger("app.categorizer")
+
+_WORD_RE = re.compile(r"\w+")
+# сглаживание Лапласа для слов, не встречавшихся в категории
+ALPHA = 1.0
+# грубый стемминг: «кофейня» и «кофейни» дают общий токен
+STEM_LENGTH = 5
+
+
+def tokenize(text: str | None) -> list[str]:
+    tokens = []
+    for word in _WORD_RE.findall((text or "").lower()):
+        if len(word) < 2 or word.isdigit():
+            continue
+        tokens.append(word)
+        if len(word) > STEM_LENGTH:
+            tokens.append(word[:STEM_LENGTH] + "~")
+    return tokens
+
+
+class Prediction(NamedTuple):
+    category_id: int | None
+    confidence: float
+
+
+@dataclass(frozen=True)
+class CategoryModel:
+    category_ids: np.ndarray  # (categories,)
+    category_types: np.ndarray  # (categories,) — «Расход»/«Доход»
+    vocabulary: dict[str, int]
+    log_prior: np.ndarray  # (categories,)
+    log_likelihood: np.ndarray  # (vocabulary, categories)
+    seen: np.ndarray  # (vocabulary, categories) — слово встречалось в категории
+    samples: int
+
+    @classmethod
+    def train(cls, samples: list[tuple[str, int, str]]) -> "CategoryModel | None":
+        """samples: (текст, category_id, тип категории). None, если учиться не на чем."""
+        documents = [(tokenize(text), category_id, kind) for text, category_id, kind in samples]
+        documents = [document for document in documents if document[0]]
+        if not documents:
+            return None
+
+        category_index: dict[int, int] = {}
+        category_types: list[str] = []
+        vocabulary: dict[str, int] = {}
+        rows, columns = [], []
+        for tokens, category_id, kind in documents:
+            if category_id not in category_index:
+                category_index[category_id] = len(category_index)
+                category_types.append(kind)
+            column = category_index[category_id]
+            for token in tokens:
+                rows.append(vocabulary.setdefault(token, len(vocabulary)))
+                columns.append(column)
+
+        counts = np.zeros((len(vocabulary), len(category_index)), dtype=np.float64)
+        np.add.at(counts, (np.asarray(rows), np.asarray(columns)), 1.0)
+        documents_per_category = np.bincount(
+            [category_index[category_id] for _, category_id, _ in documents],
+            minlength=len(category_index),
+        )
+        smoothed = counts + ALPHA
+        return cls(
+            category_ids=np.fromiter(category_index, dtype=np.int64, count=len(category_index)),
+            category_types=np.asarray(category_types),
+            vocabulary=vocabulary,
+            log_prior=np.log(documents_per_category / documents_per_category.sum()),
+            log_likelihood=np.log(smoothed / smoothed.sum(axis=0)),
+            seen=counts > 0,
+            samples=len(documents),
+        )
+
+    def score(self, texts: list[str], kind: str | None = None) -> np.ndarray:
+        """Апостериорные вероятности категорий, матрица (тексты, категории)."""
+        documents, tokens = [], []
+        for position, text in enumerate(texts):
+            for token in tokenize(text):
+                index = self.vocabulary.get(token)
+                if index is not None:
+                    documents.append(position)
+                    tokens.append(index)
+
+        documents = np.asarray(documents, dtype=np.int64)
+        tokens = np.asarray(tokens, dtype=np.int64)
+        if kind is not None:
+            allowed = self.category_types == kind
+        else:
+            allowed = np.ones(len(self.category_ids), dtype=bool)
+
+        scores = np.tile(self.log_prior, (len(texts), 1))
+        np.add.at(scores, documents, self.log_likelihood[tokens])
+        scores[:, ~allowed] = -np.inf
+        # softmax по строкам; строки, где разрешённых категорий нет, остаются нулевыми
+        best = scores.max(axis=1, keepdims=True)
+        best[~np.isfinite(best)] = 0.0
+        probabilities = np.exp(scores - best)
+        totals = probabilities.sum(axis=1, keepdims=True)
+        np.divide(probabilities, totals, out=probabilities, where=totals > 0)
+        # текст без слов, знакомых разрешённым категориям, классифицирует только prior — не отвечаем
+        evidence = self.seen[tokens][:, allowed].any(axis=1)
+        known = np.bincount(documents, weights=evidence, minlength=len(texts)) > 0
+        probabilities[~known] = 0.0
+        return probabilities
+
+    def predict(
+        self, texts: list[str], kind: str | None = None, min_confidence: float = 0.0
+    ) -> list[Prediction]:
+        if not texts:
+            return []
+        probabilities = self.score(texts, kind)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(texts)), best]
+        return [
+            Prediction(int(self.category_ids[column]), float(value))
+            if value > 0 and value >= min_confidence
+            else Prediction(None, float(value))
+            for column, value in zip(best, confidence, strict=True)
+        ]
+
+
+def training_samples(db: Session, user_id: int, limit: int) -> list[tuple[str, int, str]]:
+    """Последние операции пользователя: описание + магазины из чеков, категория, её тип."""
+    rows = (
+        db.query(Transaction.id, Transaction.description, Receipt.merchant_name,
+                 Transaction.category_id, Category.type)
+        .join(Category, Transaction.category_id == Category.id)
+        .outerjoin(Receipt, Receipt.transaction_id == Transaction.id)
+        .filter(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit)
+        .all()
+    )
+    texts: dict[int, list] = {}
+    for transaction_id, description, merchant_name, category_id, kind in rows:
+        if transaction_id not in texts:
+            texts[transaction_id] = [description or "", category_id, kind]
+        if merchant_name:
+            texts[transaction_id][0] += " " + merchant_name
+    return [tuple(sample) for sample in texts.values()]
+
+
+class Categorizer:
+    """LRU моделей по user_id; модель переобучается после invalidate или по истечении ttl."""
+
+    def __init__(self, max_models: int, ttl: float):
+        self.max_models = max_models
+        self.ttl = ttl
+        self._models: OrderedDict[int, CategoryModel | None] = OrderedDict()
+        self._trained_at: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._models.pop(user_id, None)
+            self._trained_at.pop(user_id, None)
+
+    def model_for(self, db: Session, user_id: int) -> CategoryModel | None:
+        now = time.monotonic()
+        with self._lock:
+            if user_id in self._models and now - self._trained_at[user_id] < self.ttl:
+                self._models.move_to_end(user_id)
+                return self._models[user_id]
+
+        model = CategoryModel.train(training_samples(db, user_id, settings.categorizer_max_history))
+        with self._lock:
+            self._models[user_id] = model
+            self._trained_at[user_id] = now
+            self._models.move_to_end(user_id)
+            while len(self._models) > self.max_models:
+                evicted, _ = self._models.popitem(last=False)
+                self._trained_at.pop(evicted, None)
+        logger.debug("Trained categorizer for user %s on %s samples",
+                     user_id, model.samples if model else 0)
+        return model
+
+    def predict(
+        self, db: Session, user_id: int, texts: list[str], kind: str | None = None
+    ) -> list[Prediction]:
+        model = self.model_for(db, user_id)
+        if model is None:
+            return [Prediction(None, 0.0)] * len(texts)
+        return model.predict(texts, kind, settings.categorizer_min_confidence)
+
+
+categorizer = Categorizer(settings.categorizer_cache_size, settings.categorizer_ttl_s)
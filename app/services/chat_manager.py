@@ -1,11 +1,28 @@
+import asyncio
+import json
+import logging
+import threading
+
+from anyio import to_thread
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.chat")
+
+CHAT_CHANNEL = "app_chat"
+# payload pg_notify должен быть короче 8000 байт
+NOTIFY_MAX_BYTES = 8000
+# разделы события dashboard_delta, на которые клиент подписывается по /ws/chat
+DASHBOARD_VIEWS = frozenset({"timeseries", "categories"})
 
 
 class ConnectionManager:
     def __init__(self):
-        self.user_connections: Dict[int, WebSocket] = {}
-        self.admin_connections: Dict[int, WebSocket] = {}
+        self.user_connections: dict[int, WebSocket] = {}
+        self.admin_connections: dict[int, WebSocket] = {}
+        self.subscriptions: dict[int, set[str]] = {}
+        self.broker: PostgresChatBroker | None = None
 
     async def connect(self, websocket: WebSocket, user_id: int, is_admin: bool):
         """
@@ -25,27 +42,167 @@ class ConnectionManager:
             self.admin_connections.pop(user_id, None)
         else:
             self.user_connections.pop(user_id, None)
+            self.subscriptions.pop(user_id, None)
+
+    def subscribe(self, user_id: int, add=(), remove=()) -> set[str]:
+        """
+        Изменить подписку пользователя на разделы дашборда (DASHBOARD_VIEWS); вернуть текущую.
+        """
+        views = self.subscriptions.setdefault(user_id, set())
+        views.update(add)
+        views.difference_update(remove)
+        return views
 
     async def send_to_admin(self, user_id: int, message: str):
         """
         Отправить сообщение от пользователя администратору.
+        При нескольких воркерах сообщение рассылается через брокер во все процессы.
         """
-        for admin_id, admin_ws in self.admin_connections.items():
-            try:
-                await admin_ws.send_json({"from_user": user_id, "message": message})
-            except WebSocketDisconnect:
-                self.disconnect(admin_id, is_admin=True)
+        await self._route({"to": "admin", "user_id": user_id, "message": message})
 
     async def send_to_user(self, user_id: int, message: str):
         """
         Отправить сообщение от администратора пользователю.
         """
-        user_ws = self.user_connections.get(user_id)
+        await self._route({"to": "user", "user_id": user_id, "message": message})
+
+    async def send_event(self, user_id: int, payload: dict):
+        """
+        Отправить пользователю служебное событие (уведомление о бюджете и т.п.) —
+        payload уходит в сокет как есть.
+        """
+        await self._route({"to": "user", "user_id": user_id, "event": payload})
+
+    async def _route(self, event: dict):
+        if self.broker is not None and await self.broker.publish(event):
+            return
+        await self.deliver(event)
+
+    async def deliver(self, event: dict):
+        """
+        Доставить событие сокетам, подключённым к этому процессу.
+        """
+        if event["to"] == "admin":
+            for admin_id, admin_ws in list(self.admin_connections.items()):
+                try:
+                    await admin_ws.send_json(
+                        {"from_user": event["user_id"], "message": event["message"]}
+                    )
+                except WebSocketDisconnect:
+                    self.disconnect(admin_id, is_admin=True)
+            return
+
+        user_ws = self.user_connections.get(event["user_id"])
         if user_ws:
             try:
-                await user_ws.send_json({"from_admin": True, "message": message})
+                if "event" in event:
+                    payload = self._for_subscriber(event["user_id"], event["event"])
+                    if payload is not None:
+                        await user_ws.send_json(payload)
+                else:
+                    await user_ws.send_json({"from_admin": True, "message": event["message"]})
             except WebSocketDisconnect:
-                self.disconnect(user_id, is_admin=False)
+                self.disconnect(event["user_id"], is_admin=False)
+
+
+    def _for_subscriber(self, user_id: int, payload: dict) -> dict | None:
+        """
+        Из dashboard_delta остаются только разделы, на которые подписан сокет;
+        None — отправлять нечего.
+        """
+        if payload.get("type") != "dashboard_delta":
+            return payload
+        views = self.subscriptions.get(user_id, set())
+        payload = {
+            key: value for key, value in payload.items()
+            if key not in DASHBOARD_VIEWS or key in views
+        }
+        return payload if views & payload.keys() else None
+
+    def has_listener(self, user_id: int) -> bool:
+        """
+        Может ли событие для пользователя до кого-то дойти
+        (с брокером — сокет может быть в другом воркере).
+        """
+        return self.broker is not None or user_id in self.user_connections
+
+
+class PostgresChatBroker:
+    """
+    Рассылка сообщений чата между воркерами через LISTEN/NOTIFY.
+    Каждый процесс слушает канал в отдельном потоке и доставляет события
+    своим сокетам; отправитель получает своё же уведомление, поэтому путь доставки один.
+    """
+
+    def __init__(self, engine: Engine, manager: ConnectionManager, channel: str = CHAT_CHANNEL):
+        self.engine = engine
+        self.manager = manager
+        self.channel = channel
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="chat-listener", daemon=True)
+        self._thread.start()
+        self.manager.broker = self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.manager.broker = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def publish(self, event: dict) -> bool:
+        """False — уведомление не отправлено, событие доставляется только локально."""
+        payload = json.dumps(event)
+        if len(payload) >= NOTIFY_MAX_BYTES:
+            logger.warning(
+                "Chat event of %s bytes exceeds NOTIFY limit, delivering locally", len(payload)
+            )
+            return False
+        try:
+            await to_thread.run_sync(self._notify, payload)
+            return True
+        except Exception:
+            logger.exception("Chat NOTIFY failed, delivering locally")
+            return False
+
+    def _notify(self, payload: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": payload},
+            )
+
+    def _listen(self) -> None:
+        import psycopg
+
+        url = self.engine.url.set(drivername="postgresql")
+        conninfo = url.render_as_string(hide_password=False)
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    conn.execute(f'LISTEN "{self.channel}"')
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._dispatch(notify.payload)
+            except Exception:
+                logger.exception("Chat listener connection lost, reconnecting")
+                self._stop.wait(1.0)
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed chat event: %s", payload)
+            return
+        asyncio.run_coroutine_threadsafe(self.manager.deliver(event), self._loop)
 
 
 chat_manager = ConnectionManager()
@@ -0,0 +1,150 @@
+"""
+Живые обновления дашборда по /ws/chat.
+
+Клиент подписывается на разделы ({"subscribe": ["timeseries", "categories"]}) и вместо
+опроса /analytics/timeseries и /categories получает событие dashboard_delta: на сколько
+изменились суммы затронутых дней и категорий. Изменения пользователя копятся
+`dashboard_push_window_s` секунд и уходят одним событием, а если оно не помещается
+в NOTIFY — несколькими: дельты складываются, порядок частей не важен.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from anyio import from_thread
+
+from app.core.config import settings
+from app.services.chat_manager import NOTIFY_MAX_BYTES, ConnectionManager, chat_manager
+from app.utils.money import from_minor
+
+logger = logging.getLogger("app.dashboard")
+
+# запас на обёртку брокера ({"to": "user", "user_id": ..., "event": ...})
+EVENT_MAX_BYTES = NOTIFY_MAX_BYTES - 256
+
+
+@dataclass(frozen=True)
+class DashboardChange:
+    user_id: int
+    day: date
+    category_id: int
+    amount_minor: int  # < 0 — операция удалена
+    currency: str
+    count: int = 1  # -1 — операция удалена
+
+
+def _empty_delta(event_type: str) -> dict:
+    return {"type": event_type, "timeseries": [], "categories": []}
+
+
+class DashboardPublisher:
+    """
+    Копит изменения по пользователям и раз в окно отправляет их суммой.
+    Работает в event loop; из sync-эндпоинтов вызывается через publish_changes.
+    """
+
+    def __init__(self, manager: ConnectionManager, window: float):
+        self.manager = manager
+        self.window = window
+        self._days: dict[int, defaultdict] = {}
+        self._categories: dict[int, defaultdict] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, change: DashboardChange) -> None:
+        if not self.manager.has_listener(change.user_id):
+            return
+        if change.user_id not in self._days:
+            self._days[change.user_id] = defaultdict(int)
+            self._categories[change.user_id] = defaultdict(lambda: [0, 0])
+            asyncio.get_running_loop().call_later(self.window, self._flush, change.user_id)
+        self._days[change.user_id][change.day, change.currency] += change.amount_minor
+        totals = self._categories[change.user_id][change.category_id, change.currency]
+        totals[0] += change.amount_minor
+        totals[1] += change.count
+
+    def add_all(self, changes: list[DashboardChange]) -> None:
+        for change in changes:
+            self.add(change)
+
+    def _flush(self, user_id: int) -> None:
+        payload = self.payload(self._days.pop(user_id), self._categories.pop(user_id))
+        if not payload["timeseries"] and not payload["categories"]:
+            return
+        for part in self.split(payload, EVENT_MAX_BYTES):
+            task = asyncio.create_task(self.manager.send_event(user_id, part))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def split(payload: dict, max_bytes: int) -> list[dict]:
+        """Разбить dashboard_delta на события, каждое не длиннее `max_bytes` в JSON."""
+        parts = [_empty_delta(payload["type"])]
+        size = base = len(json.dumps(parts[0]))
+        for view in ("timeseries", "categories"):
+            for item in payload[view]:
+                item_size = len(json.dumps(item)) + 2  # ", " между элементами
+                if size + item_size > max_bytes and size > base:
+                    parts.append(_empty_delta(payload["type"]))
+                    size = base
+                parts[-1][view].append(item)
+                size += item_size
+        return parts
+
+    @staticmethod
+    def payload(days: dict, categories: dict) -> dict:
+        # изменения, которые за окно взаимно погасились, не отправляются
+        return {
+            "type": "dashboard_delta",
+            "timeseries": [
+                {
+                    "date": day.isoformat(),
+                    "currency": currency,
+                    "amount": str(from_minor(amount_minor, currency)),
+                }
+                for (day, currency), amount_minor in sorted(days.items()) if amount_minor
+            ],
+            "categories": [
+                {
+                    "category_id": category_id,
+                    "currency": currency,
+                    "amount": str(from_minor(amount_minor, currency)),
+                    "transaction_count": count,
+                }
+                for (category_id, currency), (amount_minor, count) in sorted(categories.items())
+                if amount_minor or count
+            ],
+        }
+
+
+dashboard_publisher = DashboardPublisher(chat_manager, settings.dashboard_push_window_s)
+
+
+def dashboard_change(
+    user_id: int,
+    day: date | datetime,
+    category_id: int,
+    amount_minor: int,
+    currency: str,
+    removed: bool = False,
+) -> DashboardChange:
+    day = day.date() if isinstance(day, datetime) else day
+    if removed:
+        return DashboardChange(user_id, day, category_id, -amount_minor, currency, -1)
+    return DashboardChange(user_id, day, category_id, amount_minor, currency)
+
+
+def publish_changes(changes: list[DashboardChange]) -> None:
+    """
+    Передать изменения в публикатор. Вызывать из sync-эндпоинта после коммита;
+    весь список уходит в event loop за один переход (импорт — до тысяч изменений).
+    """
+    if not changes:
+        return
+    try:
+        from_thread.run_sync(dashboard_publisher.add_all, changes)
+    except RuntimeError:
+        # не в потоке воркера (CLI, тесты) — подписчиков здесь нет
+        logger.debug("No event loop, %s dashboard changes dropped", len(changes))
@@ -0,0 +1,182 @@
+"""
+Курсы валют и пересчёт сумм в валюту отчёта.
+
+    python -m app.services.exchange_rates load rates.csv
+
+CSV: заголовок `date,currency,rate`, rate — сколько единиц базовой валюты
+(BASE_CURRENCY) стоит одна единица currency начиная с date.
+"""
+import argparse
+import bisect
+import csv
+import logging
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import Numeric, case, delete, literal, literal_column, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.api.exceptions import MissingExchangeRate
+from app.core.config import settings
+from app.db.models import ExchangeRate, MonthlyRollup, Transaction
+from app.db.upsert import insert_for
+from app.utils.money import DEFAULT_MINOR_UNITS, MINOR_UNITS, minor_units
+
+logger = logging.getLogger("app.exchange_rates")
+
+LOAD_BATCH_SIZE = 5000
+
+
+class RateCache:
+    """
+    Курсы в памяти: для каждой валюты отсортированные даты и курсы,
+    поиск курса на дату — bisect. Перечитывается из БД раз в `ttl` секунд
+    (другие воркеры могли загрузить новые курсы) и сразу после load_rates.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._series: dict[str, tuple[list[date], list[Decimal]]] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def _refresh(self, db: Session) -> None:
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            series: dict[str, tuple[list[date], list[Decimal]]] = {}
+            rows = db.execute(
+                select(ExchangeRate.currency, ExchangeRate.date, ExchangeRate.rate)
+                .order_by(ExchangeRate.currency, ExchangeRate.date)
+            )
+            for currency, day, rate in rows:
+                dates, rates = series.setdefault(currency.strip(), ([], []))
+                dates.append(day)
+                rates.append(Decimal(str(rate)))
+            self._series = series
+            self._loaded_at = time.monotonic()
+
+    def rate(self, db: Session, currency: str, day: date) -> Decimal | None:
+        """Курс `currency` к базовой валюте на дату `day`; None, если курса на эту дату нет."""
+        if currency == settings.base_currency:
+            return Decimal(1)
+        self._refresh(db)
+        dates, rates = self._series.get(currency, ((), ()))
+        index = bisect.bisect_right(dates, day)
+        return rates[index - 1] if index else None
+
+
+rate_cache = RateCache(settings.exchange_rate_cache_ttl_s)
+
+
+def convert_minor(
+    db: Session, amount_minor: int, currency: str, target: str, day: date
+) -> int | None:
+    """Сумма в минимальных единицах `target` по курсам на дату `day`; None, если курса нет."""
+    if currency == target:
+        return amount_minor
+    source_rate, target_rate = rate_cache.rate(db, currency, day), rate_cache.rate(db, target, day)
+    if source_rate is None or target_rate is None:
+        return None
+    major = Decimal(amount_minor).scaleb(-minor_units(currency)) * source_rate / target_rate
+    return int(major.scaleb(minor_units(target)).to_integral_value())
+
+
+def _major_scale(currency_column):
+    """1 минимальная единица валюты строки в основных единицах (0.01 для BYN, 1 для JPY)."""
+    scales = {
+        code: literal_column(str(Decimal(1).scaleb(-units))) for code, units in MINOR_UNITS.items()
+    }
+    default = literal_column(str(Decimal(1).scaleb(-DEFAULT_MINOR_UNITS)))
+    return case(scales, value=currency_column, else_=default)
+
+
+def converted_amount(db: Session, target: str, on: date):
+    """
+    SQL-выражение: Transaction.amount_minor в минимальных единицах `target` (без округления).
+    В базовую валюту — по курсу на дату операции (коррелированный подзапрос по первичному
+    ключу exchange_rates, т.е. join в самой БД), из базовой в `target` — по курсу на дату `on`
+    из кэша, одной константой. Суммы в валюте `target` не пересчитываются.
+    NULL, если для строки нет курса.
+    """
+    target_rate = rate_cache.rate(db, target, on)
+    if target_rate is None:
+        raise MissingExchangeRate(target, on)
+
+    rate_on_date = (
+        select(ExchangeRate.rate)
+        .where(ExchangeRate.currency == Transaction.currency, ExchangeRate.date <= Transaction.date)
+        .order_by(ExchangeRate.date.desc())
+        .limit(1)
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+    to_base = case(
+        (Transaction.currency == settings.base_currency, literal_column("1")), else_=rate_on_date
+    )
+    to_target = literal(Decimal(1).scaleb(minor_units(target)) / target_rate, Numeric(30, 12))
+    return case(
+        (Transaction.currency == target, Transaction.amount_minor),
+        else_=Transaction.amount_minor * _major_scale(Transaction.currency) * to_base * to_target,
+    )
+
+
+def load_rates(engine: Engine, rows) -> int:
+    """Upsert курсов из итерируемого (date, currency, rate); вернуть число строк."""
+    total = 0
+    batch = []
+
+    def flush():
+        with engine.begin() as conn:
+            stmt = insert_for(conn, ExchangeRate).values(batch)
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[ExchangeRate.currency, ExchangeRate.date],
+                set_={"rate": stmt.excluded.rate},
+            ))
+
+    for day, currency, rate in rows:
+        batch.append({"date": day, "currency": currency, "rate": rate})
+        if len(batch) >= LOAD_BATCH_SIZE:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    if total:
+        # итоги закрытых месяцев хранятся в базовой валюте по курсам — пересчитаются при чтении
+        with engine.begin() as conn:
+            conn.execute(delete(MonthlyRollup))
+    rate_cache.invalidate()
+    logger.info("Loaded %s exchange rates", total)
+    return total
+
+
+def read_rates_file(path: Path):
+    with path.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield (date.fromisoformat(row["date"]), row["currency"].strip().upper(),
+                   Decimal(row["rate"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage exchange rates")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="Upsert rates from a CSV file (date,currency,rate)")
+    load.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    from app.db.database import database_engine
+
+    print(f"loaded {load_rates(database_engine, read_rates_file(args.path))} rates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Прогноз расходов по категориям: сколько пользователь потратит к концу месяца и за следующий месяц.
+
+Модель строится по дневным суммам расходов за `forecast_history_days` дней, сразу
+для всех категорий пользователя (столбцы матрицы дни × категории): уровень —
+экспоненциальное сглаживание скользящего недельного среднего, сезонный профиль —
+коэффициенты дней недели. Прогноз держится в LRU воркера до следующей записи
+пользователя (номер из sync_clock) или до смены дня; ночной пакет заранее
+считает прогнозы всех пользователей в пуле процессов и кладёт их в spend_forecasts.
+
+    python -m app.services.forecast precompute --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.api.exceptions import MissingExchangeRate
+from app.core.config import settings
+from app.db.models import Category, SpendForecast, SyncClock, Transaction, User
+from app.db.upsert import insert_for
+from app.services.budgets import month_start, next_month
+from app.services.exchange_rates import converted_amount
+from app.services.sync import current_change_id
+
+logger = logging.getLogger("app.forecast")
+
+# сколько «средних дней» добавляется к каждому дню недели: редкие траты не дают коэффициент 0 или 7
+WEEKDAY_PRIOR = 2.0
+
+
+@dataclass(frozen=True)
+class Forecast:
+    """Суммы в минимальных единицах базовой валюты, по категориям расходов."""
+    as_of: date
+    category_ids: np.ndarray  # (categories,)
+    spent: np.ndarray  # с начала месяца по as_of включительно
+    month_end: np.ndarray  # spent + прогноз на оставшиеся дни месяца
+    next_month: np.ndarray
+
+    def payload(self) -> str:
+        return json.dumps({
+            "category_ids": self.category_ids.tolist(),
+            "spent": self.spent.tolist(),
+            "month_end": self.month_end.tolist(),
+            "next_month": self.next_month.tolist(),
+        })
+
+    @classmethod
+    def from_payload(cls, as_of: date, payload: str) -> "Forecast":
+        data = json.loads(payload)
+        return cls(
+            as_of=as_of,
+            **{
+                key: np.asarray(data[key], dtype=np.int64)
+                for key in ("category_ids", "spent", "month_end", "next_month")
+            },
+        )
+
+
+def _day(value) -> date:
+    # func.date: в Postgres — date, в SQLite — строка 'YYYY-MM-DD'
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def daily_spend(
+    db: Session, user_ids: list[int], since: date, as_of: date
+) -> tuple[dict[int, tuple[np.ndarray, np.ndarray]], set[int]]:
+    """
+    Расходы в базовой валюте по дням [since, as_of] для нескольких пользователей одним запросом:
+    user_id → (category_ids, матрица дни × категории). Второе значение — пользователи,
+    у которых для части операций нет курса.
+    """
+    day = func.date(Transaction.date)
+    amount = converted_amount(db, settings.base_currency, as_of)
+    rows = db.execute(
+        select(
+            Transaction.user_id,
+            Transaction.category_id,
+            day,
+            func.sum(amount),
+            func.count(Transaction.id) - func.count(amount),
+        )
+        .select_from(Transaction)
+        .join(Category, Transaction.category_id == Category.id)
+        .where(
+            Transaction.user_id.in_(user_ids),
+            Category.type == "Расход",
+            Transaction.date >= since,
+            Transaction.date < as_of + timedelta(days=1),
+        )
+        .group_by(Transaction.user_id, Transaction.category_id, day)
+    ).all()
+
+    days = (as_of - since).days + 1
+    by_user: dict[int, list] = {}
+    missing = set()
+    for user_id, category_id, row_day, total, without_rate in rows:
+        if without_rate:
+            missing.add(user_id)
+        cell = (category_id, (_day(row_day) - since).days, float(total or 0))
+        by_user.setdefault(user_id, []).append(cell)
+
+    result = {}
+    for user_id in user_ids:
+        cells = by_user.get(user_id, [])
+        category_ids = np.unique(
+            np.fromiter((cell[0] for cell in cells), dtype=np.int64, count=len(cells))
+        )
+        matrix = np.zeros((days, len(category_ids)))
+        if cells:
+            columns = np.searchsorted(category_ids, [cell[0] for cell in cells])
+            np.add.at(matrix, ([cell[1] for cell in cells], columns), [cell[2] for cell in cells])
+        result[user_id] = (category_ids, matrix)
+    return result, missing
+
+
+def weekday_factors(history: np.ndarray, weekdays: np.ndarray) -> np.ndarray:
+    """
+    (7, категории): во сколько раз расход в этот день недели выше среднего дня
+    (в среднем по неделе — 1).
+    """
+    sums = np.zeros((7, history.shape[1]))
+    np.add.at(sums, weekdays, history)
+    counts = np.bincount(weekdays, minlength=7)[:, None]
+    mean = history.mean(axis=0)
+    factors = np.ones_like(sums)
+    smoothed = (sums + WEEKDAY_PRIOR * mean) / (counts + WEEKDAY_PRIOR)
+    np.divide(smoothed, mean, out=factors, where=mean > 0)
+    return factors / factors.mean(axis=0)
+
+
+def weekly_mean(history: np.ndarray) -> np.ndarray:
+    """Скользящее среднее за 7 дней: ряд без недельной сезонности (короче истории на 6 дней)."""
+    if len(history) < 7:
+        return history.mean(axis=0, keepdims=True)
+    cumulative = np.cumsum(np.vstack([np.zeros((1, history.shape[1])), history]), axis=0)
+    return (cumulative[7:] - cumulative[:-7]) / 7
+
+
+def smoothed_level(series: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Экспоненциальное сглаживание всех столбцов сразу, в замкнутой форме:
+    уровень = Σ α(1-α)^k · x[t-k] + (1-α)^n · x̄ (начальный уровень — среднее ряда).
+    """
+    n = len(series)
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+    return weights @ series + (1 - alpha) ** n * series.mean(axis=0)
+
+
+def build_forecast(category_ids: np.ndarray, matrix: np.ndarray, since: date, as_of: date,
+                   alpha: float = settings.forecast_alpha) -> Forecast:
+    """
+    Прогноз по матрице daily_spend; последняя строка — неполный сегодняшний день,
+    в модель не входит.
+    """
+    weekdays = (np.arange(len(matrix)) + since.weekday()) % 7
+    # история начинается с первой траты: нули до неё (новый пользователь) занижали бы уровень
+    active = np.flatnonzero(matrix[:-1].any(axis=1))
+    first = active[0] if len(active) else len(matrix) - 1
+    history, history_weekdays = matrix[first:-1], weekdays[first:-1]
+
+    if len(category_ids) and len(history):
+        factors = weekday_factors(history, history_weekdays)
+        level = smoothed_level(weekly_mean(history), alpha)
+    else:
+        factors, level = np.ones((7, len(category_ids))), np.zeros(len(category_ids))
+
+    def projected(first: date, end: date) -> np.ndarray:
+        # сумма уровня × коэффициент дня недели по дням [first, end)
+        count = (end - first).days
+        if count <= 0:
+            return np.zeros(len(category_ids))
+        per_weekday = np.bincount((np.arange(count) + first.weekday()) % 7, minlength=7)
+        return level * (per_weekday @ factors)
+
+    month = month_start(as_of)
+    spent = matrix[(month - since).days:].sum(axis=0) if month >= since else matrix.sum(axis=0)
+    tomorrow, following = as_of + timedelta(days=1), next_month(month)
+    return Forecast(
+        as_of=as_of,
+        category_ids=category_ids,
+        spent=np.rint(spent).astype(np.int64),
+        month_end=np.rint(spent + projected(tomorrow, following)).astype(np.int64),
+        next_month=np.rint(projected(following, next_month(following))).astype(np.int64),
+    )
+
+
+def compute_forecasts(
+    db: Session, user_ids: list[int], as_of: date
+) -> tuple[dict[int, Forecast], set[int]]:
+    since = as_of - timedelta(days=settings.forecast_history_days)
+    spend, missing = daily_spend(db, user_ids, since, as_of)
+    forecasts = {
+        user_id: build_forecast(category_ids, matrix, since, as_of)
+        for user_id, (category_ids, matrix) in spend.items()
+        if user_id not in missing
+    }
+    return forecasts, missing
+
+
+class ForecastCache:
+    """user_id → (номер изменения пользователя, прогноз); вытесняются давно не запрошенные."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[int, tuple[int, Forecast]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, change_id: int, as_of: date) -> Forecast | None:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None or item[0] != change_id or item[1].as_of != as_of:
+                return None
+            self._items.move_to_end(user_id)
+            return item[1]
+
+    def put(self, user_id: int, change_id: int, forecast: Forecast) -> None:
+        with self._lock:
+            self._items[user_id] = (change_id, forecast)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+forecast_cache = ForecastCache(settings.forecast_cache_size)
+
+
+def forecast_for(db: Session, user_id: int, as_of: date | None = None) -> Forecast:
+    """Прогноз пользователя: из LRU, из ночного пакета или посчитанный заново."""
+    as_of = as_of or date.today()
+    change_id = current_change_id(db, user_id)
+    forecast = forecast_cache.get(user_id, change_id, as_of)
+    if forecast is not None:
+        return forecast
+
+    stored = db.execute(
+        select(SpendForecast.payload).where(
+            SpendForecast.user_id == user_id,
+            SpendForecast.as_of == as_of,
+            SpendForecast.change_id == change_id,
+        )
+    ).scalar()
+    if stored is not None:
+        forecast = Forecast.from_payload(as_of, stored)
+    else:
+        forecasts, missing = compute_forecasts(db, [user_id], as_of)
+        if missing:
+            raise MissingExchangeRate()
+        forecast = forecasts[user_id]
+    forecast_cache.put(user_id, change_id, forecast)
+    return forecast
+
+
+def precompute_chunk(user_ids: list[int], as_of: date, engine: Engine | None = None) -> int:
+    """Посчитать и сохранить прогнозы пачки пользователей; выполняется в процессе пула."""
+    if engine is None:
+        from app.db.database import database_engine as engine
+
+    with Session(bind=engine) as db:
+        # номера изменений читаются до данных: запись между ними сделает прогноз
+        # устаревшим, а не ошибочным
+        clocks = dict(db.execute(
+            select(SyncClock.user_id, SyncClock.change_id).where(SyncClock.user_id.in_(user_ids))
+        ).all())
+        forecasts, missing = compute_forecasts(db, user_ids, as_of)
+        if missing:
+            logger.warning("No exchange rates for %s users, forecasts skipped", len(missing))
+        if forecasts:
+            now = datetime.now(UTC)
+            stmt = insert_for(db, SpendForecast).values([
+                {"user_id": user_id, "as_of": as_of, "change_id": clocks.get(user_id, 0),
+                 "payload": forecast.payload(), "computed_at": now}
+                for user_id, forecast in forecasts.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[SpendForecast.user_id],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ("as_of", "change_id", "payload", "computed_at")
+                },
+            ))
+            db.commit()
+    return len(forecasts)
+
+
+def _init_worker() -> None:
+    # соединения пула, унаследованные от родителя при fork, дочернему процессу использовать нельзя
+    from app.db.database import database_engine
+
+    database_engine.dispose(close=False)
+
+
+def precompute_all(
+    engine: Engine, workers: int, chunk_size: int = 500, as_of: date | None = None
+) -> dict:
+    """Прогнозы всех пользователей пачками по `chunk_size` в `workers` процессах."""
+    as_of = as_of or date.today()
+    with Session(bind=engine) as db:
+        user_ids = db.execute(select(User.id).order_by(User.id)).scalars().all()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    started = time.perf_counter()
+    if workers <= 1:
+        computed = sum(precompute_chunk(chunk, as_of, engine) for chunk in chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            computed = sum(pool.map(precompute_chunk, chunks, [as_of] * len(chunks)))
+    elapsed = time.perf_counter() - started
+    logger.info("Precomputed %s forecasts in %.1fs with %s workers", computed, elapsed, workers)
+    return {"users": len(user_ids), "computed": computed, "workers": workers, "seconds": elapsed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Spending forecasts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    precompute = commands.add_parser(
+        "precompute", help="Precompute today's forecasts for all users"
+    )
+    precompute.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    precompute.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.db.database import database_engine
+
+    print(precompute_all(database_engine, args.workers, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
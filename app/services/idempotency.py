@@ -0,0 +1,193 @@
+"""
+Заголовок Idempotency-Key для создающих эндпоинтов (создание расхода, импорт, загрузка чека).
+
+Ответ сохраняется в main.idempotency_keys в той же транзакции, что и сама запись,
+и держится в LRU воркера: повтор запроса с тем же ключом получает сохранённый
+ответ, не доходя до записи. Если два одинаковых запроса пришли одновременно,
+вставка ключа второго ждёт коммита первого, получает конфликт — и второй
+откатывает свою запись и отвечает ответом первого.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.api.exceptions import IdempotencyKeyConflict, IdempotencyKeyReused, InvalidIdempotencyKey
+from app.core.config import settings
+from app.db.models import IdempotencyKey
+from app.db.upsert import insert_for
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 128
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    scope: str
+    fingerprint: str
+    status_code: int
+    body: str
+    expires_at: datetime
+
+    def replay(self) -> JSONResponse:
+        return JSONResponse(
+            content=json.loads(self.body),
+            status_code=self.status_code,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+
+class ResponseCache:
+    """(user_id, ключ) → сохранённый ответ; вытесняются давно не запрошенные."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[tuple[int, str], StoredResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, key: str) -> StoredResponse | None:
+        with self._lock:
+            stored = self._items.get((user_id, key))
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.now(UTC):
+                del self._items[user_id, key]
+                return None
+            self._items.move_to_end((user_id, key))
+            return stored
+
+    def put(self, user_id: int, key: str, stored: StoredResponse) -> None:
+        with self._lock:
+            self._items[user_id, key] = stored
+            self._items.move_to_end((user_id, key))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+response_cache = ResponseCache(settings.idempotency_cache_size)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session: Session) -> None:
+    # в LRU попадают только ответы, чья запись действительно закоммичена
+    for user_id, key, stored in session.info.pop("idempotent_responses", ()):
+        response_cache.put(user_id, key, stored)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session) -> None:
+    session.info.pop("idempotent_responses", None)
+
+
+def _aware(moment: datetime) -> datetime:
+    # SQLite возвращает naive datetime
+    return moment if moment.tzinfo else moment.replace(tzinfo=UTC)
+
+
+def fingerprint(payload: bytes | str) -> str:
+    return hashlib.sha256(payload.encode() if isinstance(payload, str) else payload).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Ключ запроса одного пользователя к одному эндпоинту:
+
+        payload = body.model_dump_json()
+        idempotent = idempotent_request(request, db, user.id, "POST /expenses", payload)
+        if idempotent and (replay := idempotent.replay()):
+            return replay
+        ...запись без коммита...
+        if idempotent and (replay := idempotent.record(result)):
+            return replay  # параллельный дубль успел раньше, наша запись откатана
+        db.commit()
+    """
+
+    def __init__(self, db: Session, user_id: int, key: str, scope: str, fingerprint: str):
+        self.db = db
+        self.user_id = user_id
+        self.key = key
+        self.scope = scope
+        self.fingerprint = fingerprint
+
+    def _check(self, stored: StoredResponse) -> StoredResponse:
+        if (stored.scope, stored.fingerprint) != (self.scope, self.fingerprint):
+            raise IdempotencyKeyReused
+        return stored
+
+    def stored(self) -> StoredResponse | None:
+        cached = response_cache.get(self.user_id, self.key)
+        if cached is not None:
+            return self._check(cached)
+        row = self.db.execute(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == self.user_id, IdempotencyKey.key == self.key
+            )
+        ).scalar()
+        if row is None or _aware(row.expires_at) <= datetime.now(UTC):
+            return None
+        stored = StoredResponse(row.scope, row.fingerprint.strip(), row.status_code, row.response,
+                                _aware(row.expires_at))
+        response_cache.put(self.user_id, self.key, stored)
+        return self._check(stored)
+
+    def replay(self) -> JSONResponse | None:
+        stored = self.stored()
+        return stored.replay() if stored is not None else None
+
+    def record(self, result, status_code: int = 200) -> JSONResponse | None:
+        """
+        Сохранить ответ в транзакции запроса. None — ключ наш, можно коммитить;
+        иначе транзакция откачена и возвращается ответ запроса, успевшего раньше.
+        Если его ключ уже истёк или удалён, ответить нечем — 409, клиент повторит запрос.
+        """
+        now = datetime.now(UTC)
+        body = json.dumps(jsonable_encoder(result), ensure_ascii=False)
+        stored = StoredResponse(self.scope, self.fingerprint, status_code, body,
+                                now + timedelta(seconds=settings.idempotency_key_ttl_s))
+        stmt = insert_for(self.db, IdempotencyKey).values(
+            user_id=self.user_id, key=self.key, scope=self.scope, fingerprint=self.fingerprint,
+            status_code=status_code, response=body, created_at=now, expires_at=stored.expires_at,
+        )
+        inserted = self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+                # просроченный, но ещё не удалённый ключ можно занять заново
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ("scope", "fingerprint", "status_code", "response",
+                                   "created_at", "expires_at")
+                },
+                where=IdempotencyKey.expires_at <= now,
+            ).returning(IdempotencyKey.id)
+        ).scalar()
+        if inserted is not None:
+            pending = self.db.info.setdefault("idempotent_responses", [])
+            pending.append((self.user_id, self.key, stored))
+            return None
+
+        self.db.rollback()
+        replay = self.replay()
+        if replay is None:
+            raise IdempotencyKeyConflict
+        return replay
+
+
+def idempotent_request(
+    request: Request, db: Session, user_id: int, scope: str, payload: bytes | str
+):
+    """IdempotentRequest, если клиент прислал Idempotency-Key, иначе None."""
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise InvalidIdempotencyKey
+    return IdempotentRequest(db, user_id, key, scope, fingerprint(payload))
@@ -0,0 +1,162 @@
+"""
+Помесячные итоги пользователя для GET /analytics/monthly (app/db/sql/014_monthly_rollups.sql).
+
+Закрытые месяцы (до текущего) считаются один раз и хранятся в monthly_rollups в
+базовой валюте; запись операции в закрытый месяц удаляет его строку (слушатель
+before_flush), и месяц пересчитается при следующем чтении. Текущий и будущие
+месяцы всегда считаются заново. Пропущенные месяцы диапазона — одним GROUP BY.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from itertools import chain
+
+from sqlalchemy import and_, case, delete, event, extract, func, inspect, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.api.exceptions import MissingExchangeRate
+from app.core.config import settings
+from app.db.database import database_engine
+from app.db.models import Category, MonthlyRollup, SyncClock, Transaction
+from app.db.upsert import insert_for
+from app.services.budgets import month_start, next_month
+from app.services.exchange_rates import converted_amount
+from app.services.sync import current_change_id
+
+logger = logging.getLogger("app.monthly")
+
+
+@dataclass
+class MonthTotals:
+    """Итоги месяца в минимальных единицах базовой валюты."""
+    expenses_minor: int = 0
+    income_minor: int = 0
+    transaction_count: int = 0
+
+
+def month_range(first: date, last: date) -> list[date]:
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def aggregate_months(
+    db: Session, user_id: int, since: date, until: date
+) -> dict[date, MonthTotals]:
+    """
+    Итоги месяцев [since, until) одним запросом: суммы расходов и доходов —
+    условными агрегатами.
+    """
+    amount = converted_amount(db, settings.base_currency, until)
+    year, month = extract("year", Transaction.date), extract("month", Transaction.date)
+    rows = db.execute(
+        select(
+            year,
+            month,
+            func.sum(case((Category.type == "Расход", amount))),
+            func.sum(case((Category.type == "Доход", amount))),
+            func.count(Transaction.id),
+            func.count(Transaction.id) - func.count(amount),
+        )
+        .select_from(Transaction)
+        .join(Category, Transaction.category_id == Category.id)
+        .where(Transaction.user_id == user_id, Transaction.date >= since, Transaction.date < until)
+        .group_by(year, month)
+    ).all()
+    if any(row[5] for row in rows):
+        raise MissingExchangeRate()
+    return {
+        date(int(y), int(m), 1): MonthTotals(round(expenses or 0), round(income or 0), count)
+        for y, m, expenses, income, count, _ in rows
+    }
+
+
+def _store(
+    engine: Engine, user_id: int, seen_change_id: int, computed: dict[date, MonthTotals]
+) -> None:
+    """
+    Сохранить посчитанные закрытые месяцы, если после чтения у пользователя не было записей.
+    Пишущая транзакция держит строку sync_clock до коммита (см. app.services.sync.change_id),
+    поэтому FOR SHARE дождётся её и увидит новый номер — устаревшие итоги не сохранятся.
+    """
+    with Session(bind=engine) as db:
+        clock = db.execute(
+            select(SyncClock.change_id)
+            .where(SyncClock.user_id == user_id)
+            .with_for_update(read=True)
+        ).scalar() or 0
+        if clock != seen_change_id:
+            return
+        now = datetime.now(UTC)
+        db.execute(insert_for(db, MonthlyRollup).values([
+            {"user_id": user_id, "month": month, "expenses_minor": totals.expenses_minor,
+             "income_minor": totals.income_minor, "transaction_count": totals.transaction_count,
+             "computed_at": now}
+            for month, totals in computed.items()
+        ]).on_conflict_do_nothing(index_elements=[MonthlyRollup.user_id, MonthlyRollup.month]))
+        db.commit()
+
+
+def monthly_totals(
+    db: Session, user_id: int, first: date, last: date, engine: Engine = database_engine
+) -> dict[date, MonthTotals]:
+    """
+    Итоги каждого месяца от `first` до `last` включительно (месяцы без операций — нулевые).
+    `db` может читать с реплики; новые итоги закрытых месяцев пишутся в `engine` (primary).
+    """
+    months = month_range(first, last)
+    current = month_start(date.today())
+    closed = [month for month in months if month < current]
+
+    totals: dict[date, MonthTotals] = {}
+    if closed:
+        seen_change_id = current_change_id(db, user_id)
+        for row in db.execute(
+            select(MonthlyRollup).where(
+                MonthlyRollup.user_id == user_id,
+                MonthlyRollup.month >= closed[0],
+                MonthlyRollup.month <= closed[-1],
+            )
+        ).scalars():
+            totals[row.month] = MonthTotals(
+                row.expenses_minor, row.income_minor, row.transaction_count
+            )
+
+        missing = [month for month in closed if month not in totals]
+        if missing:
+            fresh = aggregate_months(db, user_id, missing[0], next_month(missing[-1]))
+            computed = {month: fresh.get(month, MonthTotals()) for month in missing}
+            totals.update(computed)
+            try:
+                _store(engine, user_id, seen_change_id, computed)
+            except Exception:
+                # кэш — оптимизация: ответ не должен падать из-за него
+                logger.exception("Failed to store monthly rollups for user %s", user_id)
+
+    open_months = [month for month in months if month >= current]
+    if open_months:
+        fresh = aggregate_months(db, user_id, open_months[0], next_month(open_months[-1]))
+        totals.update({month: fresh.get(month, MonthTotals()) for month in open_months})
+    return {month: totals[month] for month in months}
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_rollups(session: Session, flush_context, instances) -> None:
+    current = month_start(date.today())
+    stale = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Transaction):
+            continue
+        # у изменённой операции устаревает и месяц, из которого её перенесли
+        days = [obj.date, *inspect(obj).attrs.date.history.deleted]
+        for day in days:
+            if day is not None and month_start(day) < current:
+                stale.add((obj.user_id, month_start(day)))
+    if stale:
+        session.connection().execute(delete(MonthlyRollup).where(or_(*(
+            and_(MonthlyRollup.user_id == user_id, MonthlyRollup.month == month)
+            for user_id, month in stale
+        ))))
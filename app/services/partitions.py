@@ -0,0 +1,170 @@
+"""
+Обслуживание помесячных партиций main.transactions
+(см. app/db/sql/007_transactions_partitioning.sql).
+
+    python -m app.services.partitions ensure --months-ahead 3
+    python -m app.services.partitions archive --older-than-months 24 --dir archive/
+"""
+import argparse
+import gzip
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.database import database_engine
+from app.services.background import PeriodicWorker
+from app.services.reapers import exclusive
+
+logger = logging.getLogger("app.partitions")
+
+_BOUNDS_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: date
+    end: date
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def is_partitioned(engine: Engine) -> bool:
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.connect() as conn:
+        kind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass('main.transactions')")
+        ).scalar()
+    return kind == "p"
+
+
+def list_partitions(engine: Engine) -> list[Partition]:
+    """Помесячные партиции по возрастанию (default-партиция не включается)."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = 'main.transactions'::regclass"
+        )).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS_RE.search(bound)
+        if match:
+            start, end = date.fromisoformat(match[1]), date.fromisoformat(match[2])
+            partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def ensure_partitions(engine: Engine = database_engine, months_ahead: int | None = None) -> int:
+    """
+    Создать партиции на текущий и `months_ahead` следующих месяцев, а также для месяцев,
+    строки которых лежат в default-партиции; вернуть число созданных.
+    """
+    if not is_partitioned(engine):
+        return 0
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    with engine.begin() as conn:
+        created = conn.execute(
+            text("SELECT main.ensure_transaction_partitions(:month, :months)"),
+            {"month": date.today().replace(day=1), "months": months_ahead + 1},
+        ).scalar()
+    if created:
+        logger.info("Created %s transaction partitions", created)
+    return created
+
+
+def _copy_to(engine: Engine, partition: Partition, path: Path) -> None:
+    sql = f'COPY main."{partition.name}" TO STDOUT WITH (FORMAT csv, HEADER true)'
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        with gzip.open(path, "wb") as archive:
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(sql, archive)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    for chunk in copy:
+                        archive.write(chunk)
+        raw.commit()
+    finally:
+        raw.close()
+    with open(path, "rb") as written:
+        os.fsync(written.fileno())
+
+
+def archive_partitions(engine: Engine, before: date, archive_dir: Path,
+                       drop: bool = True) -> list[Path]:
+    """
+    Выгрузить партиции, целиком лежащие раньше `before`, в `archive_dir/<партиция>.csv.gz`,
+    затем отсоединить их от main.transactions и (при drop) удалить; чеки этих операций
+    отвязываются (transaction_id = NULL). Таблица удаляется только после того, как файл
+    записан на диск.
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archived = []
+    for partition in list_partitions(engine):
+        if partition.end > before:
+            break
+        path = archive_dir / f"{partition.name}.csv.gz"
+        _copy_to(engine, partition, path)
+        with engine.begin() as conn:
+            # FK receipts -> transactions снят миграцией 007,
+            # связь чеков с архивными операциями обнуляется здесь
+            conn.execute(text(
+                f'UPDATE main.receipts SET transaction_id = NULL '
+                f'WHERE transaction_id IN (SELECT id FROM main."{partition.name}")'
+            ))
+            conn.execute(text(
+                f'ALTER TABLE main.transactions DETACH PARTITION main."{partition.name}"'
+            ))
+            if drop:
+                conn.execute(text(f'DROP TABLE main."{partition.name}"'))
+        logger.info("Archived partition %s to %s", partition.name, path)
+        archived.append(path)
+    return archived
+
+
+maintain_partitions = exclusive("transaction-partitions", ensure_partitions)
+
+partition_maintainer = PeriodicWorker(
+    "partition-maintainer", maintain_partitions, settings.partition_maintenance_interval_s
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of main.transactions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="Create partitions for the coming months")
+    ensure.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    archive = commands.add_parser("archive", help="Export old partitions to .csv.gz and drop them")
+    archive.add_argument("--older-than-months", type=int, required=True)
+    archive.add_argument("--dir", default=settings.partition_archive_dir)
+    archive.add_argument("--keep-detached", action="store_true",
+                         help="Detach but do not drop the tables")
+    args = parser.parse_args()
+
+    if not is_partitioned(database_engine):
+        raise SystemExit("main.transactions is not partitioned: "
+                         "apply 007_transactions_partitioning.sql first")
+    if args.command == "ensure":
+        print(f"created {ensure_partitions(database_engine, args.months_ahead)} partitions")
+    else:
+        before = add_months(date.today().replace(day=1), -args.older_than_months)
+        paths = archive_partitions(database_engine, before, Path(args.dir),
+                                   drop=not args.keep_detached)
+        print(f"archived {len(paths)} partitions older than {before} to {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
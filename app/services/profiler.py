@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from app.core.config import settings
+
+# Кадры, в которых поток просто ждёт (idle): по умолчанию такие стеки не показываем
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("_base.py", "wait"),
+    ("handlers.py", "dequeue"),
+}
+
+MAX_STACK_DEPTH = 128
+
+
+def _collapse(frame, thread_name: str) -> tuple[str, bool]:
+    """Стек потока в формате collapsed (корень;...;лист) и признак idle-потока."""
+    parts = []
+    leaf = None
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        if leaf is None:
+            leaf = (filename, code.co_name)
+        parts.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    parts.append(thread_name)
+    parts.reverse()
+    return ";".join(parts), leaf in IDLE_LEAVES
+
+
+def sample_stacks(include_idle: bool = False) -> list[str]:
+    """Снять стеки всех потоков процесса, кроме текущего."""
+    current = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = []
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == current:
+            continue
+        stack, idle = _collapse(frame, names.get(thread_id, f"thread-{thread_id}"))
+        if include_idle or not idle:
+            stacks.append(stack)
+    return stacks
+
+
+def render_collapsed(counts: Counter) -> str:
+    """Формат, который принимают flamegraph.pl и speedscope: `стек количество` на строку."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class SamplingProfiler:
+    """Профилирование по запросу: ограниченное по времени сэмплирование стеков воркера."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float,
+                include_idle: bool = False) -> Counter | None:
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            counts: Counter[str] = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                counts.update(sample_stacks(include_idle=include_idle))
+                time.sleep(interval)
+            return counts
+        finally:
+            self._lock.release()
+
+
+class BackgroundSampler:
+    """
+    Постоянный сэмплер с низкой частотой.
+    Хранит в кольцевом буфере стеки последних `buffer_size` замеров.
+    """
+
+    def __init__(self, interval: float = 1.0, buffer_size: int = 600):
+        self.interval = interval
+        self._buffer: deque[tuple[float, list[str]]] = deque(maxlen=buffer_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def hot_stacks(self, seconds: float | None = None) -> Counter:
+        since = time.time() - seconds if seconds else 0.0
+        counts: Counter[str] = Counter()
+        for taken_at, stacks in list(self._buffer):
+            if taken_at >= since:
+                counts.update(stacks)
+        return counts
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._buffer.append((time.time(), sample_stacks()))
+
+
+profiler = SamplingProfiler()
+background_sampler = BackgroundSampler(
+    interval=settings.profiler_sampler_interval_s,
+    buffer_size=settings.profiler_sampler_buffer_size,
+)
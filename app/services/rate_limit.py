@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import case
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import Counter, registry
+from app.db.models import RateLimitBucket
+from app.db.upsert import insert_for
+
+logger = logging.getLogger("app.rate_limit")
+
+RATE_LIMITED = registry.register(Counter(
+    "rate_limit_rejections", "Requests rejected by the rate limiter", ("scope", "key")
+))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token bucket: `capacity` запросов подряд, затем `refill_per_s` запросов в секунду."""
+
+    capacity: float
+    refill_per_s: float
+
+    def retry_after(self, tokens: float, cost: float) -> float:
+        return (cost - tokens) / self.refill_per_s
+
+
+class MemoryBackend:
+    """
+    Bucket'ы в памяти процесса: O(1) на запрос, не больше `max_keys` ключей.
+    При переполнении вытесняется давно не использованный bucket — для него это
+    равносильно полностью восстановленному лимиту.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.refill_per_s)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else limit.retry_after(tokens, cost)
+
+
+class DatabaseBackend:
+    """
+    Bucket'ы в таблице main.rate_limit_buckets, общие для всех воркеров.
+    Пополнение и списание — один INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        now = time.time()
+        bucket = RateLimitBucket.__table__.c
+        accrued = bucket.tokens + (now - bucket.updated_at) * limit.refill_per_s
+        refilled = case((accrued > limit.capacity, limit.capacity), else_=accrued)
+        allowed = refilled >= cost
+        with self.engine.begin() as conn:
+            stmt = insert_for(conn, RateLimitBucket).values(
+                key=key, tokens=limit.capacity - cost, updated_at=now, allowed=True
+            )
+            tokens, ok = conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[bucket.key],
+                    set_={
+                        "tokens": case((allowed, refilled - cost), else_=refilled),
+                        "updated_at": now,
+                        "allowed": allowed,
+                    },
+                ).returning(bucket.tokens, bucket.allowed)
+            ).one()
+        return 0.0 if ok else limit.retry_after(tokens, cost)
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    def hit(self, scope: str, key_type: str, key: str, limit: RateLimit) -> float:
+        """Списать токен; вернуть 0, если запрос разрешён, иначе сколько секунд ждать."""
+        if not self.enabled:
+            return 0.0
+        try:
+            retry_after = self.backend.hit(f"{scope}:{key_type}:{key}", limit)
+        except Exception:
+            # недоступное общее хранилище не должно блокировать вход
+            logger.exception("Rate limiter backend failed, request is allowed")
+            return 0.0
+        if retry_after:
+            RATE_LIMITED.inc((scope, key_type))
+            logger.warning("Rate limit exceeded for %s by %s", scope, key_type)
+        return retry_after
+
+
+# (по IP, по email) для каждой auth-ручки
+AUTH_LIMITS: dict[str, tuple[RateLimit, RateLimit]] = {
+    "login": (RateLimit(capacity=20, refill_per_s=10 / 60),
+              RateLimit(capacity=10, refill_per_s=5 / 60)),
+    "request-code": (RateLimit(capacity=10, refill_per_s=5 / 60),
+                     RateLimit(capacity=3, refill_per_s=1 / 60)),
+    "verify-code": (RateLimit(capacity=20, refill_per_s=10 / 60),
+                    RateLimit(capacity=10, refill_per_s=5 / 60)),
+}
+
+
+def _build_backend():
+    if settings.rate_limit_backend == "database":
+        from app.db.database import database_engine
+
+        return DatabaseBackend(database_engine)
+    return MemoryBackend(settings.rate_limit_max_keys)
+
+
+rate_limiter = RateLimiter(_build_backend(), enabled=settings.rate_limit_enabled)
@@ -0,0 +1,149 @@
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import database_engine
+from app.db.locks import try_advisory_lock
+from app.db.models import EmailCode, IdempotencyKey, RateLimitBucket, RefreshToken, SyncOperation
+from app.services.background import PeriodicWorker
+
+
+def delete_in_batches(
+    engine: Engine, model, key_column, condition, batch_size: int, max_batches: int
+) -> int:
+    """
+    Удалять строки пачками по `batch_size`, каждая пачка — отдельная короткая транзакция.
+    SKIP LOCKED (Postgres) позволяет нескольким воркерам чистить таблицу без ожиданий.
+    Условие повторяется в DELETE: `key_column` может быть частью составного ключа
+    (sync_operations.key уникален только у одного пользователя).
+    """
+    deleted = 0
+    for _ in range(max_batches):
+        keys = (
+            select(key_column)
+            .where(condition)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        with Session(bind=engine) as db:
+            result = db.execute(
+                delete(model).where(key_column.in_(keys), condition),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+    return deleted
+
+
+def reap_refresh_tokens(engine: Engine = database_engine) -> int:
+    """Удалить истёкшие и отозванные refresh-токены"""
+    now = datetime.now(UTC)
+    return delete_in_batches(
+        engine,
+        RefreshToken,
+        RefreshToken.id,
+        or_(RefreshToken.revoked.is_(True), RefreshToken.expires_at < now),
+        settings.reaper_batch_size,
+        settings.reaper_max_batches,
+    )
+
+
+def reap_email_codes(engine: Engine = database_engine) -> int:
+    """
+    Удалить коды, истёкшие раньше чем `email_code_retention_minutes` назад.
+    Запас нужен, чтобы не удалить код, подтверждённый незадолго до истечения:
+    по нему ещё можно вызвать /set-password.
+    """
+    threshold = datetime.now(UTC) - timedelta(minutes=settings.email_code_retention_minutes)
+    return delete_in_batches(
+        engine,
+        EmailCode,
+        EmailCode.email,
+        EmailCode.expires_at < threshold,
+        settings.reaper_batch_size,
+        settings.reaper_max_batches,
+    )
+
+
+def reap_rate_limit_buckets(engine: Engine = database_engine) -> int:
+    """Удалить bucket'ы, не использованные дольше `rate_limit_bucket_ttl_s` (они уже полные)"""
+    threshold = time.time() - settings.rate_limit_bucket_ttl_s
+    return delete_in_batches(
+        engine,
+        RateLimitBucket,
+        RateLimitBucket.key,
+        RateLimitBucket.updated_at < threshold,
+        settings.reaper_batch_size,
+        settings.reaper_max_batches,
+    )
+
+
+def reap_idempotency_keys(engine: Engine = database_engine) -> int:
+    """Удалить сохранённые ответы с истёкшим `idempotency_key_ttl_s`"""
+    return delete_in_batches(
+        engine,
+        IdempotencyKey,
+        IdempotencyKey.id,
+        IdempotencyKey.expires_at < datetime.now(UTC),
+        settings.reaper_batch_size,
+        settings.reaper_max_batches,
+    )
+
+
+def reap_sync_operations(engine: Engine = database_engine) -> int:
+    """Удалить ключи операций POST /sync старше `sync_operation_ttl_s`"""
+    threshold = datetime.now(UTC) - timedelta(seconds=settings.sync_operation_ttl_s)
+    return delete_in_batches(
+        engine,
+        SyncOperation,
+        SyncOperation.key,
+        SyncOperation.created_at < threshold,
+        settings.reaper_batch_size,
+        settings.reaper_max_batches,
+    )
+
+
+def exclusive(name: str, job: Callable[[Engine], int]) -> Callable[[], int]:
+    """
+    Запускать задачу только в одном воркере: остальные процессы в этот тик
+    пропускают её, пока лок держит первый (Postgres advisory lock).
+    """
+    def run(engine: Engine = database_engine) -> int:
+        with try_advisory_lock(engine, f"app.reaper.{name}") as acquired:
+            return job(engine) if acquired else 0
+
+    return run
+
+
+refresh_token_reaper = PeriodicWorker(
+    "refresh-token-reaper",
+    exclusive("refresh-tokens", reap_refresh_tokens),
+    settings.refresh_token_reaper_interval_s,
+)
+email_code_sweeper = PeriodicWorker(
+    "email-code-sweeper",
+    exclusive("email-codes", reap_email_codes),
+    settings.email_code_sweeper_interval_s,
+)
+rate_limit_sweeper = PeriodicWorker(
+    "rate-limit-sweeper",
+    exclusive("rate-limit-buckets", reap_rate_limit_buckets),
+    settings.rate_limit_sweeper_interval_s if settings.rate_limit_backend == "database" else 0,
+)
+idempotency_key_sweeper = PeriodicWorker(
+    "idempotency-key-sweeper",
+    exclusive("idempotency-keys", reap_idempotency_keys),
+    settings.idempotency_sweeper_interval_s,
+)
+sync_operation_sweeper = PeriodicWorker(
+    "sync-operation-sweeper",
+    exclusive("sync-operations", reap_sync_operations),
+    settings.sync_operation_sweeper_interval_s,
+)
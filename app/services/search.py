@@ -0,0 +1,79 @@
+"""
+Поиск операций по описанию и названию магазина из чека.
+
+Postgres: tsvector (russian + english) с GIN-индексом и pg_trgm для опечаток
+(010_transactions_search.sql). SQLite: FTS5-таблица transactions_fts (app/db/sqlite_search.py).
+"""
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.models import Transaction
+
+# триграммное совпадение ранжируется ниже полнотекстового
+FUZZY_WEIGHT = 0.5
+
+_POSTGRES_SEARCH = text("""
+WITH query AS (
+  SELECT websearch_to_tsquery('russian', :q) || websearch_to_tsquery('english', :q) AS ts
+), hits AS (
+  SELECT t.id, ts_rank_cd(t.search_vector, query.ts) AS rank
+  FROM main.transactions t, query
+  WHERE t.user_id = :user_id AND t.search_vector @@ query.ts
+  UNION ALL
+  SELECT t.id, word_similarity(:q, t.description) * :fuzzy_weight
+  FROM main.transactions t
+  WHERE t.user_id = :user_id AND :q <% t.description
+  UNION ALL
+  SELECT r.transaction_id,
+         greatest(ts_rank_cd(r.search_vector, query.ts),
+                  word_similarity(:q, r.merchant_name) * :fuzzy_weight)
+  FROM main.receipts r, query
+  WHERE r.user_id = :user_id AND r.transaction_id IS NOT NULL
+    AND (r.search_vector @@ query.ts OR :q <% r.merchant_name)
+)
+SELECT id, max(rank) AS rank FROM hits
+GROUP BY id
+ORDER BY rank DESC, id DESC
+LIMIT :limit OFFSET :offset
+""")
+
+_SQLITE_SEARCH = text("""
+SELECT rowid AS id, -bm25(transactions_fts) AS rank FROM transactions_fts
+WHERE transactions_fts MATCH :match AND user_id = :user_id
+ORDER BY rank DESC, id DESC
+LIMIT :limit OFFSET :offset
+""")
+
+
+def _fts5_query(q: str) -> str:
+    # каждое слово — префиксный запрос в кавычках: спецсимволы FTS5 из ввода не интерпретируются
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", q.lower()))
+
+
+def search_ids(
+    db: Session, user_id: int, q: str, limit: int, offset: int
+) -> list[tuple[int, float]]:
+    """(id транзакции, релевантность) по убыванию релевантности."""
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+    if db.get_bind().dialect.name == "postgresql":
+        rows = db.execute(_POSTGRES_SEARCH, {**params, "q": q, "fuzzy_weight": FUZZY_WEIGHT})
+    else:
+        match = _fts5_query(q)
+        if not match:
+            return []
+        rows = db.execute(_SQLITE_SEARCH, {**params, "match": match})
+    return [(row.id, float(row.rank)) for row in rows]
+
+
+def search_expenses(
+    db: Session, user_id: int, q: str, limit: int, offset: int
+) -> list[tuple[Transaction, float]]:
+    """Найденные транзакции пользователя с релевантностью; строки загружаются одним запросом."""
+    ranked = search_ids(db, user_id, q, limit, offset)
+    if not ranked:
+        return []
+    rows = db.query(Transaction).filter(Transaction.id.in_([id_ for id_, _ in ranked]))
+    by_id = {transaction.id: transaction for transaction in rows}
+    return [(by_id[id_], rank) for id_, rank in ranked if id_ in by_id]
@@ -1,4 +1,6 @@
 import logging
+import queue
+import threading
 from email.message import EmailMessage
 from smtplib import SMTP_SSL
 
@@ -43,5 +45,58 @@ def send_code(to_email: str, code: str) -> None:
     with SMTP_SSL("smtp.gmail.com", 465) as server:
         server.login(settings.smtp_login, settings.smtp_password)
         server.send_message(message)
-    logger.info(f"Email sender sent verification code to user: {to_email}")
+    logger.info("Email sender sent verification code to user: %s", to_email)
     return
+
+
+class MailQueue:
+    """
+    Очередь отправки писем: SMTP-запрос выполняется в фоновом потоке,
+    а не в потоке обработки HTTP-запроса.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="mail-sender", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def put_code(self, to_email: str, code: str) -> None:
+        self.start()
+        self._queue.put_nowait((to_email, code))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            to_email, code = item
+            try:
+                send_code(to_email=to_email, code=code)
+            except Exception as e:
+                logger.error("Problems with sending the code: %s", e)
+
+
+mail_queue = MailQueue()
+
+
+def enqueue_code(to_email: str, code: str) -> None:
+    mail_queue.put_code(to_email=to_email, code=code)
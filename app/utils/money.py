@@ -0,0 +1,30 @@
+"""
+Деньги хранятся как целое число минимальных единиц валюты (копейки, центы) + код валюты.
+Decimal появляется только на границе API: при разборе запроса и при формировании ответа.
+"""
+from decimal import Decimal
+
+# ISO 4217: знаков после запятой; то же в main.currency_minor_units (008_money_minor_units.sql)
+MINOR_UNITS = {
+    "BHD": 3, "JOD": 3, "KWD": 3, "OMR": 3, "TND": 3,
+    "ISK": 0, "JPY": 0, "KRW": 0, "VND": 0,
+}
+DEFAULT_MINOR_UNITS = 2
+
+
+def minor_units(currency: str) -> int:
+    return MINOR_UNITS.get(currency.upper(), DEFAULT_MINOR_UNITS)
+
+
+def to_minor(amount: Decimal, currency: str) -> int:
+    """Decimal -> минимальные единицы; ValueError, если у суммы больше знаков, чем у валюты."""
+    scaled = Decimal(amount).scaleb(minor_units(currency))
+    if scaled != scaled.to_integral_value():
+        raise ValueError(
+            f"{amount} has more than {minor_units(currency)} decimal places for {currency}"
+        )
+    return int(scaled)
+
+
+def from_minor(amount_minor: int, currency: str) -> Decimal:
+    return Decimal(int(amount_minor)).scaleb(-minor_units(currency))
@@ -1,12 +1,17 @@
 import hashlib
+from functools import lru_cache
 
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(
-    schemes=["bcrypt_sha256"],
-    deprecated="auto",
-    bcrypt_sha256__rounds=12,
-)
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    # passlib импортируется при первом хешировании (или на старте, см. app.core.startup)
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt_sha256"],
+        deprecated="auto",
+        bcrypt_sha256__rounds=12,
+    )
 
 
 def hash_code(code: str) -> str:
@@ -14,11 +19,11 @@ def hash_code(code: str) -> str:
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
+    return get_pwd_context().verify(password, password_hash)
 
 
 def sha256(s: str) -> str:
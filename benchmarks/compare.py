@@ -0,0 +1,59 @@
+"""
+Сравнение двух прогонов benchmarks.run.
+
+    python -m benchmarks.compare baseline.json candidate.json --fail-above 10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(baseline: dict, candidate: dict) -> list[tuple[str, str, float, float, float]]:
+    rows = []
+    for scenario, old in baseline["scenarios"].items():
+        new = candidate["scenarios"].get(scenario)
+        if new is None:
+            continue
+        for metric in METRICS:
+            change = _change(old[metric], new[metric])
+            rows.append((scenario, metric, old[metric], new[metric], change))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--fail-above", type=float, default=None,
+        help="Exit with 1 if any p95 grows or throughput drops by more than this percent",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta']['revision']} -> candidate {candidate['meta']['revision']}")
+    regressed = False
+    for scenario, metric, old, new, change in compare(baseline, candidate):
+        print(f"{scenario:<24} {metric:<15} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%")
+        if args.fail_above is None:
+            continue
+        if metric == "p95_ms" and change > args.fail_above:
+            regressed = True
+        if metric == "throughput_rps" and -change > args.fail_above:
+            regressed = True
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
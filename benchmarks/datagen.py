@@ -0,0 +1,189 @@
+"""
+Генератор синтетических данных для бенчмарков: пользователи, счета, категории
+и транзакции за несколько лет. Генерация детерминирована (seed).
+
+    python -m benchmarks.datagen --db sqlite:///bench.db --users 100 --years 3
+"""
+import argparse
+import random
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
+
+from app.db.models import Account, Base, Category, Transaction, User
+
+BENCH_PASSWORD = "benchmark-password"
+BENCH_EMAIL_TEMPLATE = "bench-user-{}@example.com"
+
+EXPENSE_CATEGORIES = [
+    "Продукты", "Транспорт", "Кафе", "Развлечения", "Здоровье", "Одежда", "Связь", "Коммунальные",
+]
+INCOME_CATEGORIES = ["Зарплата", "Подработка"]
+DESCRIPTIONS = {
+    "Продукты": ["Евроопт", "Корона", "Green", "Соседи"],
+    "Транспорт": ["Метро", "Такси", "Автобус", "Бензин"],
+    "Кафе": ["Кофе", "Обед", "Lido", "Coffee"],
+    "Развлечения": ["Кино", "Концерт", "Боулинг"],
+    "Здоровье": ["Аптека", "Стоматолог"],
+    "Одежда": ["Zara", "Mark Formelle"],
+    "Связь": ["A1", "МТС"],
+    "Коммунальные": ["ЖКХ", "Электроэнергия"],
+    "Зарплата": ["Зарплата"],
+    "Подработка": ["Фриланс"],
+}
+
+BATCH_SIZE = 10_000
+
+
+def bench_email(index: int) -> str:
+    return BENCH_EMAIL_TEMPLATE.format(index)
+
+
+def prepare_schema(engine: Engine, drop: bool = False) -> None:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE SCHEMA IF NOT EXISTS main"))
+    if drop:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _insert_batches(engine: Engine, table, rows) -> int:
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            with engine.begin() as conn:
+                conn.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+def generate(
+    engine: Engine,
+    users: int,
+    years: float,
+    tx_per_day: float,
+    seed: int = 42,
+    drop: bool = False,
+) -> dict:
+    """Заполнить БД синтетическими данными, вернуть количество созданных строк."""
+    # bcrypt на 12 раундах дорогой: считаем хэш один раз и переиспользуем
+    from app.utils.security import hash_password
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    prepare_schema(engine, drop=drop)
+
+    password_hash = hash_password(BENCH_PASSWORD)
+    # transactions.date в Postgres имеет тип DATE: генерируем даты без времени
+    now = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = now - timedelta(days=int(365 * years))
+
+    with engine.begin() as conn:
+        def max_id(table: str) -> int:
+            return conn.execute(text(f"SELECT coalesce(max(id), 0) FROM main.{table}")).scalar()
+
+        offset = max_id("users")
+        account_offset = max_id("accounts")
+        category_offset = max_id("categories")
+
+    user_rows = [
+        {"id": offset + i + 1, "email": bench_email(offset + i), "password_hash": password_hash,
+         "created_at": first_day, "is_admin": i == 0}
+        for i in range(users)
+    ]
+    _insert_batches(engine, User.__table__, user_rows)
+
+    account_rows = [
+        {"id": account_offset + i + 1, "user_id": row["id"], "name": row["email"],
+         "currency": "BYN", "created_at": first_day}
+        for i, row in enumerate(user_rows)
+    ]
+    _insert_batches(engine, Account.__table__, account_rows)
+
+    category_rows = []
+    names = ([(name, "Расход") for name in EXPENSE_CATEGORIES]
+             + [(name, "Доход") for name in INCOME_CATEGORIES])
+
+    def category_id(user_index: int, position: int) -> int:
+        return category_offset + user_index * len(names) + position + 1
+
+    for user_index, row in enumerate(user_rows):
+        for position, (name, kind) in enumerate(names):
+            category_rows.append({
+                "id": category_id(user_index, position),
+                "user_id": row["id"], "name": name, "type": kind, "created_at": first_day,
+            })
+    _insert_batches(engine, Category.__table__, category_rows)
+
+    days = (now - first_day).days
+    expense_count = len(EXPENSE_CATEGORIES)
+
+    def transactions():
+        for user_index, row in enumerate(user_rows):
+            for day in range(days):
+                date = first_day + timedelta(days=day)
+                count = int(tx_per_day) + (rng.random() < tx_per_day % 1)
+                for _ in range(count):
+                    position = rng.randrange(expense_count)
+                    name = names[position][0]
+                    yield {
+                        "user_id": row["id"], "account_id": account_offset + user_index + 1,
+                        "category_id": category_id(user_index, position),
+                        "amount_minor": rng.randint(10_000, 2_000_000), "currency": "BYN",
+                        "date": date, "description": rng.choice(DESCRIPTIONS[name]),
+                        "created_at": date,
+                    }
+                if date.day == 1:
+                    yield {
+                        "user_id": row["id"], "account_id": account_offset + user_index + 1,
+                        "category_id": category_id(user_index, expense_count),
+                        "amount_minor": 25_000_000, "currency": "BYN", "date": date,
+                        "description": "Зарплата", "created_at": date,
+                    }
+
+    transaction_count = _insert_batches(engine, Transaction.__table__, transactions())
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table in ("users", "accounts", "categories", "transactions"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('main.{table}', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM main.{table}))"
+                ))
+            conn.execute(text("ANALYZE"))
+
+    return {
+        "users": users,
+        "first_user_offset": offset,
+        "categories": len(category_rows),
+        "transactions": transaction_count,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark data")
+    parser.add_argument("--db", required=True, help="SQLAlchemy URL, e.g. sqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--tx-per-day", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Drop existing tables first")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db)
+    print(generate(engine, args.users, args.years, args.tx_per_day, seed=args.seed, drop=args.drop))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Сценарии нагрузки. HTTP-сценарий — корутина `(client, session) -> httpx.Response`,
+где session — залогиненный пользователь из BenchSession.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.datagen import BENCH_PASSWORD
+
+API = "/api/v1"
+ACCESS_COOKIE = "my-access-token"
+
+
+@dataclass
+class BenchSession:
+    email: str
+    access_token: str
+    cookie_name: str = ACCESS_COOKIE
+
+    @property
+    def headers(self) -> dict:
+        cookies = {ACCESS_COOKIE: self.access_token, self.cookie_name: self.access_token}
+        return {"cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())}
+
+
+async def login(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    return await client.post(f"{API}/login",
+                             json={"email": session.email, "password": BENCH_PASSWORD})
+
+
+async def expense_create(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    body = {
+        "category_name": "Кафе",
+        "type": "Расход",
+        "amount": "12.50",
+        "date": date.today().isoformat(),
+        "description": "Кофе",
+    }
+    return await client.post(f"{API}/expenses", json=body, headers=session.headers)
+
+
+async def expense_list(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    return await client.get(f"{API}/expenses", headers=session.headers)
+
+
+def _last_quarter() -> dict:
+    return {"start_date": (date.today() - timedelta(days=90)).isoformat() + "T00:00:00"}
+
+
+async def analytics_timeseries(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    return await client.get(f"{API}/analytics/timeseries", params=_last_quarter(),
+                            headers=session.headers)
+
+
+async def analytics_by_category(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    return await client.get(f"{API}/analytics/by-category", params=_last_quarter(),
+                            headers=session.headers)
+
+
+async def categories(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    return await client.get(f"{API}/categories", headers=session.headers)
+
+
+async def dashboard_batch(client: httpx.AsyncClient, session: BenchSession) -> httpx.Response:
+    """Те же четыре чтения дашборда одним POST /batch."""
+    period = _last_quarter()
+    body = {"requests": [
+        {"id": "expenses", "path": "/expenses"},
+        {"id": "timeseries", "path": "/analytics/timeseries", "params": period},
+        {"id": "by_category", "path": "/analytics/by-category", "params": period},
+        {"id": "categories", "path": "/categories"},
+    ]}
+    return await client.post(f"{API}/batch", json=body, headers=session.headers)
+
+
+HTTP_SCENARIOS = {
+    "login": login,
+    "expense_create": expense_create,
+    "expense_list": expense_list,
+    "analytics_timeseries": analytics_timeseries,
+    "analytics_by_category": analytics_by_category,
+    "categories": categories,
+    "dashboard_batch": dashboard_batch,
+}
+
+
+def chat_fanout(connect, admin: BenchSession, users: list[BenchSession],
+                messages_per_user: int) -> dict:
+    """
+    Пользователи отправляют сообщения, администратор получает их через chat_manager.
+    Латентность — от отправки пользователем до получения администратором.
+
+    connect(token) должен вернуть контекстный менеджер с методами send_json/receive_json.
+    """
+    expected = len(users) * messages_per_user
+    latencies: list[float] = []
+    received = threading.Event()
+
+    with connect(admin.access_token) as admin_ws:
+        admin_ws.receive_json()  # приветствие
+
+        def admin_reader():
+            while len(latencies) < expected:
+                data = admin_ws.receive_json()
+                if "from_user" in data:
+                    sent_at = json.loads(data["message"])["sent_at"]
+                    latencies.append(time.perf_counter() - sent_at)
+            received.set()
+
+        reader = threading.Thread(target=admin_reader, daemon=True)
+        reader.start()
+        started = time.perf_counter()
+
+        def user_writer(session: BenchSession):
+            # потерянные сообщения учитываются как ошибки по итоговому счётчику
+            with connect(session.access_token) as ws:
+                ws.receive_json()
+                for _ in range(messages_per_user):
+                    ws.send_json({"message": json.dumps({"sent_at": time.perf_counter()})})
+                    ws.receive_json()
+
+        writers = [threading.Thread(target=user_writer, args=(session,)) for session in users]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        received.wait(timeout=30)
+        wall = time.perf_counter() - started
+
+    return {"durations": latencies, "errors": expected - len(latencies), "wall": wall}
@@ -0,0 +1,63 @@
+"""
+Общая настройка тестов: переменные окружения для Settings, путь к пакету app
+и in-memory SQLite на каждый тест. Модули app импортируются внутри фикстур —
+к этому моменту окружение уже задано.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+_env_defaults = {
+    "app_env": "test",
+    "app_port": "8000",
+    "db_host": "localhost",
+    "db_user": "user",
+    "db_password": "password",
+    "db_name": "test_db",
+    "db_port": "5432",
+    "database_url": "sqlite:///./test.db",
+    "smtp_login": "smtp@example.com",
+    "smtp_password": "smtp-password",
+}
+for key, value in _env_defaults.items():
+    os.environ.setdefault(key, value)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+@pytest.fixture()
+def engine():
+    from app.db.models import Base
+
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db_session(engine) -> Session:
+    from app.services.categories import category_cache
+    from app.services.exchange_rates import rate_cache
+    from app.services.idempotency import response_cache
+
+    # кэши воркера хранят id и курсы из БД предыдущего теста
+    category_cache._users.clear()
+    response_cache._items.clear()
+    rate_cache.invalidate()
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,85 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deps
+from app.api.v1 import batch as batch_module
+from app.db.models import Account, Category, Transaction, User
+from app.schemas.batch import BatchRequest
+from app.services.batch import begin_snapshot, run_batch
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def test_batch_runs_dashboard_reads_with_one_auth(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch, engine
+):
+    user = User(email="alice@example.com", password_hash="hash")
+    account = Account(name=user.email, currency="BYN", user=user)
+    cafe = Category(name="Кафе", type="Расход", user=user)
+    db_session.add_all([user, account, cafe])
+    db_session.flush()
+    for day, amount_minor in ((date(2025, 3, 1), 450), (date(2025, 3, 2), 700)):
+        db_session.add(Transaction(user_id=user.id, account_id=account.id, category_id=cafe.id,
+                                   amount_minor=amount_minor, currency="BYN", date=day))
+    db_session.commit()
+
+    decoded = []
+    monkeypatch.setattr(deps.jwt, "decode", lambda *args, **kwargs: decoded.append(1) or {
+        "type": "access", "sub": user.email,
+    })
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = batch_module.batch(
+            BatchRequest(requests=[
+                {"id": "list", "path": "/expenses"},
+                {"id": "series", "path": "/analytics/timeseries",
+                 "params": {"start_date": "2025-03-01T00:00:00"}},
+                {"id": "split", "path": "/analytics/by-category"},
+                {"id": "bad", "path": "/categories", "params": {"currency": "byn"}},
+            ]),
+            Request({"type": "http", "headers": [(b"cookie", b"my-access-token=valid-token")]}),
+            db_session,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    by_id = {result.id: result for result in response.responses}
+    assert [result.id for result in response.responses] == ["list", "series", "split", "bad"]
+    assert [by_id[key].status for key in ("list", "series", "split", "bad")] == [200, 200, 200, 422]
+    assert (
+        by_id["list"].body.total
+        == by_id["series"].body.total_amount
+        == by_id["split"].body.total_amount
+    )
+    assert len(by_id["series"].body.data_points) == 2
+    assert by_id["bad"].body["detail"][0]["loc"] == ["currency"]
+    # токен разбирается и пользователь ищется один раз на весь пакет
+    assert len(decoded) == 1
+    assert sum("FROM main.users" in statement for statement in statements) == 1
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_subqueries_do_not_wait_for_the_request_pool():
+    # единственное соединение пула занято транзакцией со снимком
+    request_engine = create_engine(POSTGRES_URL, pool_size=1, max_overflow=0, pool_timeout=1)
+
+    def snapshot_of(session):
+        return session.execute(text("SELECT pg_current_snapshot()::text")).scalar_one()
+
+    with Session(bind=request_engine) as db:
+        snapshot = begin_snapshot(db)
+        expected = snapshot_of(db)
+        results = run_batch(db, snapshot, {key: snapshot_of for key in ("a", "b", "c")})
+    request_engine.dispose()
+
+    assert results == {"a": expected, "b": expected, "c": expected}
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.v1 import budgets as budgets_module
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, BudgetSpend, Category, ExchangeRate, Transaction, User
+from app.schemas.budget import BudgetSet
+from app.schemas.expense import ExpenseCreate
+from app.services import budgets as budgets_service
+from app.services.chat_manager import ConnectionManager
+
+
+@pytest.fixture()
+def alerts(monkeypatch: pytest.MonkeyPatch) -> list:
+    published = []
+    monkeypatch.setattr(expenses_module, "publish_alerts", published.extend)
+    return published
+
+
+def _user(session: Session, email: str) -> User:
+    user = User(email=email, password_hash="hash")
+    session.add_all([user, Account(name=email, currency="BYN", user=user)])
+    session.commit()
+    return user
+
+
+def _request(monkeypatch: pytest.MonkeyPatch, user: User) -> Request:
+    monkeypatch.setattr(
+        expenses_module.jwt, "decode", lambda *args, **kwargs: {"type": "access", "sub": user.email}
+    )
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/expenses",
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    })
+
+
+def _spend(session: Session, monkeypatch: pytest.MonkeyPatch, user: User, amount: str) -> None:
+    body = ExpenseCreate(category_name="Кафе", amount=Decimal(amount), date=date.today(),
+                         description="обед")
+    expenses_module.create_expense(body, _request(monkeypatch, user), session)
+
+
+def test_spend_is_tracked_incrementally_and_alerts_once(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch, alerts
+):
+    user = _user(db_session, "alice@example.com")
+    _spend(db_session, monkeypatch, user, "30.00")
+
+    body = BudgetSet(category_name="Кафе", amount=Decimal("100"))
+    status = budgets_module.put_budget(body, user, db_session)
+    assert (status.spent, status.percent) == (Decimal("30.00"), Decimal("30.00"))
+
+    _spend(db_session, monkeypatch, user, "45.00")
+    assert alerts == []
+    _spend(db_session, monkeypatch, user, "10.00")
+    assert [(alert.threshold, alert.spent_minor) for alert in alerts] == [(80, 8500)]
+    _spend(db_session, monkeypatch, user, "1.00")
+    assert len(alerts) == 1
+
+    latest = db_session.query(Transaction).order_by(Transaction.id.desc()).first()
+    expenses_module.delete_expenses(latest.id, _request(monkeypatch, user), db_session)
+    biggest = db_session.query(Transaction).filter(Transaction.amount_minor == 4500).one()
+    expenses_module.delete_expenses(biggest.id, _request(monkeypatch, user), db_session)
+    spend = db_session.query(BudgetSpend).one()
+    assert (spend.spent_minor, spend.alerted_percent) == (4000, 0)
+
+    _spend(db_session, monkeypatch, user, "65.00")
+    assert [alert.threshold for alert in alerts] == [80, 100]
+
+
+def test_budget_status_does_not_scan_transactions(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch, alerts, engine
+):
+    user = _user(db_session, "alice@example.com")
+    body = BudgetSet(category_name="Кафе", amount=Decimal("50"))
+    budgets_module.put_budget(body, user, db_session)
+    _spend(db_session, monkeypatch, user, "20.00")
+
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = budgets_module.get_budgets(user=user, month=None, db=db_session)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert [
+        (budget.category_name, budget.spent, budget.remaining) for budget in response.budgets
+    ] == [("Кафе", Decimal("20.00"), Decimal("30.00"))]
+    assert not [statement for statement in executed if "main.transactions" in statement]
+
+
+def test_events_are_sent_to_user_socket_as_is():
+    class Socket:
+        def __init__(self):
+            self.sent = []
+
+        async def send_json(self, data):
+            self.sent.append(data)
+
+    manager = ConnectionManager()
+    socket = manager.user_connections[7] = Socket()
+    asyncio.run(manager.send_event(7, {"type": "budget_alert", "threshold": 80}))
+    asyncio.run(manager.send_to_user(7, "hi"))
+
+    assert socket.sent == [
+        {"type": "budget_alert", "threshold": 80},
+        {"from_admin": True, "message": "hi"},
+    ]
+
+
+def test_initial_spend_uses_month_start_rate_like_later_writes(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return cls(2025, 3, 15)
+
+    monkeypatch.setattr(budgets_service, "date", Today)
+    user = _user(db_session, "alice@example.com")
+    cafe = Category(name="Кафе", type="Расход", user=user)
+    db_session.add_all([cafe] + [
+        ExchangeRate(currency="USD", date=day, rate=rate)
+        for day, rate in ((date(2025, 3, 1), Decimal("3")), (date(2025, 3, 10), Decimal("3.5")),
+                          (date(2025, 3, 15), Decimal("4")))
+    ])
+    db_session.flush()
+    db_session.add(Transaction(user_id=user.id, account_id=user.accounts[0].id, category_id=cafe.id,
+                               amount_minor=1000, currency="USD", date=date(2025, 3, 10)))
+    db_session.commit()
+
+    budget = budgets_service.set_budget(db_session, user.id, cafe.id, 100_00, "BYN")
+    budgets_service.record_spend(db_session, user.id, cafe.id, date(2025, 3, 12), 1000, "USD")
+    db_session.commit()
+
+    # обе операции по 10 USD — по курсу на 1 марта
+    assert db_session.get(BudgetSpend, (budget.id, date(2025, 3, 1))).spent_minor == 60_00
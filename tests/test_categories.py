@@ -0,0 +1,91 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, Category, SyncClock, Transaction, User
+from app.schemas.expense import ExpenseCreate
+from app.services.categories import category_cache, get_or_create_category
+
+
+@pytest.fixture()
+def statements(engine):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _user(session: Session, email: str) -> User:
+    user = User(email=email, password_hash="hash")
+    session.add_all([user, Account(name=email, currency="BYN", user=user)])
+    session.commit()
+    return user
+
+
+def test_get_or_create_category_is_idempotent(db_session: Session):
+    alice = _user(db_session, "alice@example.com")
+    bob = _user(db_session, "bob@example.com")
+
+    created = get_or_create_category(db_session, alice.id, "Кофе", "Расход")
+    db_session.commit()
+
+    assert get_or_create_category(db_session, alice.id, "Кофе", "Расход") == created
+    assert get_or_create_category(db_session, alice.id, "Кофе", "Доход") != created
+    assert get_or_create_category(db_session, bob.id, "Кофе", "Расход") != created
+    db_session.commit()
+    alice_coffee = db_session.query(Category).filter(
+        Category.user_id == alice.id, Category.name == "Кофе"
+    )
+    assert alice_coffee.count() == 2
+
+
+def test_create_expense_with_cached_category_is_one_insert(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch, statements
+):
+    user = _user(db_session, "alice@example.com")
+    monkeypatch.setattr(
+        expenses_module.jwt, "decode", lambda *args, **kwargs: {"type": "access", "sub": user.email}
+    )
+    request = Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/expenses",
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    })
+    body = ExpenseCreate(category_name="Кофе", amount=Decimal("4.50"), date=datetime(2025, 3, 2),
+                         description="латте")
+
+    for _ in range(3):
+        expenses_module.create_expense(body, request, db_session)
+    statements.clear()
+    expenses_module.create_expense(body, request, db_session)
+
+    assert not [statement for statement in statements if "main.categories" in statement]
+    inserts = [s for s in statements if s.startswith("INSERT INTO main.transactions")]
+    assert len(inserts) == 1
+    assert len({tx.category_id for tx in db_session.query(Transaction)}) == 1
+
+
+def test_existing_category_does_not_move_sync_clock(db_session: Session):
+    user = _user(db_session, "alice@example.com")
+    created = get_or_create_category(db_session, user.id, "Кофе", "Расход")
+    db_session.commit()
+    clock = db_session.get(SyncClock, user.id).change_id
+    assert db_session.get(Category, created).change_id == clock
+
+    category_cache.invalidate(user.id)
+    assert get_or_create_category(db_session, user.id, "Кофе", "Расход") == created
+    db_session.commit()
+
+    db_session.expire_all()
+    assert db_session.get(SyncClock, user.id).change_id == clock
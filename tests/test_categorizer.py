@@ -0,0 +1,114 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, Category, Receipt, Transaction, User
+from app.schemas.expense import CategorizeItem, CategorizeRequest, ExpenseCreate
+from app.services.categorizer import CategoryModel, categorizer
+
+
+@pytest.fixture(autouse=True)
+def _reset_categorizer():
+    yield
+    categorizer._models.clear()
+    categorizer._trained_at.clear()
+
+
+def _user(session: Session, email: str, history: dict[str, list[str]]) -> User:
+    user = User(email=email, password_hash="hash")
+    account = Account(name=email, currency="BYN", user=user)
+    session.add_all([user, account])
+    session.flush()
+    for name, descriptions in history.items():
+        category = Category(name=name, type="Расход", user=user)
+        session.add(category)
+        session.flush()
+        for description in descriptions:
+            session.add(Transaction(user_id=user.id, account_id=account.id, category_id=category.id,
+                                    amount_minor=100, currency="BYN", date=datetime(2025, 3, 1),
+                                    description=description))
+    session.commit()
+    return user
+
+
+def _request(monkeypatch: pytest.MonkeyPatch, user: User, method: str, path: str) -> Request:
+    monkeypatch.setattr(
+        expenses_module.jwt, "decode", lambda *args, **kwargs: {"type": "access", "sub": user.email}
+    )
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    })
+
+
+def test_model_scores_batch():
+    model = CategoryModel.train([
+        ("Кофейня Зерно капучино", 1, "Расход"),
+        ("кофейня латте", 1, "Расход"),
+        ("Евроопт продукты молоко", 2, "Расход"),
+        ("Евроопт хлеб", 2, "Расход"),
+        ("Зарплата за март", 3, "Доход"),
+    ])
+
+    predictions = model.predict(
+        ["капучино в кофейне", "ЕВРООПТ", "совсем незнакомое", "зарплата"], kind="Расход"
+    )
+
+    assert [prediction.category_id for prediction in predictions] == [1, 2, None, None]
+    assert predictions[0].confidence > 0.5
+    assert model.predict(["зарплата"], kind="Доход")[0].category_id == 3
+
+
+def test_categorize_uses_only_own_history(db_session: Session):
+    alice = _user(db_session, "alice@example.com",
+                  {"Кофе": ["кофейня зерно", "кофейня латте"], "Еда": ["евроопт"]})
+    bob = _user(db_session, "bob@example.com", {"Такси": ["яндекс такси"]})
+    receipt_owner = db_session.query(Transaction).filter(Transaction.user_id == bob.id).first()
+    db_session.add(Receipt(user_id=bob.id, transaction_id=receipt_owner.id, file_path="r.jpg",
+                           merchant_name="Uber"))
+    db_session.commit()
+
+    body = CategorizeRequest(items=[
+        CategorizeItem(description="кофейня"), CategorizeItem(merchant_name="uber"),
+    ])
+    alice_result = expenses_module.categorize(body, alice, db_session)
+    bob_result = expenses_module.categorize(body, bob, db_session)
+
+    assert alice_result[0].category_name == "Кофе"
+    assert alice_result[1].category_id is None
+    assert bob_result[0].category_id is None
+    assert bob_result[1].category_name == "Такси"
+
+
+def test_create_expense_keeps_categories_per_user(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    alice = _user(db_session, "alice@example.com", {"Кофе": ["кофейня зерно", "кофейня латте"]})
+    bob = _user(db_session, "bob@example.com", {})
+
+    body = ExpenseCreate(category_name="Кофе", amount=Decimal("4.50"), date=datetime(2025, 3, 2),
+                         description="латте")
+    request = _request(monkeypatch, bob, "POST", "/api/v1/expenses")
+    expenses_module.create_expense(body, request, db_session)
+    bob_tx = db_session.query(Transaction).filter(Transaction.user_id == bob.id).one()
+    assert db_session.get(Category, bob_tx.category_id).user_id == bob.id
+
+    body = ExpenseCreate(amount=Decimal("3.20"), date=datetime(2025, 3, 3),
+                         description="Кофейня на углу")
+    request = _request(monkeypatch, alice, "POST", "/api/v1/expenses")
+    expenses_module.create_expense(body, request, db_session)
+    alice_tx = (
+        db_session.query(Transaction)
+        .filter(Transaction.user_id == alice.id)
+        .order_by(Transaction.id.desc())
+        .first()
+    )
+    category = db_session.get(Category, alice_tx.category_id)
+    assert (category.user_id, category.name) == (alice.id, "Кофе")
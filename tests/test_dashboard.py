@@ -0,0 +1,121 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+from anyio import to_thread
+
+from app.services import dashboard as dashboard_module
+from app.services.chat_manager import NOTIFY_MAX_BYTES, ConnectionManager
+from app.services.dashboard import DashboardPublisher, dashboard_change
+
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class Broker:
+    """Как PostgresChatBroker, но вместо NOTIFY событие сразу доставляется в manager."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self.payloads = []
+
+    async def publish(self, event: dict) -> bool:
+        payload = json.dumps(event)
+        self.payloads.append(payload)
+        await self.manager.deliver(json.loads(payload))
+        return True
+
+
+def _run(manager: ConnectionManager, changes) -> None:
+    async def scenario():
+        publisher = DashboardPublisher(manager, window=0.05)
+        for change in changes:
+            publisher.add(change)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+
+def test_burst_of_writes_is_pushed_once_as_delta():
+    manager = ConnectionManager()
+    socket = manager.user_connections[1] = Socket()
+    manager.subscribe(1, ["timeseries", "categories"])
+
+    _run(manager, [
+        dashboard_change(1, date(2025, 3, 1), 10, 1250, "BYN"),
+        dashboard_change(1, date(2025, 3, 1), 10, 750, "BYN"),
+        dashboard_change(1, date(2025, 3, 2), 11, 300, "BYN"),
+        dashboard_change(1, date(2025, 3, 2), 11, 300, "BYN", removed=True),
+    ])
+
+    assert socket.sent == [{
+        "type": "dashboard_delta",
+        "timeseries": [{"date": "2025-03-01", "currency": "BYN", "amount": "20.00"}],
+        "categories": [
+            {"category_id": 10, "currency": "BYN", "amount": "20.00", "transaction_count": 2}
+        ],
+    }]
+
+
+def test_only_subscribed_views_are_delivered():
+    manager = ConnectionManager()
+    subscribed = manager.user_connections[1] = Socket()
+    unsubscribed = manager.user_connections[2] = Socket()
+    manager.subscribe(1, ["categories"])
+
+    _run(manager, [
+        dashboard_change(1, date(2025, 3, 1), 10, 100, "BYN"),
+        dashboard_change(2, date(2025, 3, 1), 20, 100, "BYN"),
+        dashboard_change(3, date(2025, 3, 1), 30, 100, "BYN"),
+    ])
+
+    assert [set(event) for event in subscribed.sent] == [{"type", "categories"}]
+    assert unsubscribed.sent == []
+
+
+def test_delta_larger_than_notify_limit_is_split():
+    manager = ConnectionManager()
+    socket = manager.user_connections[1] = Socket()
+    manager.subscribe(1, ["timeseries", "categories"])
+    broker = manager.broker = Broker(manager)
+    days = [date(2025, 1, 1) + timedelta(days=i) for i in range(300)]
+
+    _run(manager, [dashboard_change(1, day, 1000 + i, 100, "BYN") for i, day in enumerate(days)])
+
+    assert len(broker.payloads) > 1
+    assert all(len(payload) < NOTIFY_MAX_BYTES for payload in broker.payloads)
+    assert sorted(item["date"] for event in socket.sent for item in event["timeseries"]) == [
+        day.isoformat() for day in days
+    ]
+    categories = {item["category_id"] for event in socket.sent for item in event["categories"]}
+    assert len(categories) == len(days)
+
+
+def test_changes_from_worker_thread_enter_loop_once(monkeypatch):
+    manager = ConnectionManager()
+    socket = manager.user_connections[1] = Socket()
+    manager.subscribe(1, ["timeseries"])
+    entered = []
+    run_sync = dashboard_module.from_thread.run_sync
+    monkeypatch.setattr(dashboard_module.from_thread, "run_sync",
+                        lambda func, *args: entered.append(func) or run_sync(func, *args))
+
+    async def scenario():
+        publisher = DashboardPublisher(manager, window=0.05)
+        monkeypatch.setattr(dashboard_module, "dashboard_publisher", publisher)
+        changes = [dashboard_change(1, date(2025, 3, 1), 10, 100, "BYN") for _ in range(500)]
+        await to_thread.run_sync(dashboard_module.publish_changes, changes)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+    assert len(entered) == 1
+    assert socket.sent == [{
+        "type": "dashboard_delta",
+        "timeseries": [{"date": "2025-03-01", "currency": "BYN", "amount": "500.00"}],
+    }]
@@ -0,0 +1,86 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.exceptions import NoRequestCodeSend
+from app.api.v1 import auth as auth_module
+from app.db.models import EmailCode
+from app.schemas.auth import CodeVerifyIn, EmailIn
+from app.services.rate_limit import MemoryBackend, RateLimiter
+from app.services.reapers import reap_email_codes
+
+EMAIL = "user@example.com"
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": [], "client": ("203.0.113.7", 50000)})
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter(monkeypatch):
+    monkeypatch.setattr(auth_module, "rate_limiter", RateLimiter(MemoryBackend(max_keys=100)))
+
+
+@pytest.fixture()
+def sent_codes(monkeypatch) -> list[str]:
+    codes = []
+    monkeypatch.setattr(auth_module, "enqueue_code", lambda to_email, code: codes.append(code))
+    return codes
+
+
+def test_request_code_upserts_single_row(db_session: Session, sent_codes: list[str]):
+    auth_module.request_code(EmailIn(email=EMAIL), _request(), db_session)
+    db_session.execute(update(EmailCode).values(attempts_left=1, used=True))
+    db_session.commit()
+
+    auth_module.request_code(EmailIn(email=EMAIL), _request(), db_session)
+
+    email_code = db_session.query(EmailCode).one()
+    assert (email_code.attempts_left, email_code.used) == (5, False)
+    assert len(sent_codes) == 2
+
+
+def test_verify_code_decrements_attempts_and_marks_used(db_session: Session, sent_codes: list[str]):
+    auth_module.request_code(EmailIn(email=EMAIL), _request(), db_session)
+    wrong = f"{(int(sent_codes[-1]) + 1) % 1_000_000:06d}"
+
+    with pytest.raises(HTTPException) as exc:
+        auth_module.verify_code(CodeVerifyIn(email=EMAIL, code=wrong), _request(), db_session)
+    assert exc.value.status_code == 400
+    assert db_session.query(EmailCode.attempts_left).scalar() == 4
+
+    right = CodeVerifyIn(email=EMAIL, code=sent_codes[-1])
+    assert auth_module.verify_code(right, _request(), db_session).verified
+    email_code = db_session.query(EmailCode).one()
+    assert email_code.used and email_code.verified_at is not None
+
+    with pytest.raises(NoRequestCodeSend) as exc:
+        auth_module.verify_code(right, _request(), db_session)
+    assert exc.value.detail == "Code have been used"
+
+
+def test_verify_code_rejects_after_attempts_exhausted(db_session: Session, sent_codes: list[str]):
+    auth_module.request_code(EmailIn(email=EMAIL), _request(), db_session)
+    db_session.execute(update(EmailCode).values(attempts_left=0))
+    db_session.commit()
+
+    code_in = CodeVerifyIn(email=EMAIL, code=sent_codes[-1])
+    with pytest.raises(NoRequestCodeSend) as exc:
+        auth_module.verify_code(code_in, _request(), db_session)
+    assert exc.value.detail == "The number of attempts has been exceeded"
+
+
+def test_sweeper_deletes_long_expired_codes(db_session: Session, engine):
+    now = datetime.now(UTC)
+    db_session.add_all([
+        EmailCode(email="fresh@example.com", code_hash="a", expires_at=now - timedelta(minutes=1)),
+        EmailCode(email="stale@example.com", code_hash="b", expires_at=now - timedelta(hours=1)),
+    ])
+    db_session.commit()
+
+    assert reap_email_codes(engine) == 1
+    assert [code.email for code in db_session.query(EmailCode)] == ["fresh@example.com"]
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deps as deps_module
+from app.api.exceptions import MissingExchangeRate
+from app.api.v1 import analytics as analytics_module
+from app.api.v1 import categories as categories_module
+from app.db.models import Account, Category, Transaction, User
+from app.services.exchange_rates import load_rates, rate_cache, read_rates_file
+
+RATES = [
+    (date(2025, 3, 1), "USD", Decimal("3.2")),
+    (date(2025, 3, 10), "USD", Decimal("3.3")),
+    (date(2025, 3, 1), "EUR", Decimal("3.5")),
+]
+
+
+@pytest.fixture()
+def user(db_session: Session, monkeypatch: pytest.MonkeyPatch) -> User:
+    user = User(email="fx@example.com", password_hash="hash")
+    food = Category(name="Еда", type="Расход", user=user)
+    travel = Category(name="Поездки", type="Расход", user=user)
+    byn = Account(name="BYN", currency="BYN", user=user)
+    usd = Account(name="USD", currency="USD", user=user)
+    db_session.add_all([user, food, travel, byn, usd])
+    db_session.flush()
+    db_session.add_all([
+        Transaction(user_id=user.id, account_id=byn.id, category_id=food.id, amount_minor=500,
+                    currency="BYN", date=datetime(2025, 3, 5)),
+        # курс 3.2 (с 1 марта), а не 3.3 (с 10 марта)
+        Transaction(user_id=user.id, account_id=usd.id, category_id=travel.id, amount_minor=1000,
+                    currency="USD", date=datetime(2025, 3, 5)),
+        Transaction(user_id=user.id, account_id=usd.id, category_id=travel.id, amount_minor=1000,
+                    currency="USD", date=datetime(2025, 3, 12)),
+    ])
+    db_session.commit()
+
+    def fake_decode(token, secret, algorithms, options):
+        return {"type": "access", "sub": user.email}
+
+    monkeypatch.setattr(deps_module.jwt, "decode", fake_decode)
+    return user
+
+
+def _request() -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/analytics/by-category",
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    }
+    return Request(scope)
+
+
+def test_rate_cache_picks_latest_rate_on_or_before_date(
+    db_session: Session, tmp_path: Path, engine
+):
+    rates_file = tmp_path / "rates.csv"
+    rows = "".join(f"{day},{code.lower()},{rate}\n" for day, code, rate in RATES)
+    rates_file.write_text("date,currency,rate\n" + rows)
+    assert load_rates(engine, read_rates_file(rates_file)) == 3
+    # повторная загрузка обновляет курс, а не дублирует строку
+    load_rates(engine, [(date(2025, 3, 10), "USD", Decimal("3.31"))])
+
+    assert rate_cache.rate(db_session, "USD", date(2025, 2, 28)) is None
+    assert rate_cache.rate(db_session, "USD", date(2025, 3, 1)) == Decimal("3.2")
+    assert rate_cache.rate(db_session, "USD", date(2025, 3, 9)) == Decimal("3.2")
+    assert rate_cache.rate(db_session, "USD", date(2026, 1, 1)) == Decimal("3.31")
+    assert rate_cache.rate(db_session, "BYN", date(2000, 1, 1)) == Decimal(1)
+
+
+def test_analytics_converts_each_transaction_at_its_date(db_session: Session, user: User, engine):
+    load_rates(engine, RATES)
+
+    result = analytics_module.get_timeserie_by_category(
+        request=_request(), db=db_session, start_date=None, end_date=None, currency=None
+    )
+    assert result.currency == "BYN"
+    # 5.00 BYN + 10 USD * 3.2 + 10 USD * 3.3
+    assert result.total_amount == Decimal("70.00")
+    assert [(c.category_name, c.total_amount) for c in result.categories] == [
+        ("Поездки", Decimal("65.00")),
+        ("Еда", Decimal("5.00")),
+    ]
+
+    in_usd = analytics_module.get_timeserie_by_category(
+        request=_request(),
+        db=db_session,
+        start_date=None,
+        end_date=datetime(2025, 3, 31),
+        currency="USD",
+    )
+    # суммы в долларах не пересчитываются, 5 BYN / 3.3 ≈ 1.52 USD
+    assert in_usd.total_amount == Decimal("21.52")
+
+    stats = categories_module.get_statistic(
+        request=_request(), db=db_session, category_type=None, currency="USD"
+    )
+    assert stats.total_expenses == Decimal("21.52")
+
+
+def test_missing_rate_is_reported_instead_of_summing_raw_amounts(
+    db_session: Session, user: User, engine
+):
+    load_rates(engine, [(date(2025, 3, 10), "USD", Decimal("3.3"))])
+
+    with pytest.raises(MissingExchangeRate):
+        analytics_module.get_timeserie(
+            request=_request(), db=db_session, start_date=None, end_date=None, currency=None
+        )
+    with pytest.raises(MissingExchangeRate):
+        categories_module.get_statistic(
+            request=_request(), db=db_session, category_type=None, currency="EUR"
+        )
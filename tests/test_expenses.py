@@ -75,7 +75,7 @@ def _create_transaction(session: Session, user: User, account: Account, category
         user_id=user.id,
         account_id=account.id,
         category_id=category.id,
-        amount=amount,
+        amount_minor=amount * 100,
         date=datetime(2024, 1, 1, tzinfo=timezone.utc),
         description="Seed transaction",
     )
@@ -153,7 +153,8 @@ def test_create_expense_persists_transaction(db_session: Session, monkeypatch: p
     transactions = db_session.query(Transaction).all()
     assert len(transactions) == 1
     assert transactions[0].description == "Dinner"
-    assert transactions[0].amount == 120
+    assert transactions[0].amount_minor == 12000
+    assert transactions[0].currency == "USD"
 
 
 def test_create_expense_without_token_returns_401(db_session: Session):
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deps as deps_module
+from app.api.v1 import analytics as analytics_module
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, Category, SpendForecast, Transaction, User
+from app.schemas.expense import ExpenseCreate
+from app.services import forecast as forecast_module
+
+
+@pytest.fixture(autouse=True)
+def _clear_forecast_cache():
+    forecast_module.forecast_cache._items.clear()
+
+
+@pytest.fixture()
+def statements(engine):
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": [(b"cookie", b"my-access-token=valid-token")]})
+
+
+def test_forecast_follows_level_and_weekday_profile():
+    since, as_of = date(2025, 1, 1), date(2025, 6, 14)
+    days = [since + timedelta(days=i) for i in range((as_of - since).days + 1)]
+    matrix = np.zeros((len(days), 2))
+    matrix[:, 0] = 1000  # каждый день
+    matrix[:, 1] = [7000 if day.weekday() == 5 else 0 for day in days]  # только по субботам
+
+    forecast = forecast_module.build_forecast(np.array([1, 2]), matrix, since, as_of)
+
+    july_saturdays = sum(date(2025, 7, d).weekday() == 5 for d in range(1, 32))
+    assert forecast.spent.tolist() == [14000, 14000]
+    assert forecast.month_end[0] == 30 * 1000
+    assert forecast.next_month[0] == 31 * 1000
+    assert forecast.next_month[1] == pytest.approx(july_saturdays * 7000, rel=0.05)
+
+
+def test_forecast_is_cached_until_next_write(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch, statements
+):
+    user = User(email="alice@example.com", password_hash="hash")
+    account = Account(name=user.email, currency="BYN", user=user)
+    cafe = Category(name="Кафе", type="Расход", user=user)
+    db_session.add_all([user, account, cafe])
+    db_session.flush()
+    today = date.today()
+    for days_ago in range(1, 29):
+        db_session.add(Transaction(user_id=user.id, account_id=account.id, category_id=cafe.id,
+                                   amount_minor=500, currency="BYN",
+                                   date=today - timedelta(days=days_ago)))
+    db_session.commit()
+
+    def fake_decode(*args, **kwargs):
+        return {"type": "access", "sub": user.email}
+
+    monkeypatch.setattr(deps_module.jwt, "decode", fake_decode)
+    monkeypatch.setattr(expenses_module.jwt, "decode", fake_decode)
+
+    def forecast():
+        return analytics_module.get_forecast(request=_request(), db=db_session, currency=None)
+
+    first = forecast()
+    following = forecast_module.next_month(today.replace(day=1))
+    days_next_month = (forecast_module.next_month(following) - following).days
+    assert [(c.category_name, c.next_month) for c in first.categories] == [
+        ("Кафе", Decimal(5 * days_next_month))
+    ]
+    statements.clear()
+    assert forecast() == first
+    assert not any("FROM main.transactions" in statement for statement in statements)
+
+    expenses_module.create_expense(
+        ExpenseCreate(category_name="Кафе", amount=Decimal("40.00"), date=today),
+        _request(),
+        db_session,
+    )
+    assert forecast().spent == first.spent + Decimal("40.00")
+
+
+def test_nightly_batch_fills_forecasts_served_without_recompute(
+    db_session: Session, statements, engine
+):
+    users = [User(email=f"user{i}@example.com", password_hash="hash") for i in range(3)]
+    db_session.add_all(users)
+    db_session.flush()
+    for user in users:
+        account = Account(name=user.email, currency="BYN", user=user)
+        category = Category(name="Кафе", type="Расход", user=user)
+        db_session.add_all([account, category])
+        db_session.flush()
+        db_session.add(Transaction(user_id=user.id, account_id=account.id, category_id=category.id,
+                                   amount_minor=700, currency="BYN",
+                                   date=date.today() - timedelta(days=3)))
+    db_session.commit()
+
+    report = forecast_module.precompute_all(engine, workers=1, chunk_size=2)
+    assert (report["users"], report["computed"]) == (3, 3)
+    assert db_session.query(SpendForecast).count() == 3
+
+    statements.clear()
+    forecast = forecast_module.forecast_for(db_session, users[0].id)
+    assert forecast.spent.sum() == (700 if date.today().day > 3 else 0)
+    assert not any("FROM main.transactions" in statement for statement in statements)
@@ -0,0 +1,120 @@
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.exceptions import IdempotencyKeyConflict, IdempotencyKeyReused
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, IdempotencyKey, Transaction, User
+from app.schemas.expense import ExpenseCreate, ExpenseImport
+from app.services.idempotency import IdempotentRequest, response_cache
+from app.services.reapers import reap_idempotency_keys
+
+
+@pytest.fixture()
+def user(db_session: Session, monkeypatch: pytest.MonkeyPatch) -> User:
+    user = User(email="alice@example.com", password_hash="hash")
+    db_session.add_all([user, Account(name=user.email, currency="BYN", user=user)])
+    db_session.commit()
+    monkeypatch.setattr(
+        expenses_module.jwt, "decode", lambda *args, **kwargs: {"type": "access", "sub": user.email}
+    )
+    return user
+
+
+def _request(path: str, key: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "query_string": b"",
+        "headers": [
+            (b"cookie", b"my-access-token=valid-token"),
+            (b"idempotency-key", key.encode()),
+        ],
+    })
+
+
+def test_repeated_create_replays_stored_response(db_session: Session, user: User):
+    body = ExpenseCreate(category_name="Кафе", amount=Decimal("4.50"), date=date(2025, 3, 1))
+
+    first = expenses_module.create_expense(body, _request("/api/v1/expenses", "k-1"), db_session)
+    again = expenses_module.create_expense(body, _request("/api/v1/expenses", "k-1"), db_session)
+    # после рестарта воркера ответ берётся из таблицы
+    response_cache._items.clear()
+    from_table = expenses_module.create_expense(
+        body, _request("/api/v1/expenses", "k-1"), db_session
+    )
+
+    assert first == {"Create expense": "OK"}
+    for replay in (again, from_table):
+        assert isinstance(replay, JSONResponse)
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert replay.body.decode() == '{"Create expense":"OK"}'
+    assert db_session.query(Transaction).count() == 1
+    assert db_session.query(IdempotencyKey).count() == 1
+
+    other = ExpenseCreate(category_name="Кафе", amount=Decimal("9.99"), date=date(2025, 3, 1))
+    with pytest.raises(type(IdempotencyKeyReused)) as error:
+        expenses_module.create_expense(other, _request("/api/v1/expenses", "k-1"), db_session)
+    assert error.value.status_code == 422
+
+
+def test_repeated_import_creates_batch_once(db_session: Session, user: User):
+    body = ExpenseImport(items=[
+        ExpenseCreate(category_name="Кафе", amount=Decimal("4.50"), date=date(2025, 3, 1)),
+        ExpenseCreate(category_name="Такси", amount=Decimal("7.00"), date=date(2025, 3, 2)),
+    ])
+
+    request = _request("/api/v1/expenses/import", "batch-1")
+    first = expenses_module.import_expenses(body, request, user, db_session)
+    again = expenses_module.import_expenses(body, request, user, db_session)
+
+    assert first.imported == 2
+    assert again.body.decode() == first.model_dump_json()
+    assert sorted(id_ for (id_,) in db_session.query(Transaction.id)) == sorted(first.ids)
+
+    # тот же ключ на другом эндпоинте — это уже другой запрос
+    with pytest.raises(type(IdempotencyKeyReused)):
+        expenses_module.create_expense(
+            body.items[0], _request("/api/v1/expenses", "batch-1"), db_session
+        )
+
+
+def test_sweeper_deletes_only_expired_keys(db_session: Session, user: User, engine):
+    now = datetime.now(UTC)
+    for key, expires_at in (("old", now - timedelta(minutes=1)),
+                            ("live", now + timedelta(hours=1))):
+        db_session.add(IdempotencyKey(user_id=user.id, key=key, scope="POST /expenses",
+                                      fingerprint="f", status_code=200, response="{}",
+                                      created_at=now, expires_at=expires_at))
+    db_session.commit()
+
+    assert reap_idempotency_keys(engine) == 1
+    assert [key for (key,) in db_session.query(IdempotencyKey.key)] == ["live"]
+
+
+def test_conflict_with_swept_key_returns_409(
+    db_session: Session, user: User, monkeypatch: pytest.MonkeyPatch
+):
+    now = datetime.now(UTC)
+    db_session.add(IdempotencyKey(user_id=user.id, key="k-1", scope="POST /expenses",
+                                  fingerprint="f", status_code=200, response="{}",
+                                  created_at=now, expires_at=now + timedelta(hours=1)))
+    db_session.commit()
+    rollback = db_session.rollback
+
+    def rollback_then_sweep():
+        # ключ первого запроса удаляется между откатом и повторным чтением
+        rollback()
+        db_session.query(IdempotencyKey).delete()
+        db_session.commit()
+
+    monkeypatch.setattr(db_session, "rollback", rollback_then_sweep)
+    with pytest.raises(type(IdempotencyKeyConflict)) as error:
+        idempotent = IdempotentRequest(db_session, user.id, "k-1", "POST /expenses", "f")
+        idempotent.record({"Create expense": "OK"})
+    assert error.value.status_code == 409
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import threading
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+import pytest
+
+from app.core import logging_config
+from app.core.config import settings
+from app.core.request_context import (
+    REQUEST_ID_HEADER,
+    RequestIdMiddleware,
+    get_request_id,
+    request_id_var,
+)
+
+
+@pytest.fixture()
+def json_logs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Логирование приложения в JSON-файл во временном каталоге; после теста — прежняя настройка."""
+    monkeypatch.setattr(settings, "log_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "log_json", True)
+    monkeypatch.setattr(settings, "log_per_process", False)
+    monkeypatch.setattr(settings, "log_level", "DEBUG")
+    logging_config.setup_logging()
+    yield tmp_path / "app.log"
+    monkeypatch.undo()
+    logging_config.setup_logging()
+
+
+def _records(path: Path) -> list[dict]:
+    logging_config.stop_logging()  # дописать очередь
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_app_logger_writes_through_background_listener(json_logs: Path):
+    # файловые и консольные обработчики работают только в потоке слушателя
+    handlers = logging.getLogger("app").handlers
+    assert len(logging_config._listeners) == len(logging_config.QUEUED_LOGGERS)
+    listener_handlers = logging_config._listeners[0].handlers
+    assert len([handler for handler in handlers if isinstance(handler, QueueHandler)]) == 1
+    assert not set(listener_handlers) & set(handlers)
+
+    emitted_in = []
+    original_emit = listener_handlers[0].emit
+
+    def emit(record):
+        emitted_in.append(threading.current_thread())
+        original_emit(record)
+
+    listener_handlers[0].emit = emit
+
+    logging.getLogger("app.test").info("queued %s", "message")
+
+    records = _records(json_logs)
+    assert [record["message"] for record in records] == ["queued message"]
+    assert emitted_in and threading.main_thread() not in emitted_in
+
+
+def test_json_records_keep_request_id_and_traceback(json_logs: Path):
+    token = request_id_var.set("req-42")
+    try:
+        try:
+            raise ZeroDivisionError("division by zero")
+        except ZeroDivisionError:
+            logging.getLogger("app.test").exception("failed for %s", "user-1")
+    finally:
+        request_id_var.reset(token)
+    logging.getLogger("app.test").warning("outside of a request")
+
+    failed, outside = _records(json_logs)
+    assert failed["message"] == "failed for user-1"
+    assert failed["request_id"] == "req-42"
+    assert failed["level"] == "ERROR" and failed["logger"] == "app.test"
+    assert "ZeroDivisionError: division by zero" in failed["exc_info"]
+    assert "exc_info" not in outside and outside["request_id"] == "-"
+
+
+async def _call(middleware, headers):
+    seen, sent = {}, []
+
+    async def app(scope, receive, send):
+        seen["request_id"] = get_request_id()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    await middleware(app)({"type": "http", "headers": headers}, receive, send)
+    response_headers = dict(sent[0]["headers"])
+    return seen["request_id"], response_headers[REQUEST_ID_HEADER.encode()].decode()
+
+
+def test_request_id_is_taken_from_header_or_generated():
+    inner, returned = asyncio.run(_call(RequestIdMiddleware, [(b"x-request-id", b"abc-123")]))
+    assert inner == returned == "abc-123"
+
+    # некорректный заголовок заменяется сгенерированным id
+    inner, returned = asyncio.run(_call(RequestIdMiddleware, [(b"x-request-id", b"bad id\n")]))
+    assert inner == returned and len(returned) == 32
+    assert get_request_id() == "-"
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+
+from app.api import metrics as metrics_module
+from app.core.metrics import (
+    CONTENT_TYPE_LATEST,
+    HTTP_IN_FLIGHT,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    SQL_STATEMENTS,
+    CallbackGauge,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+)
+from app.db.instrumentation import _statement_verb, instrument_engine
+from app.utils import mail_sender
+
+
+def _value(metric, suffix: str, labels: tuple) -> float:
+    return sum(value for sample_suffix, sample_labels, value, _ in metric.samples()
+               if sample_suffix == suffix and sample_labels == labels)
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.register(Counter("requests", "Requests", ("path",)))
+    temperature = registry.register(Gauge("temperature", "Temperature"))
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    with pytest.raises(ValueError):
+        registry.register(Counter("requests", "Duplicate"))
+
+    requests.inc(('/a"b\n',), 2)
+    temperature.set(21.5)
+    for value in (0.05, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render() == (
+        "# HELP requests Requests\n"
+        "# TYPE requests counter\n"
+        'requests_total{path="/a\\"b\\n"} 2\n'
+        "# HELP temperature Temperature\n"
+        "# TYPE temperature gauge\n"
+        "temperature 21.5\n"
+        "# HELP latency_seconds Latency\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 1\n'
+        'latency_seconds_bucket{le="1"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 3\n'
+        "latency_seconds_sum 3.55\n"
+        "latency_seconds_count 3\n"
+    )
+
+
+def test_callback_gauge_is_read_at_scrape_time_and_survives_errors():
+    state = {"depth": 3}
+    registry = Registry()
+    registry.register(CallbackGauge("queue_depth", "Depth", lambda: [((), state["depth"])]))
+    registry.register(CallbackGauge("broken", "Broken", lambda: 1 / 0))
+
+    state["depth"] = 7
+    rendered = registry.render()
+
+    assert "queue_depth 7\n" in rendered
+    assert "# TYPE broken gauge\n" in rendered and "\nbroken " not in rendered
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/fail")
+    def fail():
+        raise RuntimeError("boom")
+
+    return TestClient(MetricsMiddleware(app), raise_server_exceptions=False)
+
+
+def test_middleware_labels_requests_by_route_template():
+    client = _client()
+    labels = ("GET", "/items/{item_id}", "200")
+    before = _value(HTTP_REQUESTS, "_total", labels)
+    observed_before = _value(HTTP_LATENCY, "_count", labels[:2])
+
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/missing").status_code == 404
+    assert client.get("/fail").status_code == 500
+
+    # один ряд на шаблон, а не на каждый id
+    assert _value(HTTP_REQUESTS, "_total", labels) - before == 2
+    assert _value(HTTP_LATENCY, "_count", labels[:2]) - observed_before == 2
+    assert _value(HTTP_REQUESTS, "_total", ("GET", "unmatched", "404")) >= 1
+    assert _value(HTTP_REQUESTS, "_total", ("GET", "/fail", "500")) >= 1
+    assert not any("/items/1" in labels[1] for _, labels, _, _ in HTTP_REQUESTS.samples())
+    assert _value(HTTP_IN_FLIGHT, "", ()) == 0
+
+
+def test_metrics_endpoint_serves_registry():
+    response = asyncio.run(metrics_module.metrics())
+
+    assert response.media_type == CONTENT_TYPE_LATEST
+    body = response.body.decode()
+    names = ("http_requests", "sql_statement_duration_seconds", "db_pool_connections",
+             "mail_queue_depth")
+    for name in names:
+        assert f"# TYPE {name} " in body
+
+
+def test_sql_statements_are_counted_by_verb():
+    engine = create_engine("sqlite+pysqlite:///:memory:", poolclass=StaticPool)
+    instrument_engine(engine)
+    instrument_engine(engine)  # повторная подписка не удваивает счёт
+    before = _value(SQL_STATEMENTS, "_total", ("SELECT",))
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert _value(SQL_STATEMENTS, "_total", ("SELECT",)) - before == 1
+    assert _statement_verb("  with recent as (select 1) select * from recent") == "WITH"
+    assert _statement_verb("PRAGMA foreign_keys") == "OTHER"
+
+
+def test_mail_queue_sends_in_background_and_survives_failures(monkeypatch):
+    sent = []
+
+    def send_code(to_email: str, code: str) -> None:
+        if to_email == "broken@example.com":
+            raise OSError("SMTP is down")
+        sent.append((to_email, code, threading.current_thread().name))
+
+    monkeypatch.setattr(mail_sender, "send_code", send_code)
+    queue = mail_sender.MailQueue()
+
+    queue.put_code("broken@example.com", "000000")
+    queue.put_code("user@example.com", "123456")
+    queue.stop()  # дожидается отправки всего, что уже в очереди
+
+    assert sent == [("user@example.com", "123456", "mail-sender")]
+    assert queue.qsize() == 0
+
+
+def test_request_code_does_not_wait_for_smtp(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(mail_sender, "send_code", lambda to_email, code: release.wait(5))
+    queue = mail_sender.MailQueue()
+    monkeypatch.setattr(mail_sender, "mail_queue", queue)
+
+    mail_sender.enqueue_code("user@example.com", "123456")
+    mail_sender.enqueue_code("user@example.com", "654321")
+
+    # первое письмо «отправляется», второе ждёт в очереди; вызывающий поток не блокируется
+    assert queue.qsize() >= 1
+    release.set()
+    queue.stop()
+    assert queue.qsize() == 0
@@ -0,0 +1,148 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deps as deps_module
+from app.api.exceptions import AccountNotFound, InvalidAmount
+from app.api.v1 import analytics as analytics_module
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, Transaction, User
+from app.schemas.expense import ExpenseCreate, ExpenseRead
+from app.utils.money import from_minor, to_minor
+
+
+@pytest.fixture()
+def user(db_session: Session, monkeypatch: pytest.MonkeyPatch) -> User:
+    user = User(email="money@example.com", password_hash="hash")
+    db_session.add_all([user, Account(name="Main", currency="BYN", user=user)])
+    db_session.commit()
+
+    def fake_decode(token, secret, algorithms, options):
+        return {"type": "access", "sub": user.email}
+
+    monkeypatch.setattr(deps_module.jwt, "decode", fake_decode)
+    monkeypatch.setattr(expenses_module.jwt, "decode", fake_decode)
+    return user
+
+
+def _request() -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/expenses",
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    }
+    return Request(scope)
+
+
+def _create(db_session: Session, amount: str, category: str = "Кафе", day: date = date(2025, 3, 1)):
+    body = ExpenseCreate(category_name=category, amount=Decimal(amount), date=day)
+    expenses_module.create_expense(body=body, request=_request(), db=db_session)
+
+
+def test_minor_units_round_trip_exactly():
+    assert to_minor(Decimal("12.34"), "BYN") == 1234
+    assert to_minor(Decimal("0.1"), "USD") == 10
+    assert to_minor(Decimal("1500"), "JPY") == 1500
+    assert to_minor(Decimal("1.005"), "KWD") == 1005
+    assert from_minor(1234, "BYN") == Decimal("12.34")
+    assert str(from_minor(5, "BYN")) == "0.05"
+    assert from_minor(1500, "jpy") == Decimal("1500")
+
+    with pytest.raises(ValueError):
+        to_minor(Decimal("1.50"), "JPY")
+    with pytest.raises(ValueError):
+        to_minor(Decimal("0.001"), "BYN")
+
+
+def test_create_expense_keeps_kopecks(db_session: Session, user: User):
+    _create(db_session, "12.99")
+
+    transaction = db_session.query(Transaction).one()
+    assert transaction.amount_minor == 1299
+    assert transaction.currency == "BYN"
+
+    read = ExpenseRead.model_validate(transaction)
+    assert read.amount == Decimal("12.99")
+    assert "amount_minor" not in read.model_dump()
+
+
+def test_create_expense_without_account_returns_404(db_session: Session, user: User):
+    db_session.query(Account).delete()
+    db_session.commit()
+
+    with pytest.raises(AccountNotFound) as error:
+        _create(db_session, "10.00")
+    assert error.value.status_code == 404
+    assert db_session.query(Transaction).count() == 0
+
+
+def test_create_expense_rejects_fraction_for_zero_decimal_currency(db_session: Session, user: User):
+    db_session.query(Account).update({Account.currency: "JPY"})
+    db_session.commit()
+
+    with pytest.raises(InvalidAmount):
+        _create(db_session, "10.50")
+
+
+def test_analytics_sums_minor_units_in_sql(db_session: Session, user: User):
+    for amount in ("0.10", "0.20", "0.05", "12.50"):
+        _create(db_session, amount, category="Кафе")
+    _create(db_session, "100.01", category="Продукты", day=date(2025, 3, 2))
+
+    by_category = analytics_module.get_timeserie_by_category(
+        request=_request(), db=db_session, start_date=None, end_date=None, currency=None
+    )
+    assert by_category.total_amount == Decimal("112.86")
+    assert [
+        (c.category_name, c.total_amount, c.transaction_count) for c in by_category.categories
+    ] == [
+        ("Продукты", Decimal("100.01"), 1),
+        ("Кафе", Decimal("12.85"), 4),
+    ]
+
+    timeseries = analytics_module.get_timeserie(
+        request=_request(),
+        db=db_session,
+        start_date=datetime(2025, 3, 1),
+        end_date=None,
+        currency=None,
+    )
+    assert timeseries.total_amount == Decimal("112.86")
+    assert timeseries.average_per_day == Decimal("56.43")
+    assert len(timeseries.data_points) == 5
+
+
+def test_timeseries_reads_points_and_totals_in_one_query(db_session: Session, user: User, engine):
+    _create(db_session, "4.50")
+    _create(db_session, "7.00", day=date(2025, 3, 2))
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        timeseries = analytics_module.get_timeserie(
+            request=_request(), db=db_session, start_date=None, end_date=None, currency=None
+        )
+        empty = analytics_module.get_timeserie(
+            request=_request(),
+            db=db_session,
+            start_date=datetime(2030, 1, 1),
+            end_date=None,
+            currency=None,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    points_total = sum(point.amount for point in timeseries.data_points)
+    assert timeseries.total_amount == points_total == Decimal("11.50")
+    assert empty.total_amount == 0 and empty.data_points == []
+    assert sum("FROM main.transactions" in statement for statement in statements) == 2
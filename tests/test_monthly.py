@@ -0,0 +1,105 @@
+from datetime import date
+from decimal import Decimal
+from functools import partial
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deps as deps_module
+from app.api.v1 import analytics as analytics_module
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, MonthlyRollup, Transaction, User
+from app.schemas.expense import ExpenseCreate
+from app.services import monthly as monthly_module
+
+
+@pytest.fixture()
+def user(db_session: Session, monkeypatch: pytest.MonkeyPatch, engine) -> User:
+    user = User(email="alice@example.com", password_hash="hash")
+    db_session.add_all([user, Account(name=user.email, currency="BYN", user=user)])
+    db_session.commit()
+
+    def fake_decode(*args, **kwargs):
+        return {"type": "access", "sub": user.email}
+
+    monkeypatch.setattr(deps_module.jwt, "decode", fake_decode)
+    monkeypatch.setattr(expenses_module.jwt, "decode", fake_decode)
+    # итоги закрытых месяцев сохраняются в тестовую БД
+    monkeypatch.setattr(
+        analytics_module, "monthly_totals", partial(monthly_module.monthly_totals, engine=engine)
+    )
+    return user
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": [(b"cookie", b"my-access-token=valid-token")]})
+
+
+def _create(session: Session, category: str, kind: str, amount: str, day: date) -> None:
+    body = ExpenseCreate(category_name=category, type=kind, amount=Decimal(amount), date=day)
+    expenses_module.create_expense(body, _request(), session)
+
+
+def _monthly(session: Session):
+    return analytics_module.get_monthly(
+        request=_request(),
+        db=session,
+        start_date=date(2025, 1, 15),
+        end_date=date(2025, 3, 1),
+        currency=None,
+    )
+
+
+@pytest.fixture()
+def statements(engine):
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_monthly_fills_gaps_and_serves_closed_months_from_rollups(
+    db_session: Session, user: User, statements
+):
+    _create(db_session, "Кафе", "Расход", "10.00", date(2025, 1, 3))
+    _create(db_session, "Кафе", "Расход", "2.50", date(2025, 1, 20))
+    _create(db_session, "Зарплата", "Доход", "100.00", date(2025, 3, 5))
+    _create(db_session, "Кафе", "Расход", "99.00", date(2025, 4, 1))
+
+    statements.clear()
+    first = _monthly(db_session)
+    assert [
+        (m.year, m.month, m.total_expenses, m.total_income, m.net, m.transaction_count)
+        for m in first.months
+    ] == [
+        (2025, 1, Decimal("12.50"), Decimal("0.00"), Decimal("-12.50"), 2),
+        (2025, 2, Decimal("0.00"), Decimal("0.00"), Decimal("0.00"), 0),
+        (2025, 3, Decimal("0.00"), Decimal("100.00"), Decimal("100.00"), 1),
+    ]
+    assert sum("FROM main.transactions" in statement for statement in statements) == 1
+    assert db_session.query(MonthlyRollup).count() == 3
+
+    statements.clear()
+    assert _monthly(db_session) == first
+    assert not any("FROM main.transactions" in statement for statement in statements)
+
+
+def test_writes_into_closed_month_drop_its_rollup(db_session: Session, user: User):
+    _create(db_session, "Кафе", "Расход", "10.00", date(2025, 1, 3))
+    _monthly(db_session)
+
+    _create(db_session, "Кафе", "Расход", "5.00", date(2025, 2, 10))
+    assert sorted(month.month for (month,) in db_session.query(MonthlyRollup.month)) == [1, 3]
+    assert [m.total_expenses for m in _monthly(db_session).months] == [
+        Decimal("10.00"), Decimal("5.00"), Decimal("0.00")
+    ]
+
+    january = db_session.query(Transaction).filter(Transaction.amount_minor == 1000).one()
+    expenses_module.delete_expenses(january.id, _request(), db_session)
+    assert [m.transaction_count for m in _monthly(db_session).months] == [0, 1, 0]
@@ -0,0 +1,116 @@
+import os
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Account, Category, Receipt, Transaction, User
+from app.services.partitions import (
+    _BOUNDS_RE,
+    add_months,
+    archive_partitions,
+    ensure_partitions,
+    maintain_partitions,
+)
+
+# БД со всеми миграциями app/db/sql (партиционирование есть только в Postgres)
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2024, 11, 15), 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2025, 1, 31), -1) == date(2024, 12, 1)
+    assert add_months(date(2025, 3, 1), -27) == date(2022, 12, 1)
+
+
+def test_partition_bounds_are_parsed_from_pg_get_expr():
+    match = _BOUNDS_RE.search("FOR VALUES FROM ('2025-01-01') TO ('2025-02-01')")
+    assert match[1] == "2025-01-01" and match[2] == "2025-02-01"
+    assert _BOUNDS_RE.search("DEFAULT") is None
+
+
+def test_maintenance_is_noop_without_partitioned_table():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    assert ensure_partitions(engine) == 0
+    assert maintain_partitions(engine) == 0
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_future_dated_rows_move_from_default_partition():
+    engine = create_engine(POSTGRES_URL)
+    future = add_months(date.today().replace(day=1), 9)
+    partition = f"transactions_y{future:%Y}m{future:%m}"
+
+    # всё в одной транзакции, включая DDL, и откатывается в конце
+    with engine.connect() as conn, conn.begin() as transaction:
+        session = Session(bind=conn)
+        user = User(email="future@example.com", password_hash="hash")
+        account = Account(name=user.email, currency="BYN", user=user)
+        category = Category(name="Отпуск", type="Расход", user=user)
+        session.add_all([user, account, category])
+        session.flush()
+        session.add(Transaction(user_id=user.id, account_id=account.id, category_id=category.id,
+                                amount_minor=100_000, currency="BYN", date=future))
+        session.flush()
+
+        def location() -> str:
+            return conn.execute(text(
+                "SELECT tableoid::regclass::text FROM main.transactions WHERE user_id = :user_id"
+            ), {"user_id": user.id}).scalar_one()
+
+        assert location() == "main.transactions_default"
+        # месяц строки — за пределами запрошенного диапазона:
+        # партиция создаётся по содержимому default
+        conn.execute(text("SELECT main.ensure_transaction_partitions(:month, 1)"),
+                     {"month": date.today()})
+        assert location() == f"main.{partition}"
+        assert conn.execute(text("SELECT count(*) FROM main.transactions_default")).scalar() == 0
+
+        # повторный вызов, уже с этим месяцем в диапазоне, ничего не ломает
+        conn.execute(text("SELECT main.ensure_transaction_partitions(:month, 12)"),
+                     {"month": date.today()})
+        assert location() == f"main.{partition}"
+        transaction.rollback()
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_archiving_unlinks_receipts_of_dropped_transactions(tmp_path: Path):
+    engine = create_engine(POSTGRES_URL)
+    month = date(1990, 1, 1)  # заведомо старше любых реальных партиций
+    with Session(bind=engine) as session:
+        user = User(email="archive@example.com", password_hash="hash")
+        account = Account(name=user.email, currency="BYN", user=user)
+        category = Category(name="Кафе", type="Расход", user=user)
+        session.add_all([user, account, category])
+        session.commit()
+        user_id, account_id, category_id = user.id, account.id, category.id
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT main.ensure_transaction_partitions(:month, 1)"),
+                         {"month": month})
+        with Session(bind=engine) as session:
+            transaction = Transaction(user_id=user_id, account_id=account_id,
+                                      category_id=category_id, amount_minor=500, currency="BYN",
+                                      date=month)
+            receipt = Receipt(user_id=user_id, file_path="receipt.jpg", transaction=transaction)
+            session.add_all([transaction, receipt])
+            session.commit()
+            receipt_id = receipt.id
+
+        archived = archive_partitions(engine, add_months(month, 1), tmp_path)
+
+        assert [path.name for path in archived] == ["transactions_y1990m01.csv.gz"]
+        with Session(bind=engine) as session:
+            assert session.get(Receipt, receipt_id).transaction_id is None
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM main.users WHERE id = :id"), {"id": user_id})
+            conn.execute(text('DROP TABLE IF EXISTS main."transactions_y1990m01"'))
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api import deps
+from app.api.v1 import admin as admin_module
+from app.db.models import User
+from app.services.profiler import SamplingProfiler, render_collapsed, sample_stacks
+
+
+@pytest.fixture()
+def spinning_thread():
+    """Поток, занятый в _spin, пока тест не закончится."""
+    stop = threading.Event()
+
+    def _spin():
+        while not stop.is_set():
+            sum(range(100))
+
+    thread = threading.Thread(target=_spin, name="busy-worker", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture()
+def waiting_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, name="idle-worker", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_admin_gate_rejects_regular_users():
+    with pytest.raises(HTTPException) as error:
+        deps.get_admin_user(User(email="user@example.com", is_admin=False))
+    assert error.value.status_code == 403
+
+    admin = User(email="admin@example.com", is_admin=True)
+    assert deps.get_admin_user(admin) is admin
+
+
+def test_missing_access_token_is_401():
+    request = Request({"type": "http", "headers": []})
+    with pytest.raises(HTTPException) as error:
+        deps.get_current_user(request, db=None)
+    assert error.value.status_code == 401
+
+
+def test_stacks_are_collapsed_from_thread_name_to_leaf(spinning_thread, waiting_thread):
+    stacks = [stack for stack in sample_stacks() if stack.startswith("busy-worker;")]
+    assert len(stacks) == 1
+    frames = stacks[0].split(";")
+    assert frames[-1].startswith("_spin (test_profiler.py:")
+    assert any(frame.startswith("run (threading.py:") for frame in frames)
+
+    # поток, ждущий Event, виден только с include_idle
+    assert not any(stack.startswith("idle-worker;") for stack in sample_stacks())
+    assert any(stack.startswith("idle-worker;") for stack in sample_stacks(include_idle=True))
+
+
+def test_render_collapsed_orders_by_count():
+    counts = Counter({"main;handler;query": 1, "main;handler;render": 3})
+    assert render_collapsed(counts) == "main;handler;render 3\nmain;handler;query 1\n"
+
+
+def test_profile_endpoint_returns_flamegraph_input(spinning_thread):
+    admin = User(id=1, email="admin@example.com", is_admin=True)
+    body = asyncio.run(admin_module.run_profile(admin=admin, seconds=0.05, interval_ms=5,
+                                                include_idle=False))
+
+    lines = [line for line in body.splitlines() if line.startswith("busy-worker;")]
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.endswith(")") and int(count) >= 1
+
+
+def test_only_one_profile_runs_at_a_time():
+    profiler = SamplingProfiler()
+    started, release = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        with profiler._lock:
+            started.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    started.wait()
+    try:
+        assert profiler.busy
+        assert profiler.profile(0.01, 0.001) is None
+    finally:
+        release.set()
+        holder.join()
+    assert profiler.profile(0.01, 0.001) is not None
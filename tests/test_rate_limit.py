@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from fastapi import Response
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.exceptions import TooManyRequests
+from app.api.v1 import auth as auth_module
+from app.db.models import RateLimitBucket
+from app.schemas.auth import LoginIn
+from app.services.rate_limit import DatabaseBackend, MemoryBackend, RateLimit, RateLimiter
+from app.services.reapers import reap_rate_limit_buckets
+
+LIMIT = RateLimit(capacity=2, refill_per_s=1.0)
+
+
+@pytest.fixture()
+def database_backend(engine) -> DatabaseBackend:
+    return DatabaseBackend(engine)
+
+
+@pytest.mark.parametrize("backend_name", ["memory", "database"])
+def test_bucket_allows_burst_then_rejects(backend_name: str, request):
+    if backend_name == "memory":
+        backend = MemoryBackend(max_keys=10)
+    else:
+        backend = request.getfixturevalue("database_backend")
+
+    assert backend.hit("login:ip:1", LIMIT) == 0
+    assert backend.hit("login:ip:1", LIMIT) == 0
+    retry_after = backend.hit("login:ip:1", LIMIT)
+    assert 0 < retry_after <= 1
+    assert backend.hit("login:ip:2", LIMIT) == 0
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        backend.hit(key, LIMIT)
+
+    assert len(backend) == 2
+    assert list(backend._buckets) == ["a", "c"]
+
+
+def test_sweeper_deletes_idle_buckets(database_backend: DatabaseBackend, engine):
+    database_backend.hit("fresh", LIMIT)
+    with Session(bind=engine) as db:
+        db.add(RateLimitBucket(key="idle", tokens=0, updated_at=time.time() - 86400))
+        db.commit()
+
+    assert reap_rate_limit_buckets(engine) == 1
+
+
+def test_login_rejected_before_password_check(monkeypatch):
+    monkeypatch.setattr(auth_module, "rate_limiter", RateLimiter(MemoryBackend(max_keys=100)))
+    request = Request({"type": "http", "headers": [], "client": ("203.0.113.7", 50000)})
+    body = LoginIn(email="user@example.com", password="password")
+    ip_limit, email_limit = auth_module.AUTH_LIMITS["login"]
+    for _ in range(int(email_limit.capacity)):
+        auth_module.rate_limiter.hit("login", "email", "user@example.com", email_limit)
+
+    # db=None: отказ должен случиться до первого обращения к БД
+    with pytest.raises(TooManyRequests) as exc:
+        auth_module.login(body, request, Response(), None)
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
@@ -0,0 +1,65 @@
+
+import pytest
+from sqlalchemy import create_engine
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.db.models import Base, User
+from app.db.routing import STICKY_COOKIE, ReadYourWritesMiddleware, RoutingSession, prefer_primary
+
+
+@pytest.fixture()
+def engines(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        Base.metadata.create_all(bind=engine)
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+def test_routing_session_reads_replica_until_it_writes(engines):
+    primary, replica = engines
+    # строка, которая есть только на реплике
+    with RoutingSession(replica, primary) as db:
+        db.add(User(email="replica@example.com", password_hash="x"))
+        db.commit()
+
+    with RoutingSession(primary, replica) as db:
+        assert db.query(User).filter(User.email == "replica@example.com").count() == 1
+
+        db.add(User(email="primary@example.com", password_hash="x"))
+        db.flush()
+        # после записи сессия читает с primary, где есть её собственная строка
+        assert db.query(User.email).all() == [("primary@example.com",)]
+        db.commit()
+
+    with RoutingSession(primary, replica, use_primary=True) as db:
+        assert db.query(User.email).all() == [("primary@example.com",)]
+
+
+def _client() -> TestClient:
+    async def endpoint(request):
+        return JSONResponse({"primary": prefer_primary.get()})
+
+    app = Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])
+    return TestClient(ReadYourWritesMiddleware(app, sticky_seconds=30))
+
+
+def test_mutation_makes_following_reads_sticky_to_primary():
+    client = _client()
+    assert client.get("/").json() == {"primary": False}
+
+    response = client.post("/")
+    assert STICKY_COOKIE in response.cookies
+
+    assert client.get("/").json() == {"primary": True}
+
+
+def test_expired_sticky_cookie_reads_replica():
+    client = _client()
+    client.cookies.set(STICKY_COOKIE, "1.0")
+    assert client.get("/").json() == {"primary": False}
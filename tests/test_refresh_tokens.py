@@ -0,0 +1,51 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import Session
+
+from app.api.v1 import auth as auth_module
+from app.db.models import RefreshToken, User
+from app.schemas.auth import RefreshIn
+from app.services.reapers import reap_refresh_tokens
+
+
+def _create_user(session: Session) -> User:
+    user = User(email="user@example.com", password_hash="hash")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def test_refresh_rotates_token_once(db_session: Session):
+    user = _create_user(db_session)
+    tokens = auth_module._issue_pair_and_store(email=user.email, user_id=user.id, db=db_session)
+
+    refresh_in = RefreshIn(refresh_token=tokens.refresh_token)
+    rotated = auth_module.refresh_tokens(refresh_in, Response(), db_session)
+
+    assert rotated.refresh_token != tokens.refresh_token
+    revoked = [token.revoked for token in db_session.query(RefreshToken).order_by(RefreshToken.id)]
+    assert revoked == [True, False]
+
+    with pytest.raises(HTTPException) as exc:
+        auth_module.refresh_tokens(refresh_in, Response(), db_session)
+    assert exc.value.status_code == 401
+    assert db_session.query(RefreshToken).count() == 2
+
+
+def test_reaper_deletes_revoked_and_expired_tokens(db_session: Session, engine):
+    user = _create_user(db_session)
+    now = datetime.now(UTC)
+    db_session.add_all([
+        RefreshToken(user_id=user.id, token_hash="a", jti="active",
+                     expires_at=now + timedelta(days=1)),
+        RefreshToken(user_id=user.id, token_hash="b", jti="expired",
+                     expires_at=now - timedelta(days=1)),
+        RefreshToken(user_id=user.id, token_hash="c", jti="revoked",
+                     expires_at=now + timedelta(days=1), revoked=True),
+    ])
+    db_session.commit()
+
+    assert reap_refresh_tokens(engine) == 2
+    assert [token.jti for token in db_session.query(RefreshToken)] == ["active"]
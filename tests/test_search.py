@@ -0,0 +1,65 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app.api.v1 import expenses as expenses_module
+from app.db.models import Account, Category, Receipt, Transaction, User
+
+
+def _user(session: Session, email: str, descriptions: list[str]) -> User:
+    user = User(email=email, password_hash="hash")
+    account = Account(name=email, currency="BYN", user=user)
+    category = Category(name="Разное", type="Расход", user=user)
+    session.add_all([user, account, category])
+    session.flush()
+    for description in descriptions:
+        session.add(Transaction(user_id=user.id, account_id=account.id, category_id=category.id,
+                                amount_minor=100, currency="BYN", date=datetime(2025, 3, 1),
+                                description=description))
+    session.commit()
+    return user
+
+
+def _search(session: Session, user: User, q: str, limit: int = 20, offset: int = 0):
+    return expenses_module.search(user=user, q=q, limit=limit, offset=offset, db=session)
+
+
+def test_search_matches_descriptions_and_receipt_merchants(db_session: Session):
+    user = _user(db_session, "search@example.com",
+                 ["Кофе с собой", "Coffee beans", "Продукты на неделю"])
+    _user(db_session, "other@example.com", ["Кофе", "Евроопт"])
+    groceries = (
+        db_session.query(Transaction)
+        .filter_by(user_id=user.id, description="Продукты на неделю")
+        .one()
+    )
+    db_session.add(Receipt(user_id=user.id, transaction_id=groceries.id, file_path="r.jpg",
+                           merchant_name="Евроопт"))
+    db_session.commit()
+
+    page = _search(db_session, user, "евроопт")
+    assert [hit.expense.id for hit in page.items] == [groceries.id]
+    assert page.items[0].expense.amount == Decimal("1.00")
+
+    # префикс и регистр; чужие операции не находятся
+    page = _search(db_session, user, "КОФ")
+    assert [hit.expense.description for hit in page.items] == ["Кофе с собой"]
+    assert _search(db_session, user, "!!!").items == []
+
+
+def test_search_is_paginated_and_follows_updates(db_session: Session):
+    user = _user(db_session, "search@example.com", [f"Такси поездка {n}" for n in range(5)])
+
+    first = _search(db_session, user, "такси", limit=2)
+    second = _search(db_session, user, "такси", limit=2, offset=4)
+    assert len(first.items) == 2 and first.has_more
+    assert len(second.items) == 1 and not second.has_more
+
+    taxi = db_session.query(Transaction).filter_by(description="Такси поездка 0").one()
+    taxi.description = "Метро"
+    db_session.delete(db_session.query(Transaction).filter_by(description="Такси поездка 1").one())
+    db_session.commit()
+
+    assert len(_search(db_session, user, "такси").items) == 3
+    assert [hit.expense.id for hit in _search(db_session, user, "метро").items] == [taxi.id]
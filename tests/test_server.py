@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+import pytest
+
+from app import server
+from app.core.config import settings
+from app.services.chat_manager import ConnectionManager
+
+
+def test_server_defaults_to_cpu_count_and_recycles_workers(monkeypatch):
+    monkeypatch.setattr(settings, "web_workers", None)
+    monkeypatch.setattr(settings, "web_max_requests", 1000)
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+
+    options = server.build_config()
+
+    assert options["workers"] == 6
+    assert options["limit_max_requests"] == 1000
+    assert options["timeout_graceful_shutdown"] == settings.web_graceful_timeout_s
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class _Broker:
+    def __init__(self, ok: bool):
+        self.ok = ok
+        self.events = []
+
+    async def publish(self, event):
+        self.events.append(event)
+        return self.ok
+
+
+@pytest.mark.parametrize("broker_ok", [True, False])
+def test_chat_goes_through_broker_and_falls_back_to_local(broker_ok: bool):
+    manager = ConnectionManager()
+    admin_ws = _FakeSocket()
+    manager.admin_connections[1] = admin_ws
+    manager.broker = _Broker(broker_ok)
+
+    asyncio.run(manager.send_to_admin(7, "hi"))
+
+    assert manager.broker.events == [{"to": "admin", "user_id": 7, "message": "hi"}]
+    # при работающем брокере доставка придёт из LISTEN-потока, а не напрямую
+    assert admin_ws.sent == ([] if broker_ok else [{"from_user": 7, "message": "hi"}])
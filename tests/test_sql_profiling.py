@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.db import profiling
+from app.db.instrumentation import instrument_engine
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    instrument_engine(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a'), (2, 'b')"))
+    return engine
+
+
+def test_fingerprint_replaces_literals_and_collapses_in_lists():
+    statement = (
+        "SELECT * FROM main.transactions  WHERE user_id = 42 AND name = 'Кофе' "
+        "AND id IN (%(id_1)s, %(id_2)s, %(id_3)s) AND date >= :start"
+    )
+
+    assert profiling.fingerprint(statement) == (
+        "SELECT * FROM main.transactions WHERE user_id = ? AND name = ? "
+        "AND id IN (...) AND date >= ?"
+    )
+
+
+def test_profile_detects_n_plus_one(engine, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "sql_n_plus_one_threshold", 3)
+    profile = profiling.RequestSQLProfile({"method": "GET", "path": "/items"}, detailed=True)
+    token = profiling.current_profile.set(profile)
+    try:
+        with engine.connect() as conn:
+            for item_id in (1, 2, 1, 2):
+                conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": item_id})
+            conn.execute(text("SELECT count(*) FROM items"))
+    finally:
+        profiling.current_profile.reset(token)
+
+    summary = profile.summary()
+    assert summary["count"] == 5
+    assert summary["route"] == "GET /items"
+    assert summary["n_plus_one"] == [
+        {
+            "fingerprint": "SELECT name FROM items WHERE id = ?",
+            "count": 4,
+            "total_ms": summary["n_plus_one"][0]["total_ms"],
+        }
+    ]
+
+
+def test_slow_query_is_logged(engine, monkeypatch: pytest.MonkeyPatch,
+                              caplog: pytest.LogCaptureFixture):
+    monkeypatch.setattr(settings, "sql_slow_query_ms", 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.sql"), engine.connect() as conn:
+        conn.execute(text("SELECT name FROM items WHERE id = 1"))
+
+    assert any(
+        "Slow query" in record.getMessage() and "WHERE id = ?" in record.getMessage()
+        for record in caplog.records
+    )
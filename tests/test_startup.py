@@ -0,0 +1,33 @@
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+from app.core.startup import ColdStart, run_startup
+from app.db.models import Base
+
+
+def test_run_startup_creates_schema_and_warms_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}", pool_size=3)
+
+    elapsed = run_startup(engine, Base.metadata, create_all=True, warm_connections=3,
+                          lazy_imports=False)
+
+    assert elapsed > 0
+    assert {"users", "transactions", "refresh_tokens"} <= set(inspect(engine).get_table_names())
+    assert engine.pool.checkedin() == 3
+    assert "passlib.context" in sys.modules
+    engine.dispose()
+
+
+def test_cold_start_reports_phases_once():
+    cold_start = ColdStart()
+    cold_start.mark_ready(0.25)
+    cold_start.mark_first_request()
+    first = cold_start.first_request_seconds
+    cold_start.mark_first_request()
+
+    phases = dict((labels[0], value) for labels, value in cold_start.samples())
+    assert phases["startup"] == 0.25
+    assert cold_start.first_request_seconds == first
+    if first is not None:
+        assert phases["first_request"] >= phases["ready"]
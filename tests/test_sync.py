@@ -0,0 +1,159 @@
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.exceptions import InvalidSyncToken
+from app.api.v1 import expenses as expenses_module
+from app.api.v1 import sync as sync_module
+from app.db.models import Account, SyncOperation, Transaction, User
+from app.schemas.expense import ExpenseCreate
+from app.schemas.sync import SyncOperationIn, SyncPush
+from app.services import sync as sync_service
+from app.services.reapers import reap_sync_operations
+
+
+def _user(session: Session, email: str) -> User:
+    user = User(email=email, password_hash="hash")
+    session.add_all([user, Account(name=email, currency="BYN", user=user)])
+    session.commit()
+    return user
+
+
+def _create(
+    session: Session, monkeypatch: pytest.MonkeyPatch, user: User, category: str, amount: str
+) -> None:
+    monkeypatch.setattr(
+        expenses_module.jwt, "decode", lambda *args, **kwargs: {"type": "access", "sub": user.email}
+    )
+    request = Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/expenses",
+        "query_string": b"",
+        "headers": [(b"cookie", b"my-access-token=valid-token")],
+    })
+    body = ExpenseCreate(category_name=category, amount=Decimal(amount), date=date(2025, 3, 1))
+    expenses_module.create_expense(body, request, session)
+
+
+def _pull(session: Session, user: User, since: str | None = None, limit: int = 500):
+    return sync_module.get_changes(user=user, since=since, limit=limit, db=session)
+
+
+def test_pull_returns_only_changes_since_token(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    alice = _user(db_session, "alice@example.com")
+    bob = _user(db_session, "bob@example.com")
+    _create(db_session, monkeypatch, alice, "Кафе", "10.00")
+    _create(db_session, monkeypatch, bob, "Кафе", "99.00")
+
+    full = _pull(db_session, alice)
+    assert [(tx.amount, tx.user_id) for tx in full.transactions] == [(Decimal("10.00"), alice.id)]
+    assert [category.name for category in full.categories] == ["Кафе"]
+    assert _pull(db_session, alice, full.token).transactions == []
+
+    _create(db_session, monkeypatch, alice, "Кафе", "5.00")
+    first = db_session.query(Transaction).filter(Transaction.amount_minor == 1000).one()
+    request = Request({"type": "http", "headers": [(b"cookie", b"my-access-token=x")]})
+    expenses_module.delete_expenses(first.id, request, db_session)
+
+    delta = _pull(db_session, alice, full.token)
+    assert [tx.amount for tx in delta.transactions] == [Decimal("5.00")]
+    assert delta.categories == []
+    assert [(item.entity, item.id) for item in delta.deleted] == [("transaction", first.id)]
+    assert not delta.has_more
+
+    with pytest.raises(type(InvalidSyncToken)) as error:
+        _pull(db_session, alice, "garbage!")
+    assert error.value.status_code == 400
+
+
+def test_push_applies_batch_once_and_pages_by_whole_changes(db_session: Session):
+    user = _user(db_session, "alice@example.com")
+    batch = SyncPush(operations=[
+        SyncOperationIn(key="c1", op="create", category_name="Кафе", amount=Decimal("4.50"),
+                        date=date(2025, 3, 1)),
+        SyncOperationIn(key="c2", op="create", category_name="Кафе", amount=Decimal("3.00"),
+                        date=date(2025, 3, 2)),
+        SyncOperationIn(key="c3", op="create", category_name="Такси", amount=Decimal("7.00"),
+                        date=date(2025, 3, 2)),
+    ])
+
+    created = sync_module.push_changes(batch, user, db_session)
+    replayed = sync_module.push_changes(batch, user, db_session)
+
+    assert [result.status for result in created.results] == ["applied"] * 3
+    assert [(result.status, result.id) for result in replayed.results] == [
+        ("duplicate", result.id) for result in created.results
+    ]
+    assert db_session.query(Transaction).count() == 3
+    assert db_session.query(SyncOperation).count() == 3
+
+    # пачка — одно изменение; постранично она приходит целиком и без повторов
+    pages = [_pull(db_session, user, limit=2)]
+    while pages[-1].has_more:
+        pages.append(_pull(db_session, user, pages[-1].token, limit=2))
+    assert len(pages) == 3
+    assert sorted(tx.id for page in pages for tx in page.transactions) == sorted(
+        r.id for r in created.results
+    )
+    assert sorted(
+        category.name for page in pages for category in page.categories
+    ) == ["Кафе", "Такси"]
+    page = pages[-1]
+
+    update = SyncPush(operations=[
+        SyncOperationIn(key="u1", op="update", id=created.results[0].id, amount=Decimal("5.00")),
+        SyncOperationIn(key="d1", op="delete", id=created.results[1].id),
+        SyncOperationIn(key="d2", op="delete", id=999),
+    ])
+    results = sync_module.push_changes(update, user, db_session).results
+    assert [result.status for result in results] == ["applied", "applied", "not_found"]
+    delta = _pull(db_session, user, page.token)
+    assert [(tx.id, tx.amount) for tx in delta.transactions] == [
+        (created.results[0].id, Decimal("5.00"))
+    ]
+    assert [item.id for item in delta.deleted] == [created.results[1].id]
+
+
+def test_pull_stops_at_clock_read_before_concurrent_commit(
+    db_session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    alice = _user(db_session, "alice@example.com")
+    _create(db_session, monkeypatch, alice, "Кафе", "10.00")
+    read_clock = sync_service.current_change_id
+
+    def clock_then_concurrent_write(db: Session, user_id: int) -> int:
+        clock = read_clock(db, user_id)
+        monkeypatch.setattr(sync_service, "current_change_id", read_clock)
+        # новое изменение коммитится между чтением часов и чтением источников
+        _create(db_session, monkeypatch, alice, "Такси", "7.00")
+        return clock
+
+    monkeypatch.setattr(sync_service, "current_change_id", clock_then_concurrent_write)
+    first = _pull(db_session, alice)
+    assert [category.name for category in first.categories] == ["Кафе"]
+    assert [tx.amount for tx in first.transactions] == [Decimal("10.00")]
+
+    second = _pull(db_session, alice, first.token)
+    assert [category.name for category in second.categories] == ["Такси"]
+    assert [tx.amount for tx in second.transactions] == [Decimal("7.00")]
+
+
+def test_sweeper_deletes_only_old_sync_operations(db_session: Session, engine):
+    alice = _user(db_session, "alice@example.com")
+    bob = _user(db_session, "bob@example.com")
+    now = datetime.now(UTC)
+    db_session.add_all([
+        SyncOperation(user_id=alice.id, key="c1", status="applied",
+                      created_at=now - timedelta(days=60)),
+        SyncOperation(user_id=bob.id, key="c1", status="applied", created_at=now),
+    ])
+    db_session.commit()
+
+    assert reap_sync_operations(engine) == 1
+    assert [(op.user_id, op.key) for op in db_session.query(SyncOperation)] == [(bob.id, "c1")]